@@ -1,14 +1,114 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional, Dict, Any
+from typing import Callable, List, Optional, Dict, Any, Tuple, TypeVar
 import asyncio
+import os
 import time
+from contextvars import ContextVar
 import httpx
 from loguru import logger
-from tenacity import retry, stop_after_attempt, wait_exponential
 import redis.asyncio as redis
+from pydantic import TypeAdapter
+from bs4 import BeautifulSoup
 
 from ..models.schemas import Product, ScrapingResult, RetailerConfig, Language
+from ..services.catalog import product_catalog
+from ..services.deadline_scheduler import AgentBudget, LatencyTracker, RETRY_BACKOFF_SECONDS, current_budget
+from ..services.hedging import MIN_HEDGE_SAMPLES, request_hedger
+from ..services.http_pool import http_client_pool
+from ..services.request_timing import current_timing
+from ..utils import html_parsing
 from ..utils.normalization import ProductNormalizer
+from ..utils.product_index import ProductIndex
+from ..utils.selector_engine import compile_selectors
+from ..utils.structured_data import StructuredScriptScanner, extract_structured_products
+from ..utils.unit_extraction import extract_measurement
+
+RESULT_TTL_SECONDS = 300  # 5 min TTL
+
+T = TypeVar("T")
+
+# Persist agent results in the background so responses never wait on Redis
+REDIS_WRITE_BEHIND = os.getenv("REDIS_WRITE_BEHIND", "false").lower() == "true"
+
+_products_adapter = TypeAdapter(List[Product])
+
+# Keep references to write-behind tasks so they are not garbage collected
+_write_behind_tasks = set()
+
+# Page fetch latencies (ms) observed during the agent search running in the current task
+fetch_latencies: ContextVar[Optional[List[float]]] = ContextVar("fetch_latencies", default=None)
+
+# A retailer whose pages carried no structured data still has every this many pages read to the end
+STRUCTURED_RECHECK_PAGES = 20
+
+
+class PersistenceStats:
+    """Per-process Redis persistence timings exposed through /metrics"""
+    
+    def __init__(self):
+        self.writes = 0
+        self.total_ms = 0
+        self.max_ms = 0
+    
+    def record(self, redis_time_ms: int):
+        self.writes += 1
+        self.total_ms += redis_time_ms
+        self.max_ms = max(self.max_ms, redis_time_ms)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "write_behind": REDIS_WRITE_BEHIND,
+            "writes": self.writes,
+            "pending_writes": len(_write_behind_tasks),
+            "avg_ms": round(self.total_ms / self.writes, 2) if self.writes else 0.0,
+            "max_ms": self.max_ms
+        }
+
+
+persistence_stats = PersistenceStats()
+
+
+class StreamStats:
+    """
+    Streaming fetch counters for one retailer
+    Also remembers whether the retailer's last page read past its products
+    carried structured data, so pages without it aren't read to the end.
+    """
+    
+    def __init__(self):
+        self.pages = 0
+        self.bytes_read = 0
+        self.early_stops = 0
+        self.capped = 0
+        self.has_structured_data: Optional[bool] = None
+        self.skipped_waits = 0
+    
+    def wait_for_structured_data(self) -> bool:
+        """Whether to keep reading past enough product markup for structured data that may follow it"""
+        if self.has_structured_data is not False:
+            return True
+        self.skipped_waits += 1
+        return self.skipped_waits % STRUCTURED_RECHECK_PAGES == 0
+    
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "pages": self.pages,
+            "avg_bytes_read": int(self.bytes_read / self.pages) if self.pages else 0,
+            "early_stops": self.early_stops,
+            "capped": self.capped,
+            "has_structured_data": self.has_structured_data
+        }
+
+
+_stream_stats: Dict[str, StreamStats] = {}
+
+
+def stream_stats_snapshot() -> Dict[str, Dict]:
+    return {retailer: stats.snapshot() for retailer, stats in _stream_stats.items()}
+
+
+class FetchError(Exception):
+    """A retailer page could not be fetched after every retry the budget allowed"""
 
 class AbstractScrapingAgent(ABC):
     """
@@ -20,22 +120,19 @@ class AbstractScrapingAgent(ABC):
         self.config = config
         self.redis_client = redis_client
         self.normalizer = ProductNormalizer()
-        self.session: Optional[httpx.AsyncClient] = None
+    
+    @property
+    def session(self) -> httpx.AsyncClient:
+        """The pooled client for this retailer's host; agents hold no per-request state"""
+        return http_client_pool.get_client(self.config)
         
     async def __aenter__(self):
-        """Async context manager entry"""
-        self.session = httpx.AsyncClient(
-            timeout=httpx.Timeout(self.config.timeout_seconds),
-            headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-        )
+        """Async context manager entry - kept for callers that scope an agent explicitly"""
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Async context manager exit"""
-        if self.session:
-            await self.session.aclose()
+        """Async context manager exit - the pooled client stays open for the next search"""
+        pass
     
     @abstractmethod
     async def search_products(self, query: str, language: Language = Language.ARABIC, max_results: int = 20) -> List[Product]:
@@ -53,63 +150,32 @@ class AbstractScrapingAgent(ABC):
         """
         pass
     
-    async def execute_search(self, query: str, request_id: str, language: Language = Language.ARABIC, max_results: int = 20) -> ScrapingResult:
+    async def execute_search(self, query: str, request_id: str, language: Language = Language.ARABIC, max_results: int = 20, budget: Optional[AgentBudget] = None) -> ScrapingResult:
         """
         Execute the search and return structured result
         This is the main entry point called by the orchestrator
+        The budget, when given, bounds every attempt and retry by the request deadline
         """
         start_time = time.time()
+        current_budget.set(budget)
+        fetch_latencies.set([])
         
         try:
             logger.info(f"[{self.config.name}] Starting search for: {query}")
             
-            # Store search start in Redis
-            await self.redis_client.hset(
-                f"search:{request_id}:{self.config.name}",
-                mapping={
-                    "status": "started",
-                    "query": query,
-                    "start_time": str(start_time)
-                }
-            )
-            await self.redis_client.expire(f"search:{request_id}:{self.config.name}", 300)  # 5 min TTL
+            # Execute the actual search with deadline-aware retries
+            products = await self._search_with_retry(query, language, max_results, budget)
             
-            # Execute the actual search with retry logic
-            products = await self._search_with_retry(query, language, max_results)
+            # Normalize products in one batch; a page's worth runs inline
+            normalized_products = await self.normalizer.normalize_batch(products, query)
             
-            # Normalize products
-            normalized_products = []
-            for product in products:
-                try:
-                    normalized_product = await self.normalizer.normalize_product(product, query)
-                    normalized_products.append(normalized_product)
-                except Exception as e:
-                    logger.warning(f"[{self.config.name}] Failed to normalize product: {e}")
-                    normalized_products.append(product)  # Use original if normalization fails
+            # Feed the local catalog; it upserts in background batches
+            product_catalog.add(normalized_products)
             
             response_time_ms = int((time.time() - start_time) * 1000)
-            
-            # Store results in Redis
-            await self.redis_client.hset(
-                f"search:{request_id}:{self.config.name}",
-                mapping={
-                    "status": "completed",
-                    "products_found": len(normalized_products),
-                    "response_time_ms": response_time_ms
-                }
-            )
-            
-            # Store individual products
-            for i, product in enumerate(normalized_products):
-                await self.redis_client.hset(
-                    f"search:{request_id}:{self.config.name}:product:{i}",
-                    mapping=product.dict()
-                )
-                await self.redis_client.expire(f"search:{request_id}:{self.config.name}:product:{i}", 300)
-            
             logger.info(f"[{self.config.name}] Found {len(normalized_products)} products in {response_time_ms}ms")
             
-            return ScrapingResult(
+            result = ScrapingResult(
                 retailer=self.config.name,
                 products=normalized_products,
                 success=True,
@@ -123,17 +189,7 @@ class AbstractScrapingAgent(ABC):
             
             logger.error(f"[{self.config.name}] Search failed: {error_msg}")
             
-            # Store error in Redis
-            await self.redis_client.hset(
-                f"search:{request_id}:{self.config.name}",
-                mapping={
-                    "status": "failed",
-                    "error": error_msg,
-                    "response_time_ms": response_time_ms
-                }
-            )
-            
-            return ScrapingResult(
+            result = ScrapingResult(
                 retailer=self.config.name,
                 products=[],
                 success=False,
@@ -141,12 +197,255 @@ class AbstractScrapingAgent(ABC):
                 response_time_ms=response_time_ms,
                 products_found=0
             )
+        
+        # Persist status and products in one round trip, optionally off the response path
+        if REDIS_WRITE_BEHIND:
+            task = asyncio.create_task(self._persist_result(request_id, query, start_time, result))
+            _write_behind_tasks.add(task)
+            task.add_done_callback(_write_behind_tasks.discard)
+        else:
+            result.redis_time_ms = await self._persist_result(request_id, query, start_time, result)
+        
+        return result
+    
+    async def _persist_result(self, request_id: str, query: str, start_time: float, result: ScrapingResult) -> int:
+        """
+        Store a retailer's search status and products with a single pipelined transaction
+        Products are stored as one serialized blob per retailer with its TTL set atomically
+        Returns the time spent in Redis in milliseconds
+        """
+        redis_start = time.perf_counter()
+        
+        try:
+            pipe = self.redis_client.pipeline(transaction=True)
+            self._add_status_to_pipeline(pipe, request_id, query, start_time, result)
+            if result.products:
+                # Keep the alternatives token index in step with stored products
+                ProductIndex(self.redis_client).add_to_pipeline(pipe, result.products, RESULT_TTL_SECONDS)
+            latency_tracker = LatencyTracker(self.redis_client)
+            if result.success:
+                latency_tracker.add_to_pipeline(pipe, self.config.name, "search", result.response_time_ms)
+            for latency_ms in fetch_latencies.get() or []:
+                latency_tracker.add_to_pipeline(pipe, self.config.name, "fetch", latency_ms)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"[{self.config.name}] Failed to persist search results: {e}")
+        
+        redis_time_ms = int((time.perf_counter() - redis_start) * 1000)
+        persistence_stats.record(redis_time_ms)
+        return redis_time_ms
+    
+    async def persist_status(self, request_id: str, query: str, start_time: float, result: ScrapingResult):
+        """
+        Store a retailer's search status and products for a request that did not scrape itself
+        Used when the result came from another request's scrape or the scrape never finished
+        """
+        try:
+            pipe = self.redis_client.pipeline(transaction=True)
+            self._add_status_to_pipeline(pipe, request_id, query, start_time, result)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"[{self.config.name}] Failed to persist search status: {e}")
+    
+    def _add_status_to_pipeline(self, pipe, request_id: str, query: str, start_time: float, result: ScrapingResult):
+        status_key = f"search:{request_id}:{self.config.name}"
+        status = {
+            "status": "completed" if result.success else "failed",
+            "query": query,
+            "start_time": str(start_time),
+            "products_found": result.products_found,
+            "response_time_ms": result.response_time_ms
+        }
+        if result.error_message:
+            status["error"] = result.error_message
+        pipe.hset(status_key, mapping=status)
+        pipe.expire(status_key, RESULT_TTL_SECONDS)
+        if result.products:
+            pipe.set(
+                f"{status_key}:products",
+                _products_adapter.dump_json(result.products),
+                ex=RESULT_TTL_SECONDS
+            )
+    
+    async def _search_with_retry(self, query: str, language: Language, max_results: int, budget: Optional[AgentBudget] = None) -> List[Product]:
+        """
+        Execute search with retry logic
+        Without a budget this makes 1 + max_retries attempts; with one, each attempt is
+        capped at the remaining deadline and retries that cannot finish in time are skipped
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                async with self:
+                    if budget is None:
+                        return await self.search_products(query, language, max_results)
+                    return await asyncio.wait_for(
+                        self.search_products(query, language, max_results),
+                        timeout=budget.attempt_timeout(self.config)
+                    )
+            except FetchError:
+                # fetch_with_retry has already spent the retries on the page
+                raise
+            except Exception as e:
+                can_retry = budget.can_retry(attempt) if budget else attempt <= self.config.max_retries
+                if not can_retry:
+                    raise
+                logger.warning(f"[{self.config.name}] Search attempt {attempt} failed, retrying: {e!r}")
+                await asyncio.sleep(RETRY_BACKOFF_SECONDS * attempt)
     
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-    async def _search_with_retry(self, query: str, language: Language, max_results: int) -> List[Product]:
-        """Execute search with retry logic"""
-        async with self:
-            return await self.search_products(query, language, max_results)
+    async def fetch_with_retry(self, url: str, max_results: Optional[int] = None) -> str:
+        """
+        Fetch a page over the pooled client, retrying transient failures
+        Inside a budgeted search, requests never outlive the request deadline
+        With max_results, a streamed page stops downloading once enough products have arrived
+        Raises FetchError if the retailer keeps failing, so the search is recorded as failed
+        """
+        client = self.session
+        budget = current_budget.get()
+        
+        attempt = 0
+        while True:
+            attempt += 1
+            timeout = budget.attempt_timeout(self.config) if budget else self.config.timeout_seconds
+            if timeout <= 0:
+                raise FetchError(f"Search deadline reached before fetching {url}")
+            try:
+                timing = current_timing.get()
+                if timing:
+                    timing.mark_first_send()
+                fetch_start = time.perf_counter()
+                status_code, text = await self._fetch(client, url, timeout, max_results)
+                latencies = fetch_latencies.get()
+                if latencies is not None:
+                    latencies.append((time.perf_counter() - fetch_start) * 1000)
+                if text is not None:
+                    return text
+                error = f"HTTP {status_code}"
+                logger.warning(f"[{self.config.name}] HTTP {status_code} for {url} (attempt {attempt})")
+            except httpx.TransportError as e:
+                error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+                logger.warning(f"[{self.config.name}] Request failed for {url} (attempt {attempt}): {e}")
+            
+            can_retry = budget.can_retry(attempt) if budget else attempt <= self.config.max_retries
+            if not can_retry:
+                raise FetchError(f"{error} after {attempt} attempts")
+            await asyncio.sleep(RETRY_BACKOFF_SECONDS * attempt)
+    
+    async def _fetch(self, client: httpx.AsyncClient, url: str, timeout: float, max_results: Optional[int]) -> Tuple[int, Optional[str]]:
+        """
+        GET a page, streamed unless the retailer hedges its requests
+        Returns the status code and the body; the body is None for server errors
+        and 4xx responses raise.
+        """
+        if self.config.hedge_requests or not self.config.stream_fetch:
+            response = await self._get(client, url, timeout)
+            if response.status_code >= 500:
+                return response.status_code, None
+            response.raise_for_status()
+            return response.status_code, response.text
+        return await self._get_streaming(client, url, timeout, max_results)
+    
+    async def _get_streaming(self, client: httpx.AsyncClient, url: str, timeout: float, max_results: Optional[int]) -> Tuple[int, Optional[str]]:
+        """
+        GET a page incrementally
+        Reading stops, and the stream is closed, once more than max_results product
+        containers have started or max_response_bytes have been read. With
+        structured_data, JSON-LD and __NEXT_DATA__ state usually follow the
+        product markup, so past that point reading goes on until a block with
+        usable products has closed; retailers whose last such page had none
+        stop at the product count.
+        """
+        selectors = compile_selectors(self.config)
+        counter = selectors.container_counter() if selectors and max_results else None
+        scanner = StructuredScriptScanner() if counter and self.config.structured_data else None
+        stats = _stream_stats.setdefault(self.config.name, StreamStats())
+        limit = self.config.max_response_bytes
+        page = bytearray()
+        enough = waiting = False
+        checked_blocks = 0
+        
+        async with client.stream("GET", url, timeout=timeout) as response:
+            if response.status_code >= 500:
+                return response.status_code, None
+            response.raise_for_status()
+            encoding = response.encoding or "utf-8"
+            async for chunk in response.aiter_bytes():
+                page += chunk
+                if len(page) >= limit:
+                    stats.capped += 1
+                    break
+                if not enough:
+                    if not counter or counter.feed(chunk) <= max_results:
+                        continue
+                    enough = True
+                    waiting = scanner is not None and stats.wait_for_structured_data()
+                if scanner is not None and scanner.feed(page) > checked_blocks:
+                    # Only check the blocks once one has closed past the product count
+                    checked_blocks = scanner.blocks
+                    if extract_structured_products(page[:scanner.closed_at].decode(encoding, errors="replace"), max_results):
+                        stats.has_structured_data = True
+                        waiting = False
+                if not waiting and not (scanner and scanner.open):
+                    stats.early_stops += 1
+                    break
+            else:
+                if waiting:
+                    stats.has_structured_data = False
+        
+        stats.pages += 1
+        stats.bytes_read += min(len(page), limit)
+        return response.status_code, page[:limit].decode(encoding, errors="replace")
+    
+    async def _get(self, client: httpx.AsyncClient, url: str, timeout: float) -> httpx.Response:
+        """GET a page, hedging it after the retailer's observed p90 if hedging is enabled"""
+        if not self.config.hedge_requests:
+            return await client.get(url, timeout=timeout)
+        
+        percentiles = await LatencyTracker(self.redis_client).get_percentiles([self.config.name], "fetch")
+        latency = percentiles[self.config.name]
+        hedge_after = latency.p90_ms / 1000 if latency.samples >= MIN_HEDGE_SAMPLES and latency.p90_ms else None
+        return await request_hedger.get(self.config, url, timeout, hedge_after)
+    
+    async def parse_html(self, html: str, extract: Callable[[BeautifulSoup], T], max_results: Optional[int] = None) -> T:
+        """
+        Extract products from a page off the event loop
+        When max_results is given and the retailer allows it, the page's structured
+        data is tried first and extract only runs on a parsed soup as the fallback.
+        """
+        structured = None
+        if max_results and self.config.structured_data:
+            structured = lambda raw: self.extract_structured(raw, max_results)
+        return await html_parsing.parse_html(self.config.name, html, extract, self.config.html_parser, structured)
+    
+    def extract_structured(self, html: str, max_results: int) -> List[Product]:
+        """Products from the page's JSON-LD or __NEXT_DATA__ state; empty when it has none"""
+        products = []
+        for fields in extract_structured_products(html, max_results):
+            weight, unit = self.extract_weight(fields["name"])
+            try:
+                products.append(Product(
+                    name=fields["name"],
+                    price=fields["price"],
+                    retailer=self.config.name,
+                    url=self._absolute_url(fields["url"]) or "",
+                    image_url=self._absolute_url(fields["image_url"]),
+                    weight=weight,
+                    weight_unit=unit,
+                    brand=fields["brand"],
+                    in_stock=fields["in_stock"]
+                ))
+            except ValueError as e:
+                logger.debug(f"[{self.config.name}] Skipping structured product: {e}")
+        return products
+    
+    def _absolute_url(self, url: Optional[str]) -> Optional[str]:
+        """Resolve site-relative URLs and bare slugs against the retailer's base URL"""
+        if not url or url.startswith(('http://', 'https://')):
+            return url
+        if url.startswith('//'):
+            return 'https:' + url
+        return self.config.base_url + ('' if url.startswith('/') else '/') + url
     
     async def test_connection(self) -> bool:
         """Test if the retailer website is accessible"""
@@ -171,34 +470,5 @@ class AbstractScrapingAgent(ABC):
     
     def extract_weight(self, text: str) -> tuple[Optional[float], Optional[str]]:
         """Extract weight and unit from text"""
-        try:
-            import re
-            # Common weight patterns
-            patterns = [
-                r'(\d+(?:\.\d+)?)\s*(kg|كيلو|كيلوجرام)',
-                r'(\d+(?:\.\d+)?)\s*(g|جم|جرام)',
-                r'(\d+(?:\.\d+)?)\s*(l|لتر|لتر)',
-                r'(\d+(?:\.\d+)?)\s*(ml|مل|مليلتر)',
-                r'(\d+)\s*(قطعة|حبة|pc|piece)'
-            ]
-            
-            for pattern in patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    weight = float(match.group(1))
-                    unit = match.group(2).lower()
-                    
-                    # Normalize units
-                    unit_mapping = {
-                        'kg': 'kg', 'كيلو': 'kg', 'كيلوجرام': 'kg',
-                        'g': 'g', 'جم': 'g', 'جرام': 'g',
-                        'l': 'l', 'لتر': 'l',
-                        'ml': 'ml', 'مل': 'ml', 'مليلتر': 'ml',
-                        'قطعة': 'pc', 'حبة': 'pc', 'pc': 'pc', 'piece': 'pc'
-                    }
-                    
-                    return weight, unit_mapping.get(unit, unit)
-            
-            return None, None
-        except Exception:
-            return None, None
\ No newline at end of file
+        measurement = extract_measurement(text)
+        return measurement.weight, measurement.unit
@@ -0,0 +1,84 @@
+from typing import Dict, List, Optional
+from urllib.parse import quote
+from bs4 import BeautifulSoup, Tag
+from loguru import logger
+import redis.asyncio as redis
+
+from .base_agent import AbstractScrapingAgent
+from ..models.schemas import Product, Language, RetailerConfig
+from ..utils.selector_engine import compile_selectors
+
+class ConfigDrivenAgent(AbstractScrapingAgent):
+    """
+    Scraping agent driven entirely by RetailerConfig
+    Fetches config.search_url and extracts products with the retailer's compiled
+    selectors. Subclasses override only what is retailer-specific, typically
+    get_search_url or _build_product.
+    """
+
+    def __init__(self, config: RetailerConfig, redis_client: redis.Redis):
+        super().__init__(config, redis_client)
+        if config.selectors is None:
+            raise ValueError(f"Retailer {config.name} has no selectors configured")
+        self.selectors = compile_selectors(config)
+
+    def get_search_url(self, query: str) -> str:
+        return self.config.search_url.format(query=quote(query))
+
+    async def search_products(self, query: str, language: Language = Language.ARABIC, max_results: int = 20) -> List[Product]:
+        """
+        Products on the retailer's search results page
+        Fetch and parse failures propagate so execute_search records the search as
+        failed; only a page without product containers is an empty result.
+        """
+        search_url = self.get_search_url(query)
+        logger.info(f"[{self.config.name}] Searching: {search_url}")
+
+        html_content = await self.fetch_with_retry(search_url, max_results)
+        if not html_content:
+            return []
+
+        return await self.parse_html(html_content, lambda soup: self._extract_products(soup, max_results), max_results)
+
+    def _extract_products(self, soup: BeautifulSoup, max_results: int) -> List[Product]:
+        products = []
+        for container in self.selectors.containers(soup, max_results):
+            try:
+                product = self._build_product(self.selectors.extract_fields(container))
+                if product:
+                    products.append(product)
+            except Exception as e:
+                logger.error(f"[{self.config.name}] Error extracting product: {e}")
+        return products
+
+    def _build_product(self, fields: Dict[str, Tag]) -> Optional[Product]:
+        """Turn the elements found for one container into a Product"""
+        if "name" not in fields or "price" not in fields:
+            return None
+
+        name = fields["name"].get_text(strip=True)
+        price = self.extract_price(fields["price"].get_text(strip=True))
+        if not name or not price:
+            return None
+
+        image_url = None
+        if "image" in fields:
+            for attribute in self.config.selectors.image_attributes:
+                image_url = fields["image"].get(attribute)
+                if image_url:
+                    break
+
+        weight, unit = self.extract_weight(name)
+        brand = fields["brand"].get_text(strip=True) if "brand" in fields else None
+
+        return Product(
+            name=name,
+            price=price,
+            retailer=self.config.name,
+            url=self._absolute_url(fields["link"].get("href") if "link" in fields else None) or "",
+            image_url=self._absolute_url(image_url),
+            weight=weight,
+            weight_unit=unit,
+            brand=brand or None,
+            in_stock=True
+        )
@@ -1,16 +1,15 @@
-from typing import List, Dict
+import time
+from typing import List, Dict, Optional
 import redis.asyncio as redis
 from loguru import logger
 
 from .base_agent import AbstractScrapingAgent
-from ..models.schemas import RetailerConfig, RetailerStatus
+from ..models.schemas import CircuitState, RetailerConfig, RetailerStatus, SelectorConfig
+from ..services.circuit_breaker import CircuitBreaker
+from ..utils.selector_engine import compile_selectors
 
 # Import retailer agents
-from .carrefour_agent import CarrefourAgent
-from .spinneys_agent import SpinneysAgent
-from .metro_agent import MetroAgent
-from .kazyon_agent import KazyonAgent
-from .freshmart_agent import FreshMartAgent
+from .config_driven_agent import ConfigDrivenAgent
 from .gourmet_agent import GourmetAgent
 from .alkhairy_agent import AlKhairyAgent
 from .otlob_agent import OtlobAgent
@@ -18,6 +17,8 @@ from .elmenus_agent import ElMenusAgent
 from .jumia_agent import JumiaAgent
 
 # Egyptian retailer configurations
+# delivery_fee is left unset (0) until each retailer's fee is confirmed; set it
+# at runtime with PUT /retailers/{name}. Until then basket plans ignore fees.
 EGYPTIAN_RETAILERS = [
     RetailerConfig(
         name="Carrefour Egypt",
@@ -28,7 +29,13 @@ EGYPTIAN_RETAILERS = [
         priority=1,
         timeout_seconds=15,
         max_retries=3,
-        scraping_method="firecrawl"
+        scraping_method="firecrawl",
+        hedge_requests=True,
+        selectors=SelectorConfig(
+            product='[data-testid="product_card"], .product-card',
+            name='[data-testid="product_name"], .product-name, h3',
+            price='[data-testid="product_card_price"], .product-price, .price'
+        )
     ),
     RetailerConfig(
         name="Spinneys Egypt",
@@ -39,7 +46,13 @@ EGYPTIAN_RETAILERS = [
         priority=2,
         timeout_seconds=12,
         max_retries=2,
-        scraping_method="firecrawl"
+        scraping_method="firecrawl",
+        hedge_requests=True,
+        selectors=SelectorConfig(
+            product='.product-item, .product-card',
+            name='.product-item-name, .product-name, h3',
+            price='.price-wrapper .price, .price'
+        )
     ),
     RetailerConfig(
         name="Metro Egypt",
@@ -48,7 +61,13 @@ EGYPTIAN_RETAILERS = [
         search_url="https://www.metro-markets.com.eg/search?term={query}",
         priority=3,
         timeout_seconds=10,
-        scraping_method="playwright"
+        scraping_method="playwright",
+        cache_ttl_seconds=600,
+        selectors=SelectorConfig(
+            product='.product-card, .product-item',
+            name='.product-title, .product-name, h3',
+            price='.product-price, .price'
+        )
     ),
     RetailerConfig(
         name="Kazyon",
@@ -57,7 +76,13 @@ EGYPTIAN_RETAILERS = [
         search_url="https://kazyon.com/search?q={query}",
         priority=4,
         timeout_seconds=10,
-        scraping_method="firecrawl"
+        scraping_method="firecrawl",
+        cache_ttl_seconds=600,
+        selectors=SelectorConfig(
+            product='.product-item, .product',
+            name='.product-name, .woocommerce-loop-product__title, h2, h3',
+            price='.price ins .amount, .price .amount, .price'
+        )
     ),
     RetailerConfig(
         name="FreshMart",
@@ -66,7 +91,12 @@ EGYPTIAN_RETAILERS = [
         search_url="https://freshmart.com.eg/search?query={query}",
         priority=5,
         timeout_seconds=8,
-        scraping_method="playwright"
+        scraping_method="playwright",
+        selectors=SelectorConfig(
+            product='.product-item, .product-card',
+            name='.product-name, .title, h3',
+            price='.special-price .price, .price'
+        )
     ),
     RetailerConfig(
         name="Gourmet Egypt",
@@ -75,7 +105,12 @@ EGYPTIAN_RETAILERS = [
         search_url="https://gourmet-egypt.com/search/{query}",
         priority=6,
         timeout_seconds=8,
-        scraping_method="firecrawl"
+        scraping_method="firecrawl",
+        selectors=SelectorConfig(
+            product='.product-item, .product-card, .item',
+            name='.product-name, .title, h3, h4',
+            price='.price, .product-price, .current-price'
+        )
     ),
     RetailerConfig(
         name="Al Khairy",
@@ -84,7 +119,12 @@ EGYPTIAN_RETAILERS = [
         search_url="https://alkhairy.com/products/search?q={query}",
         priority=7,
         timeout_seconds=8,
-        scraping_method="playwright"
+        scraping_method="playwright",
+        selectors=SelectorConfig(
+            product='.product-item, .product-card, .grid-item',
+            name='.product-name, .title, h3, h4',
+            price='.price, .product-price, .current-price'
+        )
     ),
     RetailerConfig(
         name="Otlob Market",
@@ -93,7 +133,14 @@ EGYPTIAN_RETAILERS = [
         search_url="https://otlob.com/market/search?q={query}",
         priority=8,
         timeout_seconds=6,
-        scraping_method="selenium"
+        scraping_method="selenium",
+        cache_ttl_seconds=120,
+        cache_stale_seconds=300,
+        selectors=SelectorConfig(
+            product='.product-item, .market-item, .item',
+            name='.product-name, .item-name, .title, h3, h4',
+            price='.price, .product-price, .item-price'
+        )
     ),
     RetailerConfig(
         name="ElMenus Market",
@@ -102,7 +149,14 @@ EGYPTIAN_RETAILERS = [
         search_url="https://elmenus.com/market/search?query={query}",
         priority=9,
         timeout_seconds=6,
-        scraping_method="selenium"
+        scraping_method="selenium",
+        cache_ttl_seconds=120,
+        cache_stale_seconds=300,
+        selectors=SelectorConfig(
+            product='.product-item, .market-item, .grocery-item',
+            name='.product-name, .item-name, .title, h3, h4',
+            price='.price, .product-price, .item-price'
+        )
     ),
     RetailerConfig(
         name="Jumia Egypt",
@@ -111,17 +165,23 @@ EGYPTIAN_RETAILERS = [
         search_url="https://www.jumia.com.eg/catalog/?q={query}",
         priority=10,
         timeout_seconds=10,
-        scraping_method="firecrawl"
+        scraping_method="firecrawl",
+        selectors=SelectorConfig(
+            product='.prd, ._-f-k0, .product, .core',
+            name='.name, .title, ._-fs14, h3, h4',
+            price='.prc, ._-gbg, .price-now, .current-price',
+            brand='.brand, ._-ptxxs',
+            image_attributes=["data-src", "src"]
+        )
     )
 ]
 
-# Agent class mapping
+# Compile every retailer's selectors once, at load
+for _config in EGYPTIAN_RETAILERS:
+    compile_selectors(_config)
+
+# Retailers with their own agent class; all others use ConfigDrivenAgent
 AGENT_CLASSES = {
-    "Carrefour Egypt": CarrefourAgent,
-    "Spinneys Egypt": SpinneysAgent,
-    "Metro Egypt": MetroAgent,
-    "Kazyon": KazyonAgent,
-    "FreshMart": FreshMartAgent,
     "Gourmet Egypt": GourmetAgent,
     "Al Khairy": AlKhairyAgent,
     "Otlob Market": OtlobAgent,
@@ -129,47 +189,168 @@ AGENT_CLASSES = {
     "Jumia Egypt": JumiaAgent
 }
 
-async def get_active_agents(redis_client: redis.Redis) -> List[AbstractScrapingAgent]:
+# Runtime retailer changes, shared by all workers through Redis
+RETAILER_CONFIGS_KEY = "retailers:configs"  # name -> RetailerConfig JSON for added or reconfigured retailers
+RETAILER_STATUS_KEY = "retailers:status"  # name -> RetailerStatus value overriding the configured one
+
+# How often each worker picks up runtime retailer changes
+POOL_SYNC_SECONDS = 5.0
+
+class AgentPool:
     """
-    Get all active scraping agents for Egyptian retailers
+    Long-lived agents, one per retailer, shared by every request in this worker
+    Agents keep no per-request state, so a search only has to pick the active
+    ones. Retailers added, reconfigured or disabled at runtime are stored in
+    Redis and picked up by every worker within POOL_SYNC_SECONDS; only the
+    affected agents are rebuilt.
     """
-    active_agents = []
     
-    for config in EGYPTIAN_RETAILERS:
-        if config.status == RetailerStatus.ACTIVE:
-            try:
-                # Get agent class
-                agent_class = AGENT_CLASSES.get(config.name)
-                if not agent_class:
-                    logger.warning(f"No agent class found for {config.name}")
-                    continue
-                
-                # Create agent instance
-                agent = agent_class(config, redis_client)
-                active_agents.append(agent)
-                
-            except Exception as e:
-                logger.error(f"Failed to create agent for {config.name}: {e}")
+    def __init__(self, configs: List[RetailerConfig]):
+        self._base_configs = {config.name: config for config in configs}
+        self.redis_client: Optional[redis.Redis] = None
+        self._configs: Dict[str, RetailerConfig] = {}
+        self._agents: Dict[str, AbstractScrapingAgent] = {}
+        self._status: Dict[str, RetailerStatus] = {}
+        self._raw_configs: Dict[str, str] = {}
+        self._active: List[AbstractScrapingAgent] = []
+        self._synced_at = 0.0
+    
+    @property
+    def started(self) -> bool:
+        return self.redis_client is not None
+    
+    def start(self, redis_client: redis.Redis):
+        """Build one agent per configured retailer"""
+        self.redis_client = redis_client
+        for config in self._base_configs.values():
+            self._install(config)
+        self._rebuild_active()
+        logger.info(f"Agent pool started with {len(self._agents)} agents")
+    
+    def _install(self, config: RetailerConfig):
+        try:
+            compile_selectors(config)
+            agent_class = AGENT_CLASSES.get(config.name, ConfigDrivenAgent)
+            self._agents[config.name] = agent_class(config, self.redis_client)
+            self._configs[config.name] = config
+        except Exception as e:
+            logger.error(f"Failed to create agent for {config.name}: {e}")
+    
+    def _remove(self, name: str):
+        self._agents.pop(name, None)
+        self._configs.pop(name, None)
+    
+    def status(self, config: RetailerConfig) -> RetailerStatus:
+        return self._status.get(config.name, config.status)
+    
+    def _rebuild_active(self):
+        self._active = sorted(
+            (agent for agent in self._agents.values() if self.status(agent.config) == RetailerStatus.ACTIVE),
+            key=lambda agent: agent.config.priority
+        )
+    
+    def configs(self) -> List[RetailerConfig]:
+        return sorted(self._configs.values(), key=lambda config: config.priority)
+    
+    def get_config(self, name: str) -> Optional[RetailerConfig]:
+        return self._configs.get(name)
+    
+    async def sync(self, force: bool = False):
+        """Apply runtime retailer changes from Redis, at most every POOL_SYNC_SECONDS"""
+        if not force and time.monotonic() - self._synced_at < POOL_SYNC_SECONDS:
+            return
+        self._synced_at = time.monotonic()
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.hgetall(RETAILER_CONFIGS_KEY)
+            pipe.hgetall(RETAILER_STATUS_KEY)
+            raw_configs, raw_status = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to sync agent pool: {e}")
+            return
+        
+        for name in set(self._raw_configs) | set(raw_configs):
+            raw = raw_configs.get(name)
+            if raw == self._raw_configs.get(name):
                 continue
+            if raw is None:
+                self._remove(name)
+                if name in self._base_configs:
+                    self._install(self._base_configs[name])
+            else:
+                try:
+                    self._install(RetailerConfig.model_validate_json(raw))
+                except ValueError as e:
+                    logger.error(f"Ignoring invalid runtime config for {name}: {e}")
+        self._raw_configs = raw_configs
+        
+        self._status = {}
+        for name, value in raw_status.items():
+            try:
+                self._status[name] = RetailerStatus(value)
+            except ValueError:
+                logger.error(f"Ignoring invalid runtime status for {name}: {value}")
+        self._rebuild_active()
+    
+    async def set_config(self, config: RetailerConfig):
+        """Add or reconfigure a retailer on every worker"""
+        await self.redis_client.hset(RETAILER_CONFIGS_KEY, config.name, config.model_dump_json())
+        await self.sync(force=True)
+    
+    async def set_status(self, name: str, status: RetailerStatus):
+        """Enable or disable a retailer on every worker"""
+        await self.redis_client.hset(RETAILER_STATUS_KEY, name, status.value)
+        await self.sync(force=True)
+    
+    async def active_agents(self) -> List[AbstractScrapingAgent]:
+        await self.sync()
+        return list(self._active)
+
+
+agent_pool = AgentPool(EGYPTIAN_RETAILERS)
+
+async def get_active_agents(redis_client: redis.Redis, open_circuits: Optional[List[str]] = None) -> List[AbstractScrapingAgent]:
+    """
+    Get the pooled agents for all active Egyptian retailers
+    Retailers whose circuit is open are skipped; their names are appended to
+    open_circuits when a list is passed in.
+    """
+    if not agent_pool.started:
+        agent_pool.start(redis_client)
+    agents = await agent_pool.active_agents()
+    
+    available_configs, skipped = await CircuitBreaker(redis_client).filter_available([agent.config for agent in agents])
+    if skipped:
+        logger.info(f"Skipping retailers with open circuits: {skipped}")
+        if open_circuits is not None:
+            open_circuits.extend(skipped)
     
-    logger.info(f"Loaded {len(active_agents)} active agents")
-    return active_agents
+    available = {config.name for config in available_configs}
+    return [agent for agent in agents if agent.config.name in available]
 
-def get_available_retailers() -> List[Dict]:
-    """Get list of all available retailers"""
+def get_available_retailers(circuit_states: Optional[Dict[str, CircuitState]] = None) -> List[Dict]:
+    """Get list of all available retailers, reporting open circuits as errors"""
+    circuit_states = circuit_states or {}
     return [
         {
             "name": config.name,
             "name_ar": config.name_ar,
-            "status": config.status.value,
+            "status": (
+                RetailerStatus.ERROR.value
+                if agent_pool.status(config) == RetailerStatus.ACTIVE and circuit_states.get(config.name) == CircuitState.OPEN
+                else agent_pool.status(config).value
+            ),
             "priority": config.priority,
             "base_url": config.base_url
         }
-        for config in EGYPTIAN_RETAILERS
+        for config in (agent_pool.configs() if agent_pool.started else EGYPTIAN_RETAILERS)
     ]
 
 def get_retailer_config(retailer_name: str) -> RetailerConfig:
     """Get configuration for a specific retailer"""
+    config = agent_pool.get_config(retailer_name)
+    if config:
+        return config
     for config in EGYPTIAN_RETAILERS:
         if config.name == retailer_name:
             return config
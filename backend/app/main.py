@@ -1,21 +1,43 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
 import asyncio
+import hmac
 import redis.asyncio as redis
 import os
 from loguru import logger
+import orjson
 import uuid
 from datetime import datetime
 
 from .services.orchestrator import SearchOrchestrator
-from .models.schemas import SearchRequest, SearchResponse, Product
+from .services.basket import BasketOptimizer
+from .services.search_cache import cache_stats
+from .services.single_flight import single_flight_stats
+from .services.http_pool import http_client_pool
+from .services.warmup import connection_warmer
+from .services.deadline_scheduler import deadline_stats
+from .services.hedging import request_hedger
+from .services.circuit_breaker import CircuitBreaker, circuit_stats
+from .services.request_timing import overhead_stats
+from .services.catalog import product_catalog
+from .services.prefetcher import prefetcher
+from .services.popularity import PopularityTracker
+from .agents.base_agent import persistence_stats, stream_stats_snapshot
+from .agents.registry import agent_pool, get_retailer_config
+from .utils.normalization import normalize_stats, shutdown_normalize_executor
+from .utils.html_parsing import parse_stats_snapshot, shutdown_parse_executor
+from .utils.query_canonicalizer import canonicalizer_stats
+from .utils.responses import negotiated_response
+from .models.schemas import SearchRequest, SearchResponse, BasketRequest, BasketResponse, Product, RetailerConfig, RetailerStatus
 
 app = FastAPI(
     title="Waffar Shokran - Egyptian Price Comparison API",
     description="AI-powered price comparison across Egyptian retailers",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 app.add_middleware(
@@ -29,15 +51,35 @@ app.add_middleware(
 # Redis connection
 redis_client = None
 
+# Guards the retailer admin endpoints; they are disabled when unset
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY", "")
+
 @app.on_event("startup")
 async def startup_event():
     global redis_client
     redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
     redis_client = redis.from_url(redis_url, decode_responses=True)
     logger.info("Connected to Redis")
+    
+    from .agents.registry import EGYPTIAN_RETAILERS
+    http_client_pool.open(EGYPTIAN_RETAILERS)
+    # One long-lived agent per retailer, reused by every search in this worker
+    agent_pool.start(redis_client)
+    await agent_pool.sync(force=True)
+    await product_catalog.start()
+    # Keeps hot queries cached; only the worker holding the leader lease does any work
+    prefetcher.start(redis_client)
+    # Pre-resolve and pre-connect to retailers; /health reports warming until done
+    connection_warmer.start(EGYPTIAN_RETAILERS)
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await connection_warmer.stop()
+    await prefetcher.stop()
+    await http_client_pool.close()
+    await product_catalog.stop()
+    shutdown_normalize_executor()
+    shutdown_parse_executor()
     if redis_client:
         await redis_client.close()
 
@@ -47,13 +89,19 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    if not connection_warmer.ready.is_set():
+        return JSONResponse(
+            status_code=503,
+            content={"status": "warming", "timestamp": datetime.now().isoformat()}
+        )
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
 @app.post("/search", response_model=SearchResponse)
-async def search_products(request: SearchRequest):
+async def search_products(request: SearchRequest, accept: Optional[str] = Header(None)):
     """
     Search for products across Egyptian retailers
-    Returns price comparison results in under 3 seconds
+    Returns price comparison results in under 3 seconds, as JSON or, with
+    Accept: application/msgpack, as msgpack
     """
     try:
         request_id = str(uuid.uuid4())
@@ -66,17 +114,21 @@ async def search_products(request: SearchRequest):
         results = await orchestrator.search_products(
             query=request.query,
             language=request.language,
-            max_results=request.max_results
+            max_results=request.max_results,
+            sort=request.sort
         )
         
-        return SearchResponse(
+        # Products were validated when scraped and normalized; don't check them again
+        response = SearchResponse.model_construct(
             request_id=request_id,
             query=request.query,
             products=results,
             total_results=len(results),
             search_time_ms=orchestrator.search_time_ms,
-            retailers_searched=orchestrator.retailers_searched
+            retailers_searched=orchestrator.retailers_searched,
+            error_retailers=orchestrator.error_retailers
         )
+        return negotiated_response(response, accept)
         
     except asyncio.TimeoutError:
         raise HTTPException(
@@ -87,11 +139,124 @@ async def search_products(request: SearchRequest):
         logger.error(f"Search error: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal search error")
 
+@app.post("/search/stream")
+async def search_products_stream(request: SearchRequest):
+    """
+    Stream search results as newline-delimited JSON
+    Emits one "retailer" event per retailer as soon as its results are ready,
+    then a "summary" event with the same payload as POST /search
+    """
+    request_id = str(uuid.uuid4())
+    logger.info(f"Processing streaming search request {request_id}: {request.query}")
+    
+    orchestrator = SearchOrchestrator(redis_client, request_id)
+    
+    async def event_stream():
+        async for event in orchestrator.stream_search(
+            query=request.query,
+            language=request.language,
+            max_results=request.max_results,
+            sort=request.sort
+        ):
+            yield orjson.dumps(event) + b"\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="application/x-ndjson",
+        headers={"X-Request-ID": request_id, "Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/basket", response_model=BasketResponse)
+async def optimize_basket(request: BasketRequest, accept: Optional[str] = Header(None)):
+    """
+    Price a whole shopping list across retailers
+    Returns the cheapest single-retailer plan and the cheapest plan split
+    across at most max_stores retailers, delivery fees included; JSON or msgpack.
+    Built-in retailers have no delivery fee until one is set with
+    PUT /retailers/{name}, so by default the split plan only weighs prices.
+    """
+    try:
+        request_id = str(uuid.uuid4())
+        logger.info(f"Processing basket request {request_id}: {len(request.items)} items")
+        return negotiated_response(await BasketOptimizer(redis_client, request_id).optimize(request), accept)
+        
+    except Exception as e:
+        logger.error(f"Basket error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal basket error")
+
+@app.get("/metrics")
+async def get_metrics():
+    """Per-worker performance counters for tuning cache TTLs and timeouts"""
+    queries = canonicalizer_stats()
+    try:
+        # Deployment-wide distinct-query counts, to see what canonicalization saves
+        queries.update(await PopularityTracker(redis_client).cardinality())
+    except Exception as e:
+        logger.warning(f"Query cardinality lookup failed: {e}")
+    return {
+        "pid": os.getpid(),
+        "search_cache": cache_stats.snapshot(),
+        "single_flight": single_flight_stats.snapshot(),
+        "http_pool": http_client_pool.snapshot(),
+        "warmup": connection_warmer.snapshot(),
+        "redis_persistence": persistence_stats.snapshot(),
+        "deadlines": deadline_stats.snapshot(),
+        "hedging": request_hedger.snapshot(),
+        "circuit_breakers": circuit_stats.snapshot(),
+        "normalization": normalize_stats.snapshot(),
+        "parsing": parse_stats_snapshot(),
+        "streaming_fetch": stream_stats_snapshot(),
+        "orchestration": overhead_stats.snapshot(),
+        "catalog": product_catalog.snapshot(),
+        "prefetch": prefetcher.stats.snapshot(),
+        "queries": queries
+    }
+
 @app.get("/retailers")
 async def get_supported_retailers():
     """Get list of supported Egyptian retailers"""
     from .agents.registry import get_available_retailers
-    return {"retailers": get_available_retailers()}
+    await agent_pool.sync()
+    circuit_states = await CircuitBreaker(redis_client).get_states(agent_pool.configs())
+    return {"retailers": get_available_retailers(circuit_states)}
+
+def _require_admin(admin_key: Optional[str]):
+    # Constant-time comparison so response timing doesn't reveal how much of a guess matched
+    if not ADMIN_API_KEY or not admin_key or not hmac.compare_digest(admin_key.encode("utf-8"), ADMIN_API_KEY.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Admin key required")
+
+@app.put("/retailers/{name}")
+async def put_retailer(name: str, config: RetailerConfig, x_admin_key: Optional[str] = Header(None)):
+    """
+    Add or reconfigure a retailer at runtime
+    Every worker picks the change up within a few seconds; only that retailer's agent is rebuilt
+    """
+    _require_admin(x_admin_key)
+    if config.name != name:
+        raise HTTPException(status_code=400, detail="Config name does not match the URL")
+    if config.selectors is None:
+        raise HTTPException(status_code=400, detail="Retailers need selectors")
+    await agent_pool.set_config(config)
+    return {"retailer": name, "status": agent_pool.status(config).value}
+
+async def _set_retailer_status(name: str, status: RetailerStatus, admin_key: Optional[str]):
+    _require_admin(admin_key)
+    try:
+        get_retailer_config(name)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Unknown retailer")
+    await agent_pool.set_status(name, status)
+    return {"retailer": name, "status": status.value}
+
+@app.post("/retailers/{name}/enable")
+async def enable_retailer(name: str, x_admin_key: Optional[str] = Header(None)):
+    """Put a retailer back into rotation on every worker"""
+    return await _set_retailer_status(name, RetailerStatus.ACTIVE, x_admin_key)
+
+@app.post("/retailers/{name}/disable")
+async def disable_retailer(name: str, x_admin_key: Optional[str] = Header(None)):
+    """Take a retailer out of rotation on every worker without a redeploy"""
+    return await _set_retailer_status(name, RetailerStatus.INACTIVE, x_admin_key)
 
 if __name__ == "__main__":
     import uvicorn
@@ -16,6 +16,11 @@ class RetailerStatus(str, Enum):
     INACTIVE = "inactive"
     ERROR = "error"
 
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
 class WeightUnit(str, Enum):
     GRAM = "g"
     KILOGRAM = "kg"
@@ -24,6 +29,22 @@ class WeightUnit(str, Enum):
     PIECE = "pc"
     PACK = "pack"
 
+class SortOrder(str, Enum):
+    RELEVANCE = "relevance"
+    UNIT_PRICE = "unit_price"
+
+class Offer(BaseModel):
+    """Another retailer's listing of a grouped product"""
+    retailer: str = Field(..., description="Retailer name")
+    name: str = Field(..., description="Product name as listed by this retailer")
+    price: float = Field(..., gt=0, description="Price in EGP")
+    url: str = Field(..., description="Product URL at retailer")
+    image_url: Optional[str] = Field(None, description="Product image URL")
+    in_stock: bool = Field(default=True, description="Availability at this retailer")
+    price_per_unit: Optional[float] = Field(None, description="Price per standard unit (per 100g/ml)")
+    unit_price: Optional[float] = Field(None, description="Price per unit_price_unit, in unit-price searches")
+    unit_price_unit: Optional[WeightUnit] = Field(None, description="kg, l or pc")
+
 class Product(BaseModel):
     name: str = Field(..., description="Product name in original language")
     name_ar: Optional[str] = Field(None, description="Product name in Arabic")
@@ -38,6 +59,7 @@ class Product(BaseModel):
     # Product specifications
     weight: Optional[float] = Field(None, description="Product weight/volume")
     weight_unit: Optional[WeightUnit] = Field(None, description="Weight unit")
+    pack_count: Optional[int] = Field(None, ge=2, description="Number of items in a multipack")
     brand: Optional[str] = Field(None, description="Product brand")
     category: Optional[str] = Field(None, description="Product category")
     
@@ -54,6 +76,13 @@ class Product(BaseModel):
     scraped_at: datetime = Field(default_factory=datetime.now)
     confidence_score: float = Field(default=1.0, ge=0, le=1, description="Matching confidence")
     
+    # Comparable price across pack sizes, set when searching with sort=unit_price
+    unit_price: Optional[float] = Field(None, description="Price per unit_price_unit, multipacks included")
+    unit_price_unit: Optional[WeightUnit] = Field(None, description="kg, l or pc")
+    
+    # Cross-retailer grouping
+    offers: List[Offer] = Field(default_factory=list, description="Equivalent listings at other retailers, cheapest first")
+    
     class Config:
         json_encoders = {
             datetime: lambda v: v.isoformat()
@@ -63,6 +92,7 @@ class SearchRequest(BaseModel):
     query: str = Field(..., min_length=2, max_length=200, description="Product search query")
     language: Language = Field(default=Language.ARABIC, description="Preferred language")
     max_results: int = Field(default=50, ge=1, le=100, description="Maximum results to return")
+    sort: SortOrder = Field(default=SortOrder.RELEVANCE, description="relevance, or unit_price for the cheapest per kg/l/piece of each product")
     include_alternatives: bool = Field(default=True, description="Include similar products")
     min_price: Optional[float] = Field(None, ge=0, description="Minimum price filter")
     max_price: Optional[float] = Field(None, ge=0, description="Maximum price filter")
@@ -86,6 +116,54 @@ class SearchResponse(BaseModel):
     alternatives_included: bool = Field(default=False, description="Whether alternatives are included")
     error_retailers: List[str] = Field(default_factory=list, description="Retailers that failed")
     
+class BasketItem(BaseModel):
+    query: str = Field(..., min_length=2, max_length=200, description="Product search query")
+    quantity: int = Field(default=1, ge=1, le=99, description="Units to buy")
+    
+    @validator('query')
+    def validate_query(cls, v):
+        v = re.sub(r'\s+', ' ', v.strip())
+        if len(v) < 2:
+            raise ValueError('Query must be at least 2 characters long')
+        return v
+
+class BasketRequest(BaseModel):
+    items: List[BasketItem] = Field(..., min_length=1, max_length=50, description="Shopping list")
+    language: Language = Field(default=Language.ARABIC, description="Preferred language")
+    max_stores: int = Field(default=2, ge=1, le=5, description="Most retailers the basket may be split across")
+
+class BasketLine(BaseModel):
+    query: str = Field(..., description="Shopping list entry")
+    quantity: int = Field(..., description="Units to buy")
+    product: Optional[Product] = Field(None, description="Cheapest matching product at the assigned retailer; None if no retailer in the plan has one")
+    cost: float = Field(default=0.0, description="Price times quantity in EGP")
+
+class BasketPlan(BaseModel):
+    retailers: List[str] = Field(..., description="Retailers the basket is bought from")
+    lines: List[BasketLine] = Field(..., description="One line per shopping list entry, in list order")
+    items_cost: float = Field(..., description="Sum of line costs in EGP")
+    delivery_fees: float = Field(..., description="Delivery fees of the retailers used, in EGP; 0 for retailers whose fee is not configured")
+    total: float = Field(..., description="Items cost plus delivery fees in EGP")
+    missing_items: List[str] = Field(default_factory=list, description="Entries none of the plan's retailers carry")
+
+class BasketResponse(BaseModel):
+    request_id: str = Field(..., description="Unique request identifier")
+    single_store: Optional[BasketPlan] = Field(None, description="Cheapest plan buying everything from one retailer")
+    split: Optional[BasketPlan] = Field(None, description="Cheapest plan across at most max_stores retailers; without configured delivery fees, extra retailers cost nothing")
+    solver: str = Field(..., description="exact or greedy")
+    search_time_ms: int = Field(..., description="Total time in milliseconds")
+    retailers_searched: List[str] = Field(..., description="List of retailers searched")
+    error_retailers: List[str] = Field(default_factory=list, description="Retailers that failed for at least one item")
+    
+class SelectorConfig(BaseModel):
+    product: str = Field(..., description="CSS selector for each product container")
+    name: str = Field(..., description="Product name selector, relative to the container")
+    price: str = Field(..., description="Price selector, relative to the container")
+    image: Optional[str] = Field(default="img", description="Image element selector")
+    link: Optional[str] = Field(default="a", description="Product link selector")
+    brand: Optional[str] = Field(None, description="Brand selector")
+    image_attributes: List[str] = Field(default_factory=lambda: ["src", "data-src"], description="Image URL attributes, in order of preference")
+    
 class RetailerConfig(BaseModel):
     name: str = Field(..., description="Retailer name")
     name_ar: str = Field(..., description="Retailer name in Arabic")
@@ -98,6 +176,27 @@ class RetailerConfig(BaseModel):
     max_retries: int = Field(default=2, ge=0, le=5)
     requires_proxy: bool = Field(default=False)
     scraping_method: str = Field(default="firecrawl", description="firecrawl, playwright, or selenium")
+    max_connections: int = Field(default=10, ge=1, le=100, description="Pooled connections to this retailer")
+    max_keepalive_connections: int = Field(default=5, ge=0, le=100, description="Idle connections kept alive between searches")
+    keepalive_expiry_seconds: float = Field(default=60.0, ge=0, description="How long idle connections are kept")
+    http2: bool = Field(default=True, description="Negotiate HTTP/2 when the retailer supports it")
+    selectors: Optional[SelectorConfig] = Field(None, description="Declarative product extraction selectors")
+    structured_data: bool = Field(default=True, description="Try JSON-LD / hydration state before CSS selectors")
+    stream_fetch: bool = Field(default=True, description="Stream search pages and stop reading once enough products, and any structured data after them, have arrived")
+    max_response_bytes: int = Field(default=2_000_000, ge=65_536, description="Hard cap on bytes read per page")
+    html_parser: Optional[str] = Field(None, description="BeautifulSoup parser backend; defaults to HTML_PARSER (lxml)")
+    hedge_requests: bool = Field(default=False, description="Hedge slow requests with a second identical request")
+    hedge_max_ratio: float = Field(default=0.05, ge=0, le=0.5, description="Maximum fraction of requests that may be hedged")
+    cache_ttl_seconds: int = Field(default=300, ge=0, description="How long cached results stay fresh")
+    cache_stale_seconds: int = Field(default=900, ge=0, description="How long stale results may be served while refreshing")
+    circuit_window_seconds: int = Field(default=60, ge=1, description="Window over which circuit error and slow-call rates are measured")
+    circuit_min_calls: int = Field(default=10, ge=1, description="Calls needed in the window before the circuit can open")
+    circuit_error_threshold: float = Field(default=0.5, gt=0, le=1, description="Error rate that opens the circuit")
+    circuit_slow_call_ms: int = Field(default=2500, ge=1, description="Response time above which a call counts as slow")
+    circuit_slow_call_threshold: float = Field(default=0.8, gt=0, le=1, description="Slow-call rate that opens the circuit")
+    circuit_cooldown_seconds: int = Field(default=30, ge=1, description="How long an open circuit waits before a probe request")
+    rate_limit_per_minute: int = Field(default=30, ge=1, description="Requests per minute the retailer tolerates; background prefetching stays under it")
+    delivery_fee: float = Field(default=0.0, ge=0, description="Delivery fee in EGP charged once per order; counted by basket optimization. Unset (0) for the built-in retailers until configured")
     
 class ScrapingResult(BaseModel):
     retailer: str
@@ -105,4 +204,5 @@ class ScrapingResult(BaseModel):
     success: bool
     error_message: Optional[str] = None
     response_time_ms: int
-    products_found: int
\ No newline at end of file
+    products_found: int
+    redis_time_ms: int = 0
\ No newline at end of file
@@ -0,0 +1,115 @@
+import os
+import time
+from typing import Dict, List, Optional
+import numpy as np
+from loguru import logger
+import redis.asyncio as redis
+
+from ..models.schemas import BasketLine, BasketPlan, BasketRequest, BasketResponse, Product, ScrapingResult
+from ..agents.registry import get_retailer_config
+from ..utils.basket_solver import BasketSolution, solve
+from ..utils.ranking import featurize, query_terms
+from .orchestrator import SearchOrchestrator
+
+# Scrapes in flight at once for one basket, across all items and retailers
+BASKET_MAX_CONCURRENCY = int(os.getenv("BASKET_MAX_CONCURRENCY", "24"))
+
+# Results requested per item, spread over the retailers like a search's max_results
+BASKET_RESULTS_PER_ITEM = 50
+
+
+def cheapest_matches(query: str, results: List[ScrapingResult]) -> Dict[str, Product]:
+    """
+    Cheapest in-stock product per retailer among the best matches for a query
+    Products must contain every query term; if none does, those matching the
+    most terms are used.
+    """
+    products = [product for result in results if result.success for product in result.products if product.in_stock]
+    terms = query_terms(query)
+    if not products:
+        return {}
+    if terms:
+        matched = np.count_nonzero(featurize(products, terms).term_frequencies, axis=1)
+        if not matched.max():
+            return {}
+        products = [product for product, count in zip(products, matched) if count == matched.max()]
+
+    cheapest: Dict[str, Product] = {}
+    for product in products:
+        if product.retailer not in cheapest or product.price < cheapest[product.retailer].price:
+            cheapest[product.retailer] = product
+    return cheapest
+
+
+class BasketOptimizer:
+    """
+    Finds the cheapest way to buy a shopping list across retailers
+    Every item is looked up at every retailer in one shared fetch, then two
+    plans are solved over the (item, retailer) cost matrix: everything from one
+    retailer, and split across at most max_stores retailers, delivery fees
+    included. Retailers without a configured delivery_fee count as free to add.
+    """
+
+    def __init__(self, redis_client: redis.Redis, request_id: str):
+        self.redis_client = redis_client
+        self.request_id = request_id
+
+    async def optimize(self, request: BasketRequest) -> BasketResponse:
+        start_time = time.time()
+        orchestrator = SearchOrchestrator(self.redis_client, self.request_id)
+        queries = [item.query for item in request.items]
+        item_results = await orchestrator.fetch_items(queries, request.language, BASKET_RESULTS_PER_ITEM, BASKET_MAX_CONCURRENCY)
+
+        solve_start = time.perf_counter()
+        retailers = orchestrator.retailers_searched
+        matches = [cheapest_matches(query, results) for query, results in zip(queries, item_results)]
+        costs = np.full((len(queries), len(retailers)), np.inf)
+        for i, (item, item_matches) in enumerate(zip(request.items, matches)):
+            for j, retailer in enumerate(retailers):
+                if retailer in item_matches:
+                    costs[i, j] = item_matches[retailer].price * item.quantity
+        fees = np.array([get_retailer_config(retailer).delivery_fee for retailer in retailers], dtype=np.float64)
+
+        single_store = split = None
+        solver = "exact"
+        if retailers:
+            single_store = self._plan(solve(costs, fees, 1)[0], request, matches, retailers)
+            if request.max_stores > 1:
+                solution, solver = solve(costs, fees, request.max_stores)
+                split = self._plan(solution, request, matches, retailers)
+        solve_ms = (time.perf_counter() - solve_start) * 1000
+
+        search_time_ms = int((time.time() - start_time) * 1000)
+        logger.info(
+            f"Basket of {len(queries)} items over {len(retailers)} retailers in {search_time_ms}ms "
+            f"({solver} solve {solve_ms:.1f}ms)"
+        )
+        return BasketResponse.model_construct(
+            request_id=self.request_id,
+            single_store=single_store,
+            split=split,
+            solver=solver,
+            search_time_ms=search_time_ms,
+            retailers_searched=retailers,
+            error_retailers=orchestrator.error_retailers
+        )
+
+    @staticmethod
+    def _plan(solution: BasketSolution, request: BasketRequest, matches: List[Dict[str, Product]], retailers: List[str]) -> BasketPlan:
+        lines = []
+        for item, item_matches, store in zip(request.items, matches, solution.assignment):
+            product: Optional[Product] = item_matches[retailers[store]] if store >= 0 else None
+            lines.append(BasketLine.model_construct(
+                query=item.query,
+                quantity=item.quantity,
+                product=product,
+                cost=round(product.price * item.quantity, 2) if product else 0.0
+            ))
+        return BasketPlan.model_construct(
+            retailers=[retailers[store] for store in solution.stores],
+            lines=lines,
+            items_cost=round(solution.items_cost, 2),
+            delivery_fees=round(solution.fees, 2),
+            total=round(solution.total, 2),
+            missing_items=[line.query for line in lines if line.product is None]
+        )
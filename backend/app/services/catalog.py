@@ -0,0 +1,268 @@
+import asyncio
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+
+from ..models.schemas import Product
+from ..utils.arabic import tokenize
+from ..utils.query_canonicalizer import canonical_tokens
+
+# SQLite file shared by every worker on the host; empty disables the catalog
+CATALOG_PATH = os.getenv("CATALOG_PATH", "data/catalog.db")
+
+# Products seen within this window answer searches without a live scrape
+CATALOG_FRESH_SECONDS = int(os.getenv("CATALOG_FRESH_SECONDS", "900"))
+
+# Write-behind batching: flush when this many rows are queued or after this long
+CATALOG_BATCH_SIZE = int(os.getenv("CATALOG_BATCH_SIZE", "500"))
+CATALOG_FLUSH_SECONDS = float(os.getenv("CATALOG_FLUSH_SECONDS", "1"))
+
+# Rows queued beyond this are dropped rather than letting a stuck disk grow memory
+CATALOG_MAX_PENDING = 20000
+
+# A retailer is answered from the catalog only with at least this many fresh matches
+CATALOG_MIN_RESULTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    retailer TEXT NOT NULL,
+    key TEXT NOT NULL,
+    price REAL NOT NULL,
+    search_text TEXT NOT NULL,
+    data TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    UNIQUE (retailer, key)
+);
+CREATE INDEX IF NOT EXISTS products_last_seen ON products (last_seen);
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+    search_text, content='products', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS products_ai AFTER INSERT ON products BEGIN
+    INSERT INTO products_fts (rowid, search_text) VALUES (new.id, new.search_text);
+END;
+CREATE TRIGGER IF NOT EXISTS products_ad AFTER DELETE ON products BEGIN
+    INSERT INTO products_fts (products_fts, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+END;
+CREATE TRIGGER IF NOT EXISTS products_au AFTER UPDATE OF search_text ON products
+WHEN old.search_text IS NOT new.search_text BEGIN
+    INSERT INTO products_fts (products_fts, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+    INSERT INTO products_fts (rowid, search_text) VALUES (new.id, new.search_text);
+END;
+"""
+
+# Price-only refreshes leave the full-text index untouched (see products_au)
+UPSERT_SQL = """
+INSERT INTO products (retailer, key, price, search_text, data, first_seen, last_seen)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (retailer, key) DO UPDATE SET
+    price = excluded.price,
+    search_text = excluded.search_text,
+    data = excluded.data,
+    last_seen = excluded.last_seen
+WHERE excluded.last_seen >= products.last_seen
+"""
+
+# Best matches per retailer; bm25 is only available directly over the FTS table
+SEARCH_SQL = """
+SELECT retailer, data FROM (
+    SELECT retailer, data, ROW_NUMBER() OVER (PARTITION BY retailer ORDER BY score) AS position
+    FROM (
+        SELECT p.retailer, p.data, bm25(products_fts) AS score
+        FROM products_fts JOIN products p ON p.id = products_fts.rowid
+        WHERE products_fts MATCH ? AND p.last_seen >= ? AND p.retailer IN ({placeholders})
+    )
+)
+WHERE position <= ?
+ORDER BY retailer, position
+"""
+
+Row = Tuple[str, str, float, str, str, float, float]
+
+
+class CatalogStats:
+    """Per-process catalog counters exposed through /metrics"""
+
+    def __init__(self):
+        self.queued = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.flush_failures = 0
+        self.rows_written = 0
+        self.max_flush_ms = 0.0
+        self.searches = 0
+        self.retailers_served = 0
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "queued": self.queued,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "flush_failures": self.flush_failures,
+            "rows_written": self.rows_written,
+            "max_flush_ms": round(self.max_flush_ms, 2),
+            "searches": self.searches,
+            "retailers_served": self.retailers_served,
+        }
+
+
+class ProductCatalog:
+    """
+    Persistent full-text catalog of every product the agents have scraped
+    Products are keyed by retailer and URL and carry the price and time they
+    were last seen. Writes are queued and flushed in batches on a dedicated
+    thread, so indexing never adds latency to a search; reads use their own
+    connection and, with WAL, never wait on a flush.
+    """
+
+    def __init__(self, path: str = CATALOG_PATH):
+        self.path = path
+        self.stats = CatalogStats()
+        self._writer: Optional[sqlite3.Connection] = None
+        self._reader: Optional[sqlite3.Connection] = None
+        self._write_executor: Optional[ThreadPoolExecutor] = None
+        self._read_executor: Optional[ThreadPoolExecutor] = None
+        self._pending: List[Row] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._reader is not None
+
+    async def start(self):
+        """Open the catalog and start the write-behind flusher; failures leave it disabled"""
+        if not self.path:
+            return
+        loop = asyncio.get_running_loop()
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="catalog-write")
+        self._read_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="catalog-read")
+        try:
+            self._writer = await loop.run_in_executor(self._write_executor, self._connect, True)
+            self._reader = await loop.run_in_executor(self._read_executor, self._connect, False)
+        except sqlite3.Error as e:
+            logger.warning(f"Product catalog unavailable at {self.path}: {e}")
+            self._shutdown_executors()
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._flush_loop())
+        logger.info(f"Product catalog opened at {self.path}")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            await self.flush()
+        for connection, executor in ((self._writer, self._write_executor), (self._reader, self._read_executor)):
+            if connection is not None:
+                await asyncio.get_running_loop().run_in_executor(executor, connection.close)
+        self._writer = self._reader = None
+        self._shutdown_executors()
+
+    def _shutdown_executors(self):
+        for executor in (self._write_executor, self._read_executor):
+            if executor is not None:
+                executor.shutdown(wait=False)
+        self._write_executor = self._read_executor = None
+
+    def _connect(self, writer: bool) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        if writer:
+            connection.executescript(SCHEMA)
+        else:
+            connection.execute("PRAGMA query_only=ON")
+        return connection
+
+    def add(self, products: List[Product]):
+        """Queue products for the next batched upsert; never blocks"""
+        if not self.enabled or not products:
+            return
+        if len(self._pending) + len(products) > CATALOG_MAX_PENDING:
+            self.stats.dropped += len(products)
+            return
+        now = time.time()
+        for product in products:
+            text = " ".join(tokenize(f"{product.name} {product.brand or ''}"))
+            if text:
+                self._pending.append((
+                    product.retailer, product.url or product.name, product.price,
+                    text, product.model_dump_json(), now, now
+                ))
+        self.stats.queued += len(products)
+        if len(self._pending) >= CATALOG_BATCH_SIZE:
+            self._wakeup.set()
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=CATALOG_FLUSH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Upsert every queued row in one transaction"""
+        if not self._pending or self._writer is None:
+            return
+        rows, self._pending = self._pending, []
+        start = time.perf_counter()
+        try:
+            await asyncio.get_running_loop().run_in_executor(self._write_executor, self._upsert, rows)
+        except sqlite3.Error as e:
+            self.stats.flush_failures += 1
+            logger.warning(f"Failed to write {len(rows)} products to the catalog: {e}")
+            return
+        self.stats.flushes += 1
+        self.stats.rows_written += len(rows)
+        self.stats.max_flush_ms = max(self.stats.max_flush_ms, (time.perf_counter() - start) * 1000)
+
+    def _upsert(self, rows: List[Row]):
+        with self._writer:
+            self._writer.execute("BEGIN")
+            self._writer.executemany(UPSERT_SQL, rows)
+
+    async def search(self, query: str, retailers: List[str], limit: int, max_age: float = CATALOG_FRESH_SECONDS) -> Dict[str, List[Product]]:
+        """
+        Best fresh matches for a query, up to limit per retailer
+        Every canonical query token must match, as a prefix of a product token;
+        products not seen within max_age are ignored.
+        """
+        tokens = canonical_tokens(query)
+        if not self.enabled or not tokens or not retailers or limit <= 0:
+            return {}
+        self.stats.searches += 1
+        match = " ".join(f'"{token}"*' for token in tokens)
+        try:
+            rows = await asyncio.get_running_loop().run_in_executor(
+                self._read_executor, self._search, match, retailers, limit, time.time() - max_age
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Catalog search failed: {e}")
+            return {}
+        results: Dict[str, List[Product]] = {}
+        for retailer, data in rows:
+            results.setdefault(retailer, []).append(Product.model_validate_json(data))
+        return results
+
+    def _search(self, match: str, retailers: List[str], limit: int, since: float) -> List[Tuple[str, str]]:
+        sql = SEARCH_SQL.format(placeholders=", ".join("?" * len(retailers)))
+        return self._reader.execute(sql, (match, since, *retailers, limit)).fetchall()
+
+    def snapshot(self) -> Dict[str, float]:
+        return {"enabled": self.enabled, "pending": len(self._pending), **self.stats.snapshot()}
+
+
+product_catalog = ProductCatalog()
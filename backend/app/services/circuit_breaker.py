@@ -0,0 +1,181 @@
+import time
+from typing import Dict, List, Tuple
+from loguru import logger
+import redis.asyncio as redis
+
+from ..models.schemas import CircuitState, RetailerConfig
+
+CIRCUIT_KEY_PREFIX = "circuit"
+
+# Records one call outcome and applies state transitions atomically.
+# A circuit stays "open" in Redis until its cooldown has passed; after that it is
+# half-open and the next recorded outcome (the probe) closes or re-opens it.
+RECORD_SCRIPT = """
+local now = tonumber(ARGV[3])
+local cooldown = tonumber(ARGV[5])
+local state = redis.call('hget', KEYS[1], 'state') or 'closed'
+
+if state == 'open' then
+    local opened_at = tonumber(redis.call('hget', KEYS[1], 'opened_at') or '0')
+    if now - opened_at < cooldown then
+        return 'open'
+    end
+    redis.call('del', KEYS[4])
+    if ARGV[1] == '1' and ARGV[2] == '0' then
+        redis.call('hset', KEYS[1], 'state', 'closed', 'changed_at', ARGV[3])
+        redis.call('del', KEYS[2], KEYS[3])
+        return 'closed'
+    end
+    redis.call('hset', KEYS[1], 'state', 'open', 'opened_at', ARGV[3], 'changed_at', ARGV[3])
+    return 'open'
+end
+
+local window = tonumber(ARGV[4])
+redis.call('hincrby', KEYS[2], 'total', 1)
+if ARGV[1] == '0' then redis.call('hincrby', KEYS[2], 'errors', 1) end
+if ARGV[2] == '1' then redis.call('hincrby', KEYS[2], 'slow', 1) end
+redis.call('expire', KEYS[2], window * 2)
+
+local total, errors, slow = 0, 0, 0
+for i = 2, 3 do
+    local counts = redis.call('hmget', KEYS[i], 'total', 'errors', 'slow')
+    total = total + tonumber(counts[1] or '0')
+    errors = errors + tonumber(counts[2] or '0')
+    slow = slow + tonumber(counts[3] or '0')
+end
+
+if total >= tonumber(ARGV[6]) and (errors / total >= tonumber(ARGV[7]) or slow / total >= tonumber(ARGV[8])) then
+    redis.call('hset', KEYS[1], 'state', 'open', 'opened_at', ARGV[3], 'changed_at', ARGV[3])
+    redis.call('del', KEYS[2], KEYS[3])
+    return 'open'
+end
+return 'closed'
+"""
+
+
+class CircuitStats:
+    """Per-process breaker counters exposed through /metrics"""
+
+    def __init__(self):
+        self.skipped_calls = 0
+        self.probes = 0
+        self.opened = 0
+        self.closed = 0
+        self.states: Dict[str, CircuitState] = {}
+
+    def snapshot(self) -> Dict:
+        return {
+            "skipped_calls": self.skipped_calls,
+            "probes": self.probes,
+            "opened": self.opened,
+            "closed": self.closed,
+            "states": {name: state.value for name, state in self.states.items()},
+        }
+
+
+circuit_stats = CircuitStats()
+
+
+class CircuitBreaker:
+    """
+    Per-retailer circuit breakers with state shared by all workers in Redis
+    A circuit opens when the error rate or slow-call rate over the recent window
+    crosses the retailer's thresholds. While open the retailer is skipped
+    entirely; after the cooldown a single probe request is let through and its
+    outcome closes the circuit again or restarts the cooldown.
+    """
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis_client = redis_client
+
+    @staticmethod
+    def _state_key(retailer: str) -> str:
+        return f"{CIRCUIT_KEY_PREFIX}:{retailer}"
+
+    async def get_states(self, configs: List[RetailerConfig]) -> Dict[str, CircuitState]:
+        """Current circuit state per retailer, in one round trip"""
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for config in configs:
+                pipe.hmget(self._state_key(config.name), "state", "opened_at")
+            rows = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to read circuit states, treating all as closed: {e}")
+            return {config.name: CircuitState.CLOSED for config in configs}
+
+        now = time.time()
+        states = {}
+        for config, (state, opened_at) in zip(configs, rows):
+            if state != CircuitState.OPEN.value:
+                states[config.name] = CircuitState.CLOSED
+            elif now - float(opened_at or 0) >= config.circuit_cooldown_seconds:
+                states[config.name] = CircuitState.HALF_OPEN
+            else:
+                states[config.name] = CircuitState.OPEN
+        circuit_stats.states.update(states)
+        return states
+
+    async def filter_available(self, configs: List[RetailerConfig]) -> Tuple[List[RetailerConfig], List[str]]:
+        """
+        Split retailers into those that may be called now and those whose circuit is open
+        A half-open retailer is only available to the caller that wins its probe slot
+        """
+        states = await self.get_states(configs)
+        available, skipped = [], []
+        for config in configs:
+            state = states[config.name]
+            if state == CircuitState.HALF_OPEN and await self._acquire_probe(config):
+                circuit_stats.probes += 1
+                available.append(config)
+            elif state == CircuitState.CLOSED:
+                available.append(config)
+            else:
+                circuit_stats.skipped_calls += 1
+                skipped.append(config.name)
+        return available, skipped
+
+    async def _acquire_probe(self, config: RetailerConfig) -> bool:
+        try:
+            return bool(await self.redis_client.set(
+                f"{self._state_key(config.name)}:probe", "1", nx=True, ex=config.timeout_seconds
+            ))
+        except Exception as e:
+            logger.warning(f"[{config.name}] Failed to acquire circuit probe: {e}")
+            return False
+
+    async def record(self, config: RetailerConfig, success: bool, response_time_ms: int):
+        """Record a call outcome and open or close the circuit as needed"""
+        now = time.time()
+        bucket = int(now // config.circuit_window_seconds)
+        state_key = self._state_key(config.name)
+        slow = response_time_ms >= config.circuit_slow_call_ms
+        try:
+            new_state = await self.redis_client.eval(
+                RECORD_SCRIPT,
+                4,
+                state_key,
+                f"{state_key}:window:{bucket}",
+                f"{state_key}:window:{bucket - 1}",
+                f"{state_key}:probe",
+                "1" if success else "0",
+                "1" if slow else "0",
+                str(now),
+                config.circuit_window_seconds,
+                config.circuit_cooldown_seconds,
+                config.circuit_min_calls,
+                config.circuit_error_threshold,
+                config.circuit_slow_call_threshold
+            )
+        except Exception as e:
+            logger.warning(f"[{config.name}] Failed to record circuit outcome: {e}")
+            return
+
+        previous = circuit_stats.states.get(config.name, CircuitState.CLOSED)
+        state = CircuitState(new_state)
+        if state == CircuitState.OPEN and previous == CircuitState.CLOSED:
+            circuit_stats.opened += 1
+            logger.warning(f"[{config.name}] Circuit opened")
+        elif state == CircuitState.CLOSED and previous != CircuitState.CLOSED:
+            circuit_stats.closed += 1
+            logger.info(f"[{config.name}] Circuit closed")
+        circuit_stats.states[config.name] = state
@@ -0,0 +1,181 @@
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from pydantic import BaseModel
+from loguru import logger
+import redis.asyncio as redis
+
+from ..models.schemas import RetailerConfig
+
+LATENCY_KEY_PREFIX = "latency"
+LATENCY_SAMPLES = 200
+LATENCY_TTL_SECONDS = 24 * 3600
+
+# How long a worker reuses percentiles before reading them from Redis again
+LATENCY_REFRESH_SECONDS = 5.0
+
+# Latency assumed for retailers without history yet
+DEFAULT_EXPECTED_SECONDS = 1.0
+
+RETRY_BACKOFF_SECONDS = 0.1
+
+# The budget of the agent search running in the current task
+current_budget: ContextVar[Optional["AgentBudget"]] = ContextVar("current_budget", default=None)
+
+# Per-process percentile cache: key -> (percentiles, monotonic load time)
+_percentile_cache: Dict[str, Tuple["LatencyPercentiles", float]] = {}
+
+
+class LatencyPercentiles(BaseModel):
+    samples: int = 0
+    p50_ms: Optional[float] = None
+    p90_ms: Optional[float] = None
+    p99_ms: Optional[float] = None
+
+
+class AgentBudget(BaseModel):
+    """Time budget and retry allowance for one agent search"""
+    retailer: str
+    deadline: float  # time.monotonic() value the search must finish by
+    max_attempts: int
+    expected_seconds: float
+    latency: LatencyPercentiles
+
+    def remaining(self) -> float:
+        return self.deadline - time.monotonic()
+
+    def attempt_timeout(self, config: RetailerConfig) -> float:
+        """Timeout for the next attempt: never past the request deadline"""
+        return max(0.0, min(float(config.timeout_seconds), self.remaining()))
+
+    def can_retry(self, attempt: int) -> bool:
+        """Whether another attempt can realistically finish before the deadline"""
+        if attempt >= self.max_attempts:
+            return False
+        fits = self.remaining() >= self.expected_seconds + RETRY_BACKOFF_SECONDS * attempt
+        if fits:
+            deadline_stats.retries_allowed += 1
+        else:
+            deadline_stats.retries_skipped += 1
+        return fits
+
+
+class DeadlineStats:
+    """Per-process scheduling counters exposed through /metrics"""
+
+    def __init__(self):
+        self.budgets_planned = 0
+        self.retries_allowed = 0
+        self.retries_skipped = 0
+        self.percentiles: Dict[str, Dict[str, LatencyPercentiles]] = {}
+
+    def snapshot(self) -> Dict:
+        return {
+            "budgets_planned": self.budgets_planned,
+            "retries_allowed": self.retries_allowed,
+            "retries_skipped": self.retries_skipped,
+            "latency": {
+                retailer: {kind: percentiles.model_dump() for kind, percentiles in kinds.items()}
+                for retailer, kinds in self.percentiles.items()
+            }
+        }
+
+
+deadline_stats = DeadlineStats()
+
+
+def _percentile(sorted_samples: List[float], fraction: float) -> float:
+    index = min(len(sorted_samples) - 1, int(round(fraction * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+class LatencyTracker:
+    """
+    Rolling per-retailer latency samples kept in Redis so all workers share them
+    Samples are written on the agents' persistence pipeline; percentiles are
+    read back in one round trip and cached briefly in each worker.
+    """
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis_client = redis_client
+
+    @staticmethod
+    def _key(retailer: str, kind: str) -> str:
+        return f"{LATENCY_KEY_PREFIX}:{retailer}:{kind}"
+
+    def add_to_pipeline(self, pipe, retailer: str, kind: str, latency_ms: float):
+        """Queue a latency sample on an existing pipeline"""
+        key = self._key(retailer, kind)
+        pipe.lpush(key, int(latency_ms))
+        pipe.ltrim(key, 0, LATENCY_SAMPLES - 1)
+        pipe.expire(key, LATENCY_TTL_SECONDS)
+
+    async def get_percentiles(self, retailers: List[str], kind: str) -> Dict[str, LatencyPercentiles]:
+        """Percentiles for each retailer, refreshed from Redis at most every few seconds"""
+        now = time.monotonic()
+        stale = [
+            name for name in retailers
+            if self._key(name, kind) not in _percentile_cache
+            or now - _percentile_cache[self._key(name, kind)][1] > LATENCY_REFRESH_SECONDS
+        ]
+
+        if stale:
+            try:
+                pipe = self.redis_client.pipeline(transaction=False)
+                for name in stale:
+                    pipe.lrange(self._key(name, kind), 0, LATENCY_SAMPLES - 1)
+                sample_lists = await pipe.execute()
+                for name, samples in zip(stale, sample_lists):
+                    percentiles = self._summarize(samples)
+                    _percentile_cache[self._key(name, kind)] = (percentiles, now)
+                    deadline_stats.percentiles.setdefault(name, {})[kind] = percentiles
+            except Exception as e:
+                logger.warning(f"Failed to load latency history: {e}")
+
+        return {
+            name: _percentile_cache[self._key(name, kind)][0] if self._key(name, kind) in _percentile_cache else LatencyPercentiles()
+            for name in retailers
+        }
+
+    @staticmethod
+    def _summarize(samples: List[str]) -> LatencyPercentiles:
+        values = sorted(float(sample) for sample in samples)
+        if not values:
+            return LatencyPercentiles()
+        return LatencyPercentiles(
+            samples=len(values),
+            p50_ms=_percentile(values, 0.5),
+            p90_ms=_percentile(values, 0.9),
+            p99_ms=_percentile(values, 0.99)
+        )
+
+
+class DeadlineScheduler:
+    """
+    Derives each agent's time budget from the remaining request deadline
+    An agent gets as many attempts as its observed median latency allows before
+    the deadline, capped by RetailerConfig.max_retries; a retry that cannot
+    finish in time is skipped rather than cancelled halfway.
+    """
+
+    def __init__(self, redis_client: redis.Redis):
+        self.latency_tracker = LatencyTracker(redis_client)
+
+    async def plan(self, configs: List[RetailerConfig], deadline: float) -> Dict[str, AgentBudget]:
+        percentiles = await self.latency_tracker.get_percentiles([config.name for config in configs], "search")
+        remaining = deadline - time.monotonic()
+
+        budgets = {}
+        for config in configs:
+            latency = percentiles[config.name]
+            expected = latency.p50_ms / 1000 if latency.p50_ms is not None else DEFAULT_EXPECTED_SECONDS
+            attempts_that_fit = int(remaining // (expected + RETRY_BACKOFF_SECONDS)) if expected > 0 else 1
+            budgets[config.name] = AgentBudget(
+                retailer=config.name,
+                deadline=deadline,
+                max_attempts=max(1, min(1 + config.max_retries, attempts_that_fit)),
+                expected_seconds=expected,
+                latency=latency
+            )
+        deadline_stats.budgets_planned += len(budgets)
+        return budgets
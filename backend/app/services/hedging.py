@@ -0,0 +1,100 @@
+import asyncio
+import time
+from typing import Dict, Optional
+import httpx
+
+from ..models.schemas import RetailerConfig
+from .http_pool import HTTPClientPool, http_client_pool
+
+# Don't hedge until a retailer has enough fetch samples for a meaningful p90
+MIN_HEDGE_SAMPLES = 20
+
+# Hedges a retailer may fire back to back before the rate cap applies
+HEDGE_BURST = 2.0
+
+
+class HedgeStats:
+    """Hedging counters for one retailer"""
+
+    def __init__(self):
+        self.requests = 0
+        self.hedges_fired = 0
+        self.hedges_capped = 0
+        self.hedge_wins = 0
+        self.primary_wins = 0
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "requests": self.requests,
+            "hedges_fired": self.hedges_fired,
+            "hedges_capped": self.hedges_capped,
+            "hedge_ratio": round(self.hedges_fired / self.requests, 4) if self.requests else 0.0,
+            "hedge_wins": self.hedge_wins,
+            "primary_wins": self.primary_wins,
+            "hedge_win_rate": round(self.hedge_wins / self.hedges_fired, 4) if self.hedges_fired else 0.0,
+        }
+
+
+class RequestHedger:
+    """
+    Hedged GETs for retailers with heavy latency tails
+    If the primary request hasn't answered by the retailer's observed p90, an
+    identical request goes out on a separate pooled client and whichever
+    answers first wins; the loser is cancelled. Each retailer earns
+    hedge_max_ratio hedge tokens per request, so hedging only adds that
+    fraction to outbound volume.
+    """
+
+    def __init__(self, pool: HTTPClientPool):
+        self.pool = pool
+        self._tokens: Dict[str, float] = {}
+        self._stats: Dict[str, HedgeStats] = {}
+
+    async def get(self, config: RetailerConfig, url: str, timeout: float, hedge_after: Optional[float]) -> httpx.Response:
+        stats = self._stats.setdefault(config.name, HedgeStats())
+        stats.requests += 1
+        self._tokens[config.name] = min(HEDGE_BURST, self._tokens.get(config.name, HEDGE_BURST) + config.hedge_max_ratio)
+
+        start_time = time.monotonic()
+        primary = asyncio.create_task(self.pool.get_client(config).get(url, timeout=timeout))
+        pending = {primary}
+        # However the call ends, by a response, an error or the caller being
+        # cancelled, no request is left running behind it
+        try:
+            if hedge_after is None or hedge_after >= timeout:
+                return await primary
+
+            done, _ = await asyncio.wait(pending, timeout=hedge_after)
+            if done:
+                return primary.result()
+
+            if self._tokens[config.name] < 1:
+                stats.hedges_capped += 1
+                return await primary
+            self._tokens[config.name] -= 1
+            stats.hedges_fired += 1
+
+            remaining = max(0.0, timeout - (time.monotonic() - start_time))
+            hedge = asyncio.create_task(self.pool.get_client(config, lane="hedge").get(url, timeout=remaining))
+            pending = {primary, hedge}
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            stats.hedge_wins += 1
+                        else:
+                            stats.primary_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {name: stats.snapshot() for name, stats in self._stats.items()}
+
+
+request_hedger = RequestHedger(http_client_pool)
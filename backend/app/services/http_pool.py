@@ -0,0 +1,241 @@
+import asyncio
+import os
+import socket
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+import httpcore
+import httpx
+from loguru import logger
+
+from ..models.schemas import RetailerConfig
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+DNS_CACHE_TTL_SECONDS = int(os.getenv("DNS_CACHE_TTL_SECONDS", "300"))
+
+
+class DNSCache:
+    """
+    Resolved-address cache with a fixed TTL
+    New pooled connections reuse addresses resolved during warm-up instead of
+    paying a resolver round trip on the request path.
+    """
+
+    def __init__(self, ttl_seconds: int = DNS_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[Tuple[str, int], Tuple[List[str], float]] = {}
+
+    async def resolve(self, host: str, port: int) -> List[str]:
+        """Resolve a host and cache its addresses"""
+        loop = asyncio.get_running_loop()
+        infos = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        self._entries[(host, port)] = (addresses, time.monotonic() + self.ttl_seconds)
+        return addresses
+
+    def lookup(self, host: str, port: int) -> Optional[str]:
+        """Cached address for a host, or None if unknown or expired"""
+        entry = self._entries.get((host, port))
+        if entry and entry[1] > time.monotonic():
+            return entry[0][0]
+        return None
+
+    def expiring(self, within_seconds: float) -> List[Tuple[str, int]]:
+        """Hosts whose entries expire soon and should be re-resolved"""
+        cutoff = time.monotonic() + within_seconds
+        return [key for key, (_, expires_at) in self._entries.items() if expires_at <= cutoff]
+
+    def invalidate(self, host: str, port: int):
+        self._entries.pop((host, port), None)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        now = time.monotonic()
+        return {
+            f"{host}:{port}": {"addresses": addresses, "expires_in_seconds": round(expires_at - now, 1)}
+            for (host, port), (addresses, expires_at) in self._entries.items()
+        }
+
+
+class CachingNetworkBackend(httpcore.AsyncNetworkBackend):
+    """httpcore network backend that connects to cached addresses; TLS still uses the hostname"""
+
+    def __init__(self, dns_cache: DNSCache):
+        self.dns_cache = dns_cache
+        self._backend = httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host: str, port: int, timeout: Optional[float] = None, local_address: Optional[str] = None, socket_options=None) -> httpcore.AsyncNetworkStream:
+        address = self.dns_cache.lookup(host, port)
+        if address:
+            try:
+                return await self._backend.connect_tcp(address, port, timeout=timeout, local_address=local_address, socket_options=socket_options)
+            except httpcore.ConnectError:
+                # The cached address may be stale; fall back to a fresh lookup
+                self.dns_cache.invalidate(host, port)
+        return await self._backend.connect_tcp(host, port, timeout=timeout, local_address=local_address, socket_options=socket_options)
+
+    async def connect_unix_socket(self, path: str, timeout: Optional[float] = None, socket_options=None) -> httpcore.AsyncNetworkStream:
+        return await self._backend.connect_unix_socket(path, timeout=timeout, socket_options=socket_options)
+
+    async def sleep(self, seconds: float):
+        await self._backend.sleep(seconds)
+
+
+class HostStats:
+    """Request and connection counters for one retailer host"""
+
+    def __init__(self):
+        self.requests = 0
+        self.new_connections = 0
+
+    async def trace(self, event_name: str, info: Dict):
+        # httpcore reports every TCP connect; requests without one reused a pooled connection
+        if event_name == "connection.connect_tcp.complete":
+            self.new_connections += 1
+
+
+def transport_settings(config: RetailerConfig) -> Tuple:
+    """The retailer settings a pooled client is built with"""
+    return (
+        config.http2,
+        config.max_connections,
+        config.max_keepalive_connections,
+        config.keepalive_expiry_seconds,
+        config.timeout_seconds,
+    )
+
+
+class HTTPClientPool:
+    """
+    Process-wide pool of long-lived HTTP clients, one per retailer host
+    Clients keep connections alive between searches and negotiate HTTP/2 where
+    the host supports it, so searches skip DNS, TCP and TLS setup after warm-up.
+    A retailer reconfigured at runtime with different transport settings gets a
+    new client; the old one is closed once its requests have timed out.
+    """
+
+    def __init__(self):
+        self.dns_cache = DNSCache()
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._transports: Dict[str, httpx.AsyncHTTPTransport] = {}
+        self._settings: Dict[str, Tuple] = {}
+        self._stats: Dict[str, HostStats] = {}
+        self._retired: Dict[httpx.AsyncClient, asyncio.Task] = {}
+
+    @staticmethod
+    def host_key(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def get_client(self, config: RetailerConfig, lane: Optional[str] = None) -> httpx.AsyncClient:
+        """
+        Get (or lazily create) the shared client for a retailer's host
+        A named lane gets its own client and connections to the same host, e.g. for hedged requests
+        """
+        host = self.host_key(config.base_url)
+        if lane:
+            host = f"{host}#{lane}"
+        client = self._clients.get(host)
+        if client is not None and self._settings[host] != transport_settings(config):
+            self._retire(client, grace_seconds=self._settings[host][-1])
+            client = None
+        if client is None or client.is_closed:
+            client = self._create_client(host, config)
+        return client
+
+    def _retire(self, client: httpx.AsyncClient, grace_seconds: float):
+        """Close a replaced client once requests already using it have had time to finish"""
+        async def close_later():
+            try:
+                await asyncio.sleep(grace_seconds)
+                await client.aclose()
+            finally:
+                self._retired.pop(client, None)
+
+        try:
+            self._retired[client] = asyncio.get_running_loop().create_task(close_later())
+        except RuntimeError:
+            # No loop yet, so no request can be using the client
+            pass
+
+    def _create_client(self, host: str, config: RetailerConfig) -> httpx.AsyncClient:
+        stats = self._stats.setdefault(host, HostStats())
+
+        async def instrument(request: httpx.Request):
+            stats.requests += 1
+            request.extensions["trace"] = stats.trace
+
+        transport = httpx.AsyncHTTPTransport(
+            http2=config.http2,
+            limits=httpx.Limits(
+                max_connections=config.max_connections,
+                max_keepalive_connections=config.max_keepalive_connections,
+                keepalive_expiry=config.keepalive_expiry_seconds
+            )
+        )
+        # httpx has no public hook for the network backend of its connection pool
+        transport._pool._network_backend = CachingNetworkBackend(self.dns_cache)
+        client = httpx.AsyncClient(
+            transport=transport,
+            timeout=httpx.Timeout(config.timeout_seconds),
+            headers=DEFAULT_HEADERS,
+            follow_redirects=True,
+            event_hooks={"request": [instrument]}
+        )
+        self._clients[host] = client
+        self._transports[host] = transport
+        self._settings[host] = transport_settings(config)
+        logger.info(f"Created pooled HTTP client for {host} (http2={config.http2}, max_connections={config.max_connections})")
+        return client
+
+    def open(self, configs: List[RetailerConfig]):
+        """Create clients for all given retailers up front"""
+        for config in configs:
+            self.get_client(config)
+
+    async def close(self):
+        """Close every pooled client, replaced ones included; called from the FastAPI shutdown hook"""
+        for task in list(self._retired.values()):
+            task.cancel()
+        clients = list(self._clients.items()) + [("replaced client", client) for client in self._retired]
+        for host, client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Failed to close HTTP client for {host}: {e}")
+        self._clients.clear()
+        self._transports.clear()
+        self._settings.clear()
+        self._retired.clear()
+
+    def idle_connections(self, url: str) -> int:
+        """Number of idle keep-alive connections currently pooled for a URL's host"""
+        return sum(1 for conn in self._connections(self.host_key(url)) if conn.is_idle())
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Per-host pool statistics for /metrics"""
+        hosts = {}
+        for host, stats in self._stats.items():
+            connections = self._connections(host)
+            hosts[host] = {
+                "requests": stats.requests,
+                "new_connections": stats.new_connections,
+                "reuse_ratio": round(1 - stats.new_connections / stats.requests, 4) if stats.requests else 0.0,
+                "open_connections": sum(1 for conn in connections if not conn.is_closed()),
+                "idle_connections": sum(1 for conn in connections if conn.is_idle()),
+                "http2_connections": sum(1 for conn in connections if "HTTP/2" in conn.info()),
+            }
+        return hosts
+
+    def _connections(self, host: str) -> list:
+        transport: Optional[httpx.AsyncHTTPTransport] = self._transports.get(host)
+        if transport is None:
+            return []
+        # httpx does not expose its connection pool publicly
+        pool = getattr(transport, "_pool", None)
+        return list(getattr(pool, "connections", []))
+
+
+http_client_pool = HTTPClientPool()
@@ -1,12 +1,33 @@
 import asyncio
 import time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Tuple
 from loguru import logger
 import redis.asyncio as redis
 
-from ..models.schemas import Product, Language, ScrapingResult
+from ..models.schemas import Product, Language, SortOrder, RetailerConfig, ScrapingResult, SearchResponse
+from ..agents.base_agent import AbstractScrapingAgent
 from ..agents.registry import get_active_agents
 from ..utils.alternative_finder import AlternativeFinder
+from ..utils.product_grouping import group_products
+from ..utils.ranking import corpus_statistics, matches_query, query_terms, rank_products
+from ..utils.unit_pricing import cheapest_per_family, sort_by_unit_price
+from .search_cache import SearchCache, cache_stats
+from .single_flight import SingleFlight
+from .deadline_scheduler import AgentBudget, DeadlineScheduler
+from .circuit_breaker import CircuitBreaker
+from .catalog import CATALOG_MIN_RESULTS, product_catalog
+from .popularity import PopularityTracker
+from .request_timing import RequestTiming, current_timing, overhead_stats
+
+# Overall budget for agent searches; leaves 200ms for processing within the 3-second target
+SEARCH_TIMEOUT_SECONDS = 2.8
+
+# Keep references to background refresh tasks so they are not garbage collected
+_background_tasks = set()
+
+def per_retailer_limit(max_results: int, retailer_count: int) -> int:
+    """Results requested from each retailer; part of what a cached slice covers"""
+    return max(1, max_results // retailer_count) if retailer_count else 0
 
 class SearchOrchestrator:
     """
@@ -18,193 +39,504 @@ class SearchOrchestrator:
         self.redis_client = redis_client
         self.request_id = request_id
         self.search_time_ms: int = 0
+        self.redis_time_ms: float = 0
         self.retailers_searched: List[str] = []
+        self.error_retailers: List[str] = []
+        self.open_circuits: List[str] = []
         self.alternative_finder = AlternativeFinder()
+        self.cache = SearchCache(redis_client)
+        self.single_flight = SingleFlight(redis_client)
+        self.deadline_scheduler = DeadlineScheduler(redis_client)
+        self.circuit_breaker = CircuitBreaker(redis_client)
         
-    async def search_products(self, query: str, language: Language = Language.ARABIC, max_results: int = 50) -> List[Product]:
+    async def search_products(self, query: str, language: Language = Language.ARABIC, max_results: int = 50, sort: SortOrder = SortOrder.RELEVANCE) -> List[Product]:
         """
         Execute parallel search across all active Egyptian retailers
         Returns aggregated and ranked results within 3 seconds
         """
         start_time = time.time()
+        timing = RequestTiming()
+        current_timing.set(timing)
         
         try:
-            # Get all active agents
-            agents = await get_active_agents(self.redis_client)
-            self.retailers_searched = [agent.config.name for agent in agents]
-            
-            logger.info(f"Starting parallel search across {len(agents)} retailers for: {query}")
-            
-            # Store search metadata in Redis
-            await self.redis_client.hset(
-                f"search:{self.request_id}",
-                mapping={
-                    "query": query,
-                    "language": language.value,
-                    "start_time": str(start_time),
-                    "retailers_count": len(agents),
-                    "status": "running"
-                }
-            )
-            await self.redis_client.expire(f"search:{self.request_id}", 300)  # 5 min TTL
-            
-            # Execute parallel searches with 3-second timeout
-            search_tasks = []
-            for agent in agents:
-                task = asyncio.create_task(
-                    agent.execute_search(query, self.request_id, language, max_results // len(agents))
-                )
-                search_tasks.append(task)
-            
-            # Wait for all searches with timeout
-            try:
-                results = await asyncio.wait_for(
-                    asyncio.gather(*search_tasks, return_exceptions=True),
-                    timeout=2.8  # Leave 200ms buffer for processing
-                )
-            except asyncio.TimeoutError:
-                logger.warning(f"Search timeout reached for request {self.request_id}")
-                # Cancel remaining tasks
-                for task in search_tasks:
-                    if not task.done():
-                        task.cancel()
-                results = [task.result() if task.done() else None for task in search_tasks]
-            
-            # Process results
-            all_products = []
-            successful_retailers = []
-            failed_retailers = []
-            
-            for i, result in enumerate(results):
-                if isinstance(result, Exception):
-                    logger.error(f"Agent {agents[i].config.name} failed with exception: {result}")
-                    failed_retailers.append(agents[i].config.name)
-                    continue
-                    
-                if result and isinstance(result, ScrapingResult):
-                    if result.success and result.products:
-                        all_products.extend(result.products)
-                        successful_retailers.append(result.retailer)
-                        logger.info(f"[{result.retailer}] Retrieved {len(result.products)} products")
-                    else:
-                        failed_retailers.append(result.retailer)
-                        logger.warning(f"[{result.retailer}] Search failed: {result.error_message}")
+            cached_results, scrape_tasks = await self._start_search(query, language, max_results, start_time)
+            scraped_results = list(await asyncio.gather(*scrape_tasks))
+            return await self._finalize(query, cached_results + scraped_results, scraped_results, max_results, start_time, sort)
             
-            # Deduplicate and rank products
-            deduplicated_products = await self._deduplicate_products(all_products)
-            ranked_products = await self._rank_products(deduplicated_products, query)
-            
-            # Find alternatives if needed
-            if len(ranked_products) < 5:  # If we have few results, find alternatives
-                alternatives = await self.alternative_finder.find_alternatives(
-                    query, ranked_products, self.redis_client
-                )
-                ranked_products.extend(alternatives)
+        except Exception as e:
+            await self._mark_failed(e, start_time)
+            raise e
+        
+        finally:
+            overhead_stats.record(timing)
+    
+    async def stream_search(self, query: str, language: Language = Language.ARABIC, max_results: int = 50, sort: SortOrder = SortOrder.RELEVANCE) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream search results as retailers complete
+        Yields one "retailer" event per retailer (cached slices first, then scrapes in
+        completion order) followed by a final "summary" event with the ranked and
+        deduplicated results, matching the POST /search response
+        """
+        start_time = time.time()
+        timing = RequestTiming()
+        current_timing.set(timing)
+        scrape_tasks: List[asyncio.Task] = []
+        
+        try:
+            cached_results, scrape_tasks = await self._start_search(query, language, max_results, start_time)
             
-            # Limit to max_results
-            final_products = ranked_products[:max_results]
+            for result in cached_results:
+                yield self._retailer_event(result, cached=True)
             
-            self.search_time_ms = int((time.time() - start_time) * 1000)
+            scraped_results = []
+            for next_result in asyncio.as_completed(scrape_tasks):
+                result = await next_result
+                scraped_results.append(result)
+                yield self._retailer_event(result, cached=False)
             
-            # Update search metadata
-            await self.redis_client.hset(
-                f"search:{self.request_id}",
-                mapping={
-                    "status": "completed",
-                    "total_products": len(final_products),
-                    "successful_retailers": ",".join(successful_retailers),
-                    "failed_retailers": ",".join(failed_retailers),
-                    "search_time_ms": self.search_time_ms
-                }
+            final_products = await self._finalize(query, cached_results + scraped_results, scraped_results, max_results, start_time, sort)
+            summary = SearchResponse.model_construct(
+                request_id=self.request_id,
+                query=query,
+                products=final_products,
+                total_results=len(final_products),
+                search_time_ms=self.search_time_ms,
+                retailers_searched=self.retailers_searched,
+                error_retailers=self.error_retailers
             )
-            
-            logger.info(f"Search completed in {self.search_time_ms}ms. Found {len(final_products)} products from {len(successful_retailers)} retailers")
-            
-            return final_products
+            yield {"event": "summary", **summary.model_dump()}
             
         except Exception as e:
-            self.search_time_ms = int((time.time() - start_time) * 1000)
-            logger.error(f"Orchestrator error: {e}")
-            
-            await self.redis_client.hset(
-                f"search:{self.request_id}",
-                mapping={
-                    "status": "failed",
-                    "error": str(e),
-                    "search_time_ms": self.search_time_ms
-                }
+            await self._mark_failed(e, start_time)
+            yield {"event": "error", "request_id": self.request_id, "detail": "Internal search error"}
+        
+        finally:
+            # The client may disconnect mid-stream; scrapes no other request is waiting on stop too
+            for task in scrape_tasks:
+                if not task.done():
+                    task.cancel()
+            overhead_stats.record(timing)
+    
+    def _retailer_event(self, result: ScrapingResult, cached: bool) -> Dict[str, Any]:
+        return {
+            "event": "retailer",
+            "request_id": self.request_id,
+            "cached": cached,
+            **result.model_dump(exclude={"redis_time_ms"})
+        }
+    
+    async def _start_search(self, query: str, language: Language, max_results: int, start_time: float) -> Tuple[List[ScrapingResult], List[asyncio.Task]]:
+        """
+        Resolve cached retailer slices and start scrapes for the rest
+        Returns the cached results and one task per retailer that must be scraped
+        """
+        # Get all active agents; retailers with open circuits are skipped outright
+        agents = await get_active_agents(self.redis_client, self.open_circuits)
+        self.retailers_searched = [agent.config.name for agent in agents]
+        
+        logger.info(f"Starting parallel search across {len(agents)} retailers for: {query}")
+        
+        per_retailer_results = per_retailer_limit(max_results, len(agents))
+        
+        # Serve cached retailer slices first; only scrape retailers without a usable slice.
+        # Open circuits stay in the key so an outage doesn't invalidate every cached slice.
+        # The metadata write doesn't gate anything, so it shares the round trip with the cache lookup.
+        cache_key = self.cache.build_key(query, language, self.retailers_searched + self.open_circuits)
+        _, cached_entries = await asyncio.gather(
+            self._store_metadata(query, language, start_time, len(agents)),
+            self.cache.get_slices(cache_key, self.retailers_searched, per_retailer_results)
+        )
+        
+        stale_agents = [agent for agent in agents if agent.config.name in cached_entries and not cached_entries[agent.config.name].is_fresh]
+        missing_agents = [agent for agent in agents if agent.config.name not in cached_entries]
+        
+        if stale_agents:
+            self._schedule_refresh(stale_agents, cache_key, query, language, per_retailer_results)
+        
+        # Retailers without a cached slice can still be answered from fresh catalog entries
+        catalog_results = await self._catalog_results(query, missing_agents, per_retailer_results)
+        missing_agents = [agent for agent in missing_agents if agent.config.name not in catalog_results]
+        
+        logger.info(
+            f"Served {len(cached_entries)} retailers from cache ({len(stale_agents)} stale) "
+            f"and {len(catalog_results)} from the catalog, scraping {len(missing_agents)}"
+        )
+        
+        # Give each agent a budget derived from its latency history and the time left
+        deadline = time.monotonic() + SEARCH_TIMEOUT_SECONDS - (time.time() - start_time)
+        budgets = await self.deadline_scheduler.plan([agent.config for agent in missing_agents], deadline)
+        scrape_tasks = [
+            asyncio.create_task(self._scrape_coalesced(agent, cache_key, query, language, per_retailer_results, budgets[agent.config.name]))
+            for agent in missing_agents
+        ]
+        return [entry.result for entry in cached_entries.values()] + list(catalog_results.values()), scrape_tasks
+    
+    async def fetch_items(self, queries: List[str], language: Language, max_results: int, concurrency: int) -> List[List[ScrapingResult]]:
+        """
+        Retailer results for several queries at once, one list per query
+        Cached slices and fresh catalog entries are used first. The remaining
+        query × retailer scrapes share one concurrency limit and the search
+        deadline, and each retailer also takes at most its max_connections at
+        once, so no host is sent the whole list together. They are started item
+        by item across retailers, and scrapes still queued at the deadline are
+        reported as failed rather than started.
+        """
+        start_time = time.time()
+        agents = await get_active_agents(self.redis_client, self.open_circuits)
+        self.retailers_searched = [agent.config.name for agent in agents]
+        per_retailer_results = per_retailer_limit(max_results, len(agents))
+        
+        # Entries that canonicalize alike ("رز" and "الأرز") are fetched once
+        item_keys = [self.cache.build_key(query, language, self.retailers_searched + self.open_circuits) for query in queries]
+        distinct: Dict[str, str] = {}
+        for cache_key, query in zip(item_keys, queries):
+            distinct.setdefault(cache_key, query)
+        cache_keys, queries = list(distinct), list(distinct.values())
+        _, *cached_entries = await asyncio.gather(
+            self._record_queries(queries, language),
+            *(self.cache.get_slices(cache_key, self.retailers_searched, per_retailer_results) for cache_key in cache_keys)
+        )
+        
+        missing_agents = []
+        for query, cache_key, entries in zip(queries, cache_keys, cached_entries):
+            stale_agents = [agent for agent in agents if agent.config.name in entries and not entries[agent.config.name].is_fresh]
+            if stale_agents:
+                self._schedule_refresh(stale_agents, cache_key, query, language, per_retailer_results)
+            missing_agents.append([agent for agent in agents if agent.config.name not in entries])
+        catalog_results = await asyncio.gather(*(
+            self._catalog_results(query, item_agents, per_retailer_results)
+            for query, item_agents in zip(queries, missing_agents)
+        ))
+        
+        results = [
+            [entry.result for entry in entries.values()] + list(catalog.values())
+            for entries, catalog in zip(cached_entries, catalog_results)
+        ]
+        pending = [
+            (i, agent) for i in range(len(queries)) for agent in agents
+            if agent in missing_agents[i] and agent.config.name not in catalog_results[i]
+        ]
+        logger.info(f"Fetching {len(queries)} items: {sum(len(item) for item in results)} retailer results served, scraping {len(pending)}")
+        
+        deadline = time.monotonic() + SEARCH_TIMEOUT_SECONDS - (time.time() - start_time)
+        budgets = await self.deadline_scheduler.plan(list({agent.config.name: agent.config for _, agent in pending}.values()), deadline)
+        semaphore = asyncio.Semaphore(concurrency)
+        host_semaphores = {agent.config.name: asyncio.Semaphore(agent.config.max_connections) for _, agent in pending}
+        
+        async def scrape(i: int, agent: AbstractScrapingAgent) -> ScrapingResult:
+            # The host slot comes first so scrapes waiting on a busy retailer don't hold shared slots
+            async with host_semaphores[agent.config.name], semaphore:
+                budget = budgets[agent.config.name]
+                if budget.remaining() <= 0:
+                    return self._failed_result(agent.config.name, "Search timeout", 0)
+                return await self._scrape_coalesced(agent, cache_keys[i], queries[i], language, per_retailer_results, budget)
+        
+        scrape_tasks = [asyncio.create_task(scrape(i, agent)) for i, agent in pending]
+        try:
+            for (i, _), result in zip(pending, await asyncio.gather(*scrape_tasks)):
+                results[i].append(result)
+        finally:
+            for task in scrape_tasks:
+                if not task.done():
+                    task.cancel()
+        
+        failed = {result.retailer for item in results for result in item if not result.success}
+        self.error_retailers = sorted(failed) + self.open_circuits
+        by_key = dict(zip(cache_keys, results))
+        return [by_key[cache_key] for cache_key in item_keys]
+    
+    async def _record_queries(self, queries: List[str], language: Language):
+        """Count every query towards popularity in one round trip"""
+        redis_start = time.perf_counter()
+        pipe = self.redis_client.pipeline(transaction=False)
+        for query in queries:
+            PopularityTracker(self.redis_client).add_to_pipeline(pipe, query, language)
+        await pipe.execute()
+        self.redis_time_ms += (time.perf_counter() - redis_start) * 1000
+    
+    async def _catalog_results(self, query: str, agents: List[AbstractScrapingAgent], per_retailer_results: int) -> Dict[str, ScrapingResult]:
+        """Results for retailers with enough fresh catalog matches, keyed by retailer"""
+        if not product_catalog.enabled or not agents:
+            return {}
+        matches = await product_catalog.search(query, [agent.config.name for agent in agents], per_retailer_results)
+        enough = min(per_retailer_results, CATALOG_MIN_RESULTS)
+        results = {
+            retailer: ScrapingResult(
+                retailer=retailer,
+                products=products,
+                success=True,
+                response_time_ms=0,
+                products_found=len(products)
             )
-            
-            raise e
+            for retailer, products in matches.items()
+            if len(products) >= enough
+        }
+        product_catalog.stats.retailers_served += len(results)
+        return results
     
-    async def _deduplicate_products(self, products: List[Product]) -> List[Product]:
+    async def _store_metadata(self, query: str, language: Language, start_time: float, retailers_count: int):
+        """Store search metadata in Redis"""
+        redis_start = time.perf_counter()
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.hset(
+            f"search:{self.request_id}",
+            mapping={
+                "query": query,
+                "language": language.value,
+                "start_time": str(start_time),
+                "retailers_count": retailers_count,
+                "status": "running"
+            }
+        )
+        pipe.expire(f"search:{self.request_id}", 300)  # 5 min TTL
+        # Feeds the prefetcher's view of hot queries
+        PopularityTracker(self.redis_client).add_to_pipeline(pipe, query, language)
+        await pipe.execute()
+        self.redis_time_ms += (time.perf_counter() - redis_start) * 1000
+    
+    async def _finalize(self, query: str, results: List[ScrapingResult], scraped_results: List[ScrapingResult], max_results: int, start_time: float, sort: SortOrder = SortOrder.RELEVANCE) -> List[Product]:
+        """Aggregate retailer results into the final ranked product list and record the search"""
+        agent_redis_time_ms = sum(result.redis_time_ms for result in scraped_results)
+        
+        # Process results
+        all_products = []
+        successful_retailers = []
+        failed_retailers = []
+        
+        for result in results:
+            if result.success and result.products:
+                all_products.extend(result.products)
+                successful_retailers.append(result.retailer)
+                logger.info(f"[{result.retailer}] Retrieved {len(result.products)} products")
+            else:
+                failed_retailers.append(result.retailer)
+                logger.warning(f"[{result.retailer}] Search failed: {result.error_message}")
+        
+        self.error_retailers = [result.retailer for result in results if not result.success] + self.open_circuits
+        
+        # Group equivalent products across retailers, dropping repeated listings, and
+        # rank the groups. Unit-price searches group every pack size of a product
+        # instead and order the most relevant groups by what they cost per kg, litre or piece.
+        if sort == SortOrder.UNIT_PRICE:
+            grouped_products = cheapest_per_family(all_products)
+        else:
+            grouped_products = group_products(all_products)
+        logger.info(f"Grouped {len(all_products)} products into {len(grouped_products)}")
+        ranked_products = await self._rank_products(grouped_products, query, max_results)
+        if sort == SortOrder.UNIT_PRICE:
+            ranked_products = sort_by_unit_price(ranked_products, matches_query(ranked_products, query_terms(query)))
+        
+        # Find alternatives if needed
+        if len(ranked_products) < 5:  # If we have few results, find alternatives
+            alternatives = await self.alternative_finder.find_alternatives(
+                query, ranked_products, self.redis_client
+            )
+            if sort == SortOrder.UNIT_PRICE:
+                # Alternatives follow the results, grouped and ordered the same way
+                alternatives = sort_by_unit_price(cheapest_per_family(alternatives))
+            ranked_products.extend(alternatives)
+        
+        # Limit to max_results
+        final_products = ranked_products[:max_results]
+        
+        self.search_time_ms = int((time.time() - start_time) * 1000)
+        
+        # Update search metadata
+        redis_start = time.perf_counter()
+        await self.redis_client.hset(
+            f"search:{self.request_id}",
+            mapping={
+                "status": "completed",
+                "total_products": len(final_products),
+                "successful_retailers": ",".join(successful_retailers),
+                "failed_retailers": ",".join(failed_retailers),
+                "search_time_ms": self.search_time_ms,
+                "redis_time_ms": int(self.redis_time_ms),
+                "agent_redis_time_ms": agent_redis_time_ms
+            }
+        )
+        self.redis_time_ms += (time.perf_counter() - redis_start) * 1000
+        
+        logger.info(f"Search completed in {self.search_time_ms}ms. Found {len(final_products)} products from {len(successful_retailers)} retailers")
+        logger.info(f"Redis time: {int(self.redis_time_ms)}ms in orchestrator, {agent_redis_time_ms}ms across agents")
+        
+        return final_products
+    
+    async def _mark_failed(self, error: Exception, start_time: float):
+        self.search_time_ms = int((time.time() - start_time) * 1000)
+        logger.error(f"Orchestrator error: {error}")
+        
+        await self.redis_client.hset(
+            f"search:{self.request_id}",
+            mapping={
+                "status": "failed",
+                "error": str(error),
+                "search_time_ms": self.search_time_ms
+            }
+        )
+    
+    async def _scrape_coalesced(self, agent: AbstractScrapingAgent, cache_key: str, query: str, language: Language, max_results: int, budget: AgentBudget) -> ScrapingResult:
         """
-        Remove duplicate products based on name, brand, and price similarity
+        Scrape a retailer once for all identical concurrent searches
+        The leader scrapes and fills the cache; followers on any worker reuse its result
+        Requests whose own scrape did not record the retailer's status record it here,
+        so status polling sees every retailer finish.
         """
-        if not products:
-            return []
+        flight_key = f"{cache_key}:{max_results}:{agent.config.name}"
+        timeout = max(0.0, budget.remaining())
+        start_time = time.time()
+        persisted = False
         
-        deduplicated = []
-        seen_products = set()
+        async def scrape_and_store() -> ScrapingResult:
+            nonlocal persisted
+            try:
+                # The agent paces itself against the budget; this only guards against overruns
+                result = await asyncio.wait_for(
+                    agent.execute_search(query, self.request_id, language, max_results, budget),
+                    timeout=timeout
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f"[{agent.config.name}] Search timeout reached for request {self.request_id}")
+                result = self._failed_result(agent.config.name, "Search timeout", int(timeout * 1000))
+                self._record_outcomes({agent.config.name: agent.config}, [result])
+                return result
+            # execute_search has stored this request's status and products
+            persisted = True
+            self._record_outcomes({agent.config.name: agent.config}, [result])
+            await self.cache.store_slices(cache_key, [result], {agent.config.name: agent.config}, max_results)
+            return result
         
-        for product in products:
-            # Create a signature for deduplication
-            name_normalized = product.name.lower().strip()
-            price_rounded = round(product.price, 2) if product.price else 0
-            brand_normalized = product.brand.lower().strip() if product.brand else ""
-            
-            signature = f"{name_normalized}_{brand_normalized}_{price_rounded}"
-            
-            if signature not in seen_products:
-                seen_products.add(signature)
-                deduplicated.append(product)
+        try:
+            result = await self.single_flight.do(
+                flight_key,
+                scrape_and_store,
+                timeout=timeout,
+                encode=lambda result: result.model_dump_json(),
+                decode=ScrapingResult.model_validate_json
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"[{agent.config.name}] Timed out waiting for shared search for request {self.request_id}")
+            result = self._failed_result(agent.config.name, "Search timeout", int(timeout * 1000))
+        except Exception as e:
+            logger.error(f"Agent {agent.config.name} failed with exception: {e!r}")
+            result = self._failed_result(agent.config.name, str(e) or type(e).__name__, 0)
         
-        logger.info(f"Deduplicated {len(products)} products to {len(deduplicated)}")
-        return deduplicated
+        if not persisted:
+            await agent.persist_status(self.request_id, query, start_time, result)
+        return result
+    
+    @staticmethod
+    def _failed_result(retailer: str, error_message: str, response_time_ms: int) -> ScrapingResult:
+        return ScrapingResult(
+            retailer=retailer,
+            products=[],
+            success=False,
+            error_message=error_message,
+            response_time_ms=response_time_ms,
+            products_found=0
+        )
     
-    async def _rank_products(self, products: List[Product], query: str) -> List[Product]:
+    async def _run_agents(self, agents: List[AbstractScrapingAgent], query: str, language: Language, max_results: int) -> List[ScrapingResult]:
         """
-        Rank products by relevance and price
-        Primary sort: relevance to query
-        Secondary sort: price (lowest first)
+        Run agent searches in parallel under the 3-second budget
+        Returns one ScrapingResult per agent; agents that crash or miss the budget are reported as failed
         """
-        def calculate_relevance_score(product: Product, query: str) -> float:
-            score = 0.0
-            query_lower = query.lower()
-            
-            # Name matching
-            if query_lower in product.name.lower():
-                score += 0.5
-            
-            # Brand matching
-            if product.brand and query_lower in product.brand.lower():
-                score += 0.3
-            
-            # Exact word matches in name
-            query_words = query_lower.split()
-            product_words = product.name.lower().split()
-            common_words = set(query_words) & set(product_words)
-            score += len(common_words) * 0.1
-            
-            # Confidence score from scraping
-            score += product.confidence_score * 0.1
-            
-            # Stock bonus
-            if product.in_stock:
-                score += 0.1
-            
-            return score
+        budgets = await self.deadline_scheduler.plan([agent.config for agent in agents], time.monotonic() + SEARCH_TIMEOUT_SECONDS)
+        search_tasks = [
+            asyncio.create_task(agent.execute_search(query, self.request_id, language, max_results, budgets[agent.config.name]))
+            for agent in agents
+        ]
+        
+        # Wait for all searches with timeout
+        try:
+            results = await asyncio.wait_for(
+                asyncio.gather(*search_tasks, return_exceptions=True),
+                timeout=SEARCH_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Search timeout reached for request {self.request_id}")
+            # Cancel remaining tasks
+            for task in search_tasks:
+                if not task.done():
+                    task.cancel()
+            results = [
+                task.exception() or task.result() if task.done() and not task.cancelled() else asyncio.TimeoutError("Search timeout")
+                for task in search_tasks
+            ]
         
-        # Calculate relevance scores
-        scored_products = []
-        for product in products:
-            relevance = calculate_relevance_score(product, query)
-            scored_products.append((product, relevance))
+        scraping_results = []
+        for agent, result in zip(agents, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Agent {agent.config.name} failed with exception: {result!r}")
+                result = self._failed_result(agent.config.name, str(result) or type(result).__name__, 0)
+            scraping_results.append(result)
+        self._record_outcomes({agent.config.name: agent.config for agent in agents}, scraping_results)
+        return scraping_results
+    
+    def _record_outcomes(self, configs: Dict[str, RetailerConfig], results: List[ScrapingResult]):
+        """Feed scrape outcomes to the circuit breakers in the background"""
+        async def record():
+            for result in results:
+                await self.circuit_breaker.record(configs[result.retailer], result.success, result.response_time_ms)
         
-        # Sort by relevance (desc) then by price (asc)
-        scored_products.sort(key=lambda x: (-x[1], x[0].price if x[0].price else float('inf')))
+        task = asyncio.create_task(record())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+    
+    def _schedule_refresh(self, agents: List[AbstractScrapingAgent], cache_key: str, query: str, language: Language, max_results: int):
+        """Refresh stale cache slices in the background without delaying the response"""
+        task = asyncio.create_task(self.refresh_slices(agents, cache_key, query, language, max_results))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+    
+    async def refresh_slices(self, agents: List[AbstractScrapingAgent], cache_key: str, query: str, language: Language, max_results: int) -> int:
+        """
+        Scrape retailers and store their slices under cache_key
+        Retailers another worker is already refreshing are skipped
+        Returns the number of slices refreshed
+        """
+        locked_agents = []
+        for agent in agents:
+            if await self.cache.acquire_refresh_lock(cache_key, agent.config.name):
+                locked_agents.append(agent)
+        if not locked_agents:
+            return 0
         
-        return [product for product, _ in scored_products]
+        try:
+            cache_stats.refreshes += len(locked_agents)
+            results = await self._run_agents(locked_agents, query, language, max_results)
+            fresh_results = [result for result in results if result.success]
+            cache_stats.refresh_failures += len(locked_agents) - len(fresh_results)
+            await self.cache.store_slices(
+                cache_key,
+                fresh_results,
+                {agent.config.name: agent.config for agent in locked_agents},
+                max_results
+            )
+            logger.info(f"Refreshed {len(fresh_results)}/{len(locked_agents)} stale cache slices for: {query}")
+            return len(fresh_results)
+        except Exception as e:
+            cache_stats.refresh_failures += len(locked_agents)
+            logger.error(f"Background cache refresh failed: {e}")
+            return 0
+        finally:
+            for agent in locked_agents:
+                await self.cache.release_refresh_lock(cache_key, agent.config.name)
+    
+    async def _rank_products(self, products: List[Product], query: str, limit: int) -> List[Product]:
+        """
+        Rank products by relevance and price, keeping the best limit
+        Relevance is BM25 over folded name and brand tokens, with IDF from the
+        shared product index, plus scraping confidence and stock bonuses; equal
+        scores are ordered by price (lowest first).
+        """
+        if not products:
+            return []
+        terms = query_terms(query)
+        redis_start = time.perf_counter()
+        idf = await corpus_statistics.idf(self.redis_client, terms)
+        self.redis_time_ms += (time.perf_counter() - redis_start) * 1000
+        return rank_products(products, terms, idf, limit)
     
     async def get_search_status(self) -> Dict[str, Any]:
         """Get current search status from Redis"""
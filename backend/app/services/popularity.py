@@ -0,0 +1,126 @@
+import os
+import time
+from typing import Dict, List, Tuple
+from loguru import logger
+import redis.asyncio as redis
+
+from ..models.schemas import Language
+from ..utils.query_canonicalizer import canonicalize_query
+
+POPULARITY_KEY = "popularity:queries"
+POPULARITY_DECAYED_AT_KEY = "popularity:decayed_at"
+# Last query as typed for each canonical member; prefetching sends this to retailers
+POPULARITY_QUERY_TEXT_KEY = "popularity:query_text"
+
+# HyperLogLogs of distinct queries as typed and after canonicalization
+DISTINCT_RAW_KEY = "queries:distinct:raw"
+DISTINCT_CANONICAL_KEY = "queries:distinct:canonical"
+
+# A query's weight halves over this long without new searches
+POPULARITY_HALF_LIFE_SECONDS = float(os.getenv("POPULARITY_HALF_LIFE_SECONDS", "21600"))
+
+# Only the hottest queries are kept; the long tail is trimmed on every decay
+POPULARITY_MAX_QUERIES = 10000
+
+# Hard cap applied on every search; the headroom lets new queries build up weight
+# between decays instead of being evicted on arrival
+POPULARITY_WRITE_CAP = 2 * POPULARITY_MAX_QUERIES
+
+# Weights below this after decay are dropped
+POPULARITY_MIN_WEIGHT = 0.05
+
+# Tracking expires after this long without any search; weights have fallen 65536-fold by then
+POPULARITY_TTL_SECONDS = int(POPULARITY_HALF_LIFE_SECONDS * 16)
+
+# Decays every weight by the time elapsed since the last decay, whichever worker runs it,
+# then drops faded members and the query text of members no longer tracked. Runs
+# atomically so no search increment is lost in between; the set is capped on write,
+# so the work is bounded by POPULARITY_WRITE_CAP.
+DECAY_SCRIPT = """
+local now = tonumber(ARGV[1])
+local last = tonumber(redis.call('get', KEYS[2]) or ARGV[1])
+redis.call('set', KEYS[2], ARGV[1], 'EX', ARGV[5])
+if now <= last then
+    return 0
+end
+local factor = math.pow(0.5, (now - last) / tonumber(ARGV[2]))
+redis.call('zunionstore', KEYS[1], 1, KEYS[1], 'WEIGHTS', factor)
+redis.call('zremrangebyscore', KEYS[1], '-inf', '(' .. ARGV[3])
+redis.call('zremrangebyrank', KEYS[1], 0, -tonumber(ARGV[4]) - 1)
+redis.call('expire', KEYS[1], ARGV[5])
+
+local forgotten = {}
+for _, member in ipairs(redis.call('hkeys', KEYS[3])) do
+    if not redis.call('zscore', KEYS[1], member) then
+        table.insert(forgotten, member)
+    end
+end
+for i = 1, #forgotten, 1000 do
+    redis.call('hdel', KEYS[3], unpack(forgotten, i, math.min(i + 999, #forgotten)))
+end
+return redis.call('zcard', KEYS[1])
+"""
+
+
+class PopularityTracker:
+    """
+    Exponentially decayed search frequency per (language, canonical query)
+    Live searches add one to their query in the orchestrator's metadata pipeline;
+    the prefetcher decays the set once per cycle and reads the top queries.
+    Distinct queries before and after canonicalization are counted alongside.
+    """
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis_client = redis_client
+
+    @staticmethod
+    def member(query: str, language: Language) -> str:
+        return f"{language.value}:{canonicalize_query(query)}"
+
+    def add_to_pipeline(self, pipe, query: str, language: Language):
+        """Count one search, sharing the caller's round trip"""
+        member = self.member(query, language)
+        pipe.zincrby(POPULARITY_KEY, 1, member)
+        pipe.zremrangebyrank(POPULARITY_KEY, 0, -POPULARITY_WRITE_CAP - 1)
+        pipe.expire(POPULARITY_KEY, POPULARITY_TTL_SECONDS)
+        pipe.hset(POPULARITY_QUERY_TEXT_KEY, member, query)
+        pipe.expire(POPULARITY_QUERY_TEXT_KEY, POPULARITY_TTL_SECONDS)
+        pipe.pfadd(DISTINCT_RAW_KEY, f"{language.value}:{query}")
+        pipe.pfadd(DISTINCT_CANONICAL_KEY, member)
+
+    async def decay(self) -> int:
+        """Apply decay since the last call; returns the number of tracked queries"""
+        return await self.redis_client.eval(
+            DECAY_SCRIPT, 3, POPULARITY_KEY, POPULARITY_DECAYED_AT_KEY, POPULARITY_QUERY_TEXT_KEY,
+            time.time(), POPULARITY_HALF_LIFE_SECONDS, POPULARITY_MIN_WEIGHT, POPULARITY_MAX_QUERIES,
+            POPULARITY_TTL_SECONDS
+        )
+
+    async def top(self, limit: int, min_weight: float = 0.0) -> List[Tuple[str, Language, float]]:
+        """Hottest queries first, as (query as last typed, language, weight)"""
+        raw = await self.redis_client.zrevrangebyscore(
+            POPULARITY_KEY, "+inf", min_weight, start=0, num=limit, withscores=True
+        )
+        if not raw:
+            return []
+        texts = await self.redis_client.hmget(POPULARITY_QUERY_TEXT_KEY, [member for member, _ in raw])
+        queries = []
+        for (member, weight), text in zip(raw, texts):
+            language, _, canonical = member.partition(":")
+            try:
+                queries.append((text or canonical, Language(language), weight))
+            except ValueError:
+                logger.warning(f"Ignoring malformed popularity entry: {member}")
+        return queries
+
+    async def cardinality(self) -> Dict[str, float]:
+        """Approximate distinct queries as typed and after canonicalization"""
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.pfcount(DISTINCT_RAW_KEY)
+        pipe.pfcount(DISTINCT_CANONICAL_KEY)
+        raw, canonical = await pipe.execute()
+        return {
+            "distinct_raw": raw,
+            "distinct_canonical": canonical,
+            "reduction": round(1 - canonical / raw, 4) if raw else 0.0,
+        }
@@ -0,0 +1,174 @@
+import asyncio
+import os
+import socket
+import time
+import uuid
+from typing import Dict, List, Optional
+from asyncio_throttle import Throttler
+from loguru import logger
+import redis.asyncio as redis
+
+from ..agents.base_agent import AbstractScrapingAgent
+from ..agents.registry import get_active_agents
+from ..models.schemas import Language
+from .orchestrator import SearchOrchestrator, per_retailer_limit
+from .popularity import PopularityTracker
+from .search_cache import SearchCache
+from .single_flight import RENEW_LEASE_SCRIPT
+
+PREFETCH_LEADER_KEY = "prefetch:leader"
+
+# Hottest queries kept warm in the search cache; 0 disables prefetching
+PREFETCH_TOP_N = int(os.getenv("PREFETCH_TOP_N", "200"))
+
+# Queries need at least this decayed weight, so one-off searches are never prefetched
+PREFETCH_MIN_WEIGHT = float(os.getenv("PREFETCH_MIN_WEIGHT", "3"))
+
+PREFETCH_INTERVAL_SECONDS = float(os.getenv("PREFETCH_INTERVAL_SECONDS", "60"))
+
+# Retailer scrapes in flight for prefetching on the leader; live searches never wait on these
+PREFETCH_CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", "2"))
+
+# Prefetch as if for a default SearchRequest so its slices cover what users ask for
+PREFETCH_MAX_RESULTS = 50
+
+# How often scrapes waiting on a retailer's rate limit recheck it
+THROTTLE_POLL_SECONDS = 0.5
+
+
+class PrefetchStats:
+    """Per-process prefetch counters exposed through /metrics"""
+
+    def __init__(self):
+        self.leader = False
+        self.cycles = 0
+        self.incomplete_cycles = 0
+        self.queries = 0
+        self.refreshed = 0
+        self.skipped_fresh = 0
+        self.failures = 0
+        self.last_cycle_ms = 0
+
+    def snapshot(self) -> Dict:
+        return {
+            "leader": self.leader,
+            "cycles": self.cycles,
+            "incomplete_cycles": self.incomplete_cycles,
+            "queries": self.queries,
+            "refreshed": self.refreshed,
+            "skipped_fresh": self.skipped_fresh,
+            "failures": self.failures,
+            "last_cycle_ms": self.last_cycle_ms,
+        }
+
+
+class Prefetcher:
+    """
+    Keeps the search cache warm for the most popular queries
+    One worker across the deployment holds the leader lease and, every
+    PREFETCH_INTERVAL_SECONDS, refreshes the top queries' retailer slices that
+    are missing or would expire before the next cycle. Scrapes are paced per
+    retailer by rate_limit_per_minute and bounded by PREFETCH_CONCURRENCY.
+    """
+
+    def __init__(self):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.stats = PrefetchStats()
+        self.redis_client: Optional[redis.Redis] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._throttlers: Dict[str, Throttler] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, redis_client: redis.Redis):
+        if PREFETCH_TOP_N <= 0:
+            return
+        self.redis_client = redis_client
+        self._semaphore = asyncio.Semaphore(PREFETCH_CONCURRENCY)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(PREFETCH_INTERVAL_SECONDS)
+            try:
+                self.stats.leader = await self._hold_lease()
+                if self.stats.leader:
+                    await self.run_cycle()
+            except Exception as e:
+                logger.warning(f"Prefetch cycle failed: {e}")
+
+    async def _hold_lease(self) -> bool:
+        """Take or renew the leader lease; it outlives a cycle so leadership is sticky"""
+        ttl_ms = int(PREFETCH_INTERVAL_SECONDS * 3 * 1000)
+        if await self.redis_client.set(PREFETCH_LEADER_KEY, self.worker_id, nx=True, px=ttl_ms):
+            logger.info(f"Prefetcher leadership taken by {self.worker_id}")
+            return True
+        return bool(await self.redis_client.eval(RENEW_LEASE_SCRIPT, 1, PREFETCH_LEADER_KEY, self.worker_id, ttl_ms))
+
+    async def run_cycle(self):
+        """Decay popularity and refresh the hot queries, hottest first"""
+        start = time.perf_counter()
+        tracker = PopularityTracker(self.redis_client)
+        await tracker.decay()
+        queries = await tracker.top(PREFETCH_TOP_N, PREFETCH_MIN_WEIGHT)
+        if not queries:
+            return
+        open_circuits: List[str] = []
+        agents = await get_active_agents(self.redis_client, open_circuits)
+        try:
+            # A cycle that can't finish within the interval yields to the next one
+            await asyncio.wait_for(
+                asyncio.gather(*(self.prefetch(query, language, agents, open_circuits) for query, language, _ in queries)),
+                timeout=PREFETCH_INTERVAL_SECONDS * 2
+            )
+        except asyncio.TimeoutError:
+            self.stats.incomplete_cycles += 1
+            logger.warning(f"Prefetch cycle over {len(queries)} queries did not finish in time")
+        self.stats.cycles += 1
+        self.stats.last_cycle_ms = int((time.perf_counter() - start) * 1000)
+
+    async def prefetch(self, query: str, language: Language, agents: List[AbstractScrapingAgent], open_circuits: List[str]):
+        """Refresh a query's retailer slices that won't stay fresh until the next cycle"""
+        self.stats.queries += 1
+        names = [agent.config.name for agent in agents]
+        cache = SearchCache(self.redis_client)
+        # Same key and per-retailer limit a live search would use
+        cache_key = cache.build_key(query, language, names + open_circuits)
+        max_results = per_retailer_limit(PREFETCH_MAX_RESULTS, len(agents))
+
+        entries = await cache.get_slices(cache_key, names, max_results, record=False)
+        refresh_before = time.time() + PREFETCH_INTERVAL_SECONDS
+        due = [
+            agent for agent in agents
+            if agent.config.name not in entries or entries[agent.config.name].fresh_until < refresh_before
+        ]
+        self.stats.skipped_fresh += len(agents) - len(due)
+        if due:
+            orchestrator = SearchOrchestrator(self.redis_client, f"prefetch-{uuid.uuid4()}")
+            await asyncio.gather(*(self._refresh(orchestrator, agent, cache_key, query, language, max_results) for agent in due))
+
+    async def _refresh(self, orchestrator: SearchOrchestrator, agent: AbstractScrapingAgent, cache_key: str, query: str, language: Language, max_results: int):
+        config = agent.config
+        throttler = self._throttlers.get(config.name)
+        if throttler is None or throttler.rate_limit != config.rate_limit_per_minute:
+            throttler = self._throttlers[config.name] = Throttler(
+                rate_limit=config.rate_limit_per_minute, period=60, retry_interval=THROTTLE_POLL_SECONDS
+            )
+        try:
+            async with throttler:
+                async with self._semaphore:
+                    refreshed = await orchestrator.refresh_slices([agent], cache_key, query, language, max_results)
+            self.stats.refreshed += refreshed
+        except Exception as e:
+            self.stats.failures += 1
+            logger.warning(f"[{config.name}] Prefetch failed for {query}: {e}")
+
+
+prefetcher = Prefetcher()
@@ -0,0 +1,60 @@
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Deque, Dict, Optional
+
+# Recent samples kept for percentiles in /metrics
+OVERHEAD_SAMPLES = 1000
+
+
+class RequestTiming:
+    """Timestamps of one search request, shared by every agent task it starts"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_send: Optional[float] = None
+
+    def mark_first_send(self):
+        if self.first_send is None:
+            self.first_send = time.perf_counter()
+
+    def overhead_ms(self) -> Optional[float]:
+        """Time from request start until the first outbound retailer request"""
+        if self.first_send is None:
+            return None
+        return (self.first_send - self.started) * 1000
+
+
+# Timing of the search request running in the current task; agent tasks inherit it
+current_timing: ContextVar[Optional[RequestTiming]] = ContextVar("current_timing", default=None)
+
+
+class OverheadStats:
+    """Orchestration overhead before the first outbound byte, per process"""
+
+    def __init__(self):
+        self.requests = 0
+        self.samples: Deque[float] = deque(maxlen=OVERHEAD_SAMPLES)
+
+    def record(self, timing: RequestTiming):
+        self.requests += 1
+        overhead_ms = timing.overhead_ms()
+        if overhead_ms is not None:
+            self.samples.append(overhead_ms)
+
+    def snapshot(self) -> Dict[str, float]:
+        ordered = sorted(self.samples)
+
+        def percentile(fraction: float) -> float:
+            return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 3) if ordered else 0.0
+
+        return {
+            "requests": self.requests,
+            "scraped_requests": len(ordered),
+            "p50_ms": percentile(0.5),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(ordered[-1], 3) if ordered else 0.0,
+        }
+
+
+overhead_stats = OverheadStats()
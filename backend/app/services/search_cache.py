@@ -0,0 +1,182 @@
+import hashlib
+import os
+import time
+from typing import Dict, List
+from pydantic import BaseModel
+from loguru import logger
+import redis.asyncio as redis
+
+from ..models.schemas import Language, RetailerConfig, ScrapingResult
+from ..utils.query_canonicalizer import canonicalize_query
+
+CACHE_KEY_PREFIX = "cache:search"
+
+# Seconds an empty result slice is served; a retailer outage often looks like "0 hits",
+# so it is rechecked soon and never served stale
+EMPTY_RESULT_TTL_SECONDS = int(os.getenv("EMPTY_RESULT_TTL_SECONDS", "30"))
+
+
+class CacheEntry(BaseModel):
+    """A cached ScrapingResult slice for one retailer"""
+    result: ScrapingResult
+    stored_at: float
+    fresh_until: float
+    max_results: int
+
+    @property
+    def age_seconds(self) -> float:
+        return max(0.0, time.time() - self.stored_at)
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() < self.fresh_until
+
+    def covers(self, max_results: int) -> bool:
+        """Whether this slice was scraped with a large enough result limit"""
+        return self.max_results >= max_results or self.result.products_found < self.max_results
+
+
+class CacheStats:
+    """
+    Per-process cache counters exposed through /metrics
+    Used to tune retailer TTLs against the 3-second search budget
+    """
+
+    def __init__(self):
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.served_age_total = 0.0
+        self.served_age_max = 0.0
+
+    def record_hit(self, entry: CacheEntry):
+        if entry.is_fresh:
+            self.fresh_hits += 1
+        else:
+            self.stale_hits += 1
+        age = entry.age_seconds
+        self.served_age_total += age
+        self.served_age_max = max(self.served_age_max, age)
+
+    def snapshot(self) -> Dict[str, float]:
+        hits = self.fresh_hits + self.stale_hits
+        lookups = hits + self.misses
+        return {
+            "lookups": lookups,
+            "fresh_hits": self.fresh_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "avg_served_age_seconds": round(self.served_age_total / hits, 2) if hits else 0.0,
+            "max_served_age_seconds": round(self.served_age_max, 2),
+        }
+
+
+cache_stats = CacheStats()
+
+
+class SearchCache:
+    """
+    Canonical-query cache for search results
+    Entries are keyed on (normalized query, language, retailer set) and stored as
+    one ScrapingResult slice per retailer, each with the retailer's own TTL.
+    Slices stay readable for a stale window after they expire so the orchestrator
+    can serve them immediately while refreshing in the background.
+    """
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis_client = redis_client
+
+    def build_key(self, query: str, language: Language, retailers: List[str]) -> str:
+        """Build the cache key for a query over a set of retailers"""
+        raw_key = "|".join([canonicalize_query(query), language.value, ",".join(sorted(retailers))])
+        digest = hashlib.sha1(raw_key.encode("utf-8")).hexdigest()[:20]
+        return f"{CACHE_KEY_PREFIX}:{digest}"
+
+    async def get_slices(self, cache_key: str, retailers: List[str], max_results: int, record: bool = True) -> Dict[str, CacheEntry]:
+        """
+        Fetch every retailer slice for a cache key in a single round trip
+        Returns only usable slices (fresh or stale); missing retailers count as misses
+        Background lookups pass record=False to keep them out of the hit ratio
+        """
+        entries: Dict[str, CacheEntry] = {}
+        try:
+            raw_values = await self.redis_client.mget([f"{cache_key}:{name}" for name in retailers])
+        except Exception as e:
+            logger.warning(f"Search cache lookup failed: {e}")
+            if record:
+                cache_stats.misses += len(retailers)
+            return entries
+
+        for name, raw in zip(retailers, raw_values):
+            entry = None
+            if raw:
+                try:
+                    entry = CacheEntry.model_validate_json(raw)
+                except ValueError as e:
+                    logger.warning(f"Discarding corrupt cache slice for {name}: {e}")
+
+            if entry and entry.covers(max_results):
+                entries[name] = entry
+                if record:
+                    cache_stats.record_hit(entry)
+            elif record:
+                cache_stats.misses += 1
+
+        return entries
+
+    async def store_slices(self, cache_key: str, results: List[ScrapingResult], configs: Dict[str, RetailerConfig], max_results: int):
+        """
+        Store successful retailer results, each with its retailer's TTL
+        Empty results are kept only for EMPTY_RESULT_TTL_SECONDS, with no stale window.
+        """
+        now = time.time()
+        pipe = self.redis_client.pipeline(transaction=False)
+        stored = 0
+        for result in results:
+            config = configs.get(result.retailer)
+            if not config or not result.success:
+                continue
+            if result.products:
+                fresh_seconds = config.cache_ttl_seconds
+                expire_seconds = config.cache_ttl_seconds + config.cache_stale_seconds
+            else:
+                fresh_seconds = expire_seconds = min(EMPTY_RESULT_TTL_SECONDS, config.cache_ttl_seconds)
+            if expire_seconds <= 0:
+                continue
+            entry = CacheEntry(
+                result=result,
+                stored_at=now,
+                fresh_until=now + fresh_seconds,
+                max_results=max_results
+            )
+            pipe.set(f"{cache_key}:{result.retailer}", entry.model_dump_json(), ex=expire_seconds)
+            stored += 1
+
+        if not stored:
+            return
+        try:
+            await pipe.execute()
+            cache_stats.stores += stored
+        except Exception as e:
+            logger.warning(f"Search cache store failed: {e}")
+
+    async def acquire_refresh_lock(self, cache_key: str, retailer: str, ttl_seconds: int = 30) -> bool:
+        """Make sure only one worker refreshes a stale slice at a time"""
+        try:
+            return bool(await self.redis_client.set(f"{cache_key}:{retailer}:refresh", "1", nx=True, ex=ttl_seconds))
+        except Exception as e:
+            logger.warning(f"Search cache refresh lock failed: {e}")
+            return False
+
+    async def release_refresh_lock(self, cache_key: str, retailer: str):
+        try:
+            await self.redis_client.delete(f"{cache_key}:{retailer}:refresh")
+        except Exception as e:
+            logger.warning(f"Search cache refresh unlock failed: {e}")
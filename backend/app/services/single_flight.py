@@ -0,0 +1,223 @@
+import asyncio
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+from loguru import logger
+import redis.asyncio as redis
+
+SINGLE_FLIGHT_PREFIX = "singleflight"
+
+# Compare-and-set scripts so a leader never touches a lease it no longer owns
+RENEW_LEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_LEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+_LEADER_GONE = object()
+
+
+class _Flight:
+    """One in-flight piece of work on this worker and the callers waiting on it"""
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 0
+
+
+# In-flight work shared by every request on this worker, keyed by flight key
+_inflight: Dict[str, _Flight] = {}
+_leader_tasks = set()
+
+
+class SingleFlightStats:
+    """Per-process coalescing counters exposed through /metrics"""
+
+    def __init__(self):
+        self.leaders = 0
+        self.local_followers = 0
+        self.remote_followers = 0
+        self.remote_results = 0
+        self.leader_failovers = 0
+        self.follower_timeouts = 0
+        self.abandoned = 0
+        self.redis_errors = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            "leaders": self.leaders,
+            "local_followers": self.local_followers,
+            "remote_followers": self.remote_followers,
+            "remote_results": self.remote_results,
+            "leader_failovers": self.leader_failovers,
+            "follower_timeouts": self.follower_timeouts,
+            "abandoned": self.abandoned,
+            "redis_errors": self.redis_errors,
+        }
+
+
+single_flight_stats = SingleFlightStats()
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent work so it runs once
+    Within a worker, callers share one future. Across workers and hosts, the first
+    caller takes a short Redis lease, renews it while working and publishes its
+    result; the others poll for that result instead of repeating the work. If the
+    lease lapses without a result (the leader died) a follower takes over.
+    Work that every local caller has abandoned by being cancelled is cancelled too.
+    """
+
+    def __init__(self, redis_client: redis.Redis, lease_ms: int = 1000, result_ttl_seconds: int = 10, poll_interval: float = 0.05):
+        self.redis_client = redis_client
+        self.lease_ms = lease_ms
+        self.result_ttl_seconds = result_ttl_seconds
+        self.poll_interval = poll_interval
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]], timeout: float,
+                 encode: Callable[[Any], str], decode: Callable[[str], Any]) -> Any:
+        """
+        Run fn once for all concurrent callers of key
+        Each caller waits at most its own timeout and gets asyncio.TimeoutError after that.
+        A caller that times out leaves the work running so it can still fill caches;
+        when the last waiting caller is cancelled (its client went away) the work is
+        cancelled as well.
+        """
+        flight = _inflight.get(key)
+        if flight is None:
+            future = asyncio.get_running_loop().create_future()
+            # Mark the exception as retrieved even if every waiter has already timed out
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            flight = _inflight[key] = _Flight(future)
+            flight.task = asyncio.create_task(self._execute(key, fn, timeout, encode, decode, flight))
+            _leader_tasks.add(flight.task)
+            flight.task.add_done_callback(_leader_tasks.discard)
+        else:
+            single_flight_stats.local_followers += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(flight.future), timeout=max(timeout, 0))
+        except asyncio.TimeoutError:
+            single_flight_stats.follower_timeouts += 1
+            raise
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                single_flight_stats.abandoned += 1
+                # Later callers start afresh rather than join work being torn down
+                if _inflight.get(key) is flight:
+                    del _inflight[key]
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    async def _execute(self, key: str, fn: Callable[[], Awaitable[Any]], timeout: float,
+                       encode: Callable[[Any], str], decode: Callable[[str], Any], flight: _Flight):
+        future = flight.future
+        try:
+            result = await self._resolve(key, fn, time.monotonic() + timeout, encode, decode)
+            if not future.done():
+                future.set_result(result)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            if not future.done():
+                future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            if _inflight.get(key) is flight:
+                del _inflight[key]
+
+    async def _resolve(self, key: str, fn: Callable[[], Awaitable[Any]], deadline: float,
+                       encode: Callable[[Any], str], decode: Callable[[str], Any]) -> Any:
+        lease_key = f"{SINGLE_FLIGHT_PREFIX}:{key}:lease"
+        result_key = f"{SINGLE_FLIGHT_PREFIX}:{key}:result"
+        token = uuid.uuid4().hex
+
+        while True:
+            try:
+                acquired = await self.redis_client.set(lease_key, token, nx=True, px=self.lease_ms)
+            except Exception as e:
+                # Without Redis we can still coalesce within this worker
+                single_flight_stats.redis_errors += 1
+                logger.warning(f"Single-flight lease unavailable, running locally: {e}")
+                single_flight_stats.leaders += 1
+                return await fn()
+
+            if acquired:
+                single_flight_stats.leaders += 1
+                return await self._lead(lease_key, result_key, token, fn, encode)
+
+            single_flight_stats.remote_followers += 1
+            outcome = await self._follow(lease_key, result_key, deadline, decode)
+            if outcome is not _LEADER_GONE:
+                single_flight_stats.remote_results += 1
+                return outcome
+
+            single_flight_stats.leader_failovers += 1
+            logger.warning(f"Single-flight leader for {key} went away, taking over")
+
+    async def _lead(self, lease_key: str, result_key: str, token: str,
+                    fn: Callable[[], Awaitable[Any]], encode: Callable[[Any], str]) -> Any:
+        heartbeat = asyncio.create_task(self._renew_lease(lease_key, token))
+        try:
+            result = await fn()
+            try:
+                await self.redis_client.set(result_key, encode(result), ex=self.result_ttl_seconds)
+            except Exception as e:
+                single_flight_stats.redis_errors += 1
+                logger.warning(f"Failed to publish single-flight result: {e}")
+            return result
+        finally:
+            heartbeat.cancel()
+            try:
+                await self.redis_client.eval(RELEASE_LEASE_SCRIPT, 1, lease_key, token)
+            except Exception as e:
+                single_flight_stats.redis_errors += 1
+                logger.warning(f"Failed to release single-flight lease: {e}")
+
+    async def _renew_lease(self, lease_key: str, token: str):
+        """Keep the lease alive while the leader works; it lapses quickly if this worker dies"""
+        while True:
+            await asyncio.sleep(self.lease_ms / 3000)
+            try:
+                await self.redis_client.eval(RENEW_LEASE_SCRIPT, 1, lease_key, token, self.lease_ms)
+            except Exception as e:
+                single_flight_stats.redis_errors += 1
+                logger.warning(f"Failed to renew single-flight lease: {e}")
+
+    async def _follow(self, lease_key: str, result_key: str, deadline: float, decode: Callable[[str], Any]) -> Any:
+        """Wait for the leader's published result, or report that the leader is gone"""
+        while True:
+            try:
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.get(result_key)
+                pipe.exists(lease_key)
+                raw_result, lease_alive = await pipe.execute()
+            except Exception as e:
+                single_flight_stats.redis_errors += 1
+                logger.warning(f"Single-flight poll failed: {e}")
+                return _LEADER_GONE
+
+            if raw_result:
+                return decode(raw_result)
+            if not lease_alive:
+                return _LEADER_GONE
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError("Timed out waiting for in-flight search")
+            await asyncio.sleep(min(self.poll_interval, remaining))
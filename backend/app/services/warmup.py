@@ -0,0 +1,113 @@
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+from loguru import logger
+
+from ..models.schemas import RetailerConfig, RetailerStatus
+from .http_pool import HTTPClientPool, http_client_pool
+
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "5"))
+WARMUP_INTERVAL_SECONDS = float(os.getenv("WARMUP_INTERVAL_SECONDS", "30"))
+WARMUP_CONNECTIONS_PER_HOST = int(os.getenv("WARMUP_CONNECTIONS_PER_HOST", "2"))
+
+
+class ConnectionWarmer:
+    """
+    Pre-resolves and pre-connects to every active retailer
+    Runs once at startup so the first searches after a deploy find warm
+    connections, then periodically re-resolves DNS and re-warms hosts whose
+    idle connections have expired.
+    """
+
+    def __init__(self, pool: HTTPClientPool):
+        self.pool = pool
+        self.ready = asyncio.Event()
+        self.warmed_at: Optional[float] = None
+        self.last_results: Dict[str, bool] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, configs: List[RetailerConfig], timeout: float = WARMUP_TIMEOUT_SECONDS):
+        """Start warm-up in the background; readiness flips when it finishes or times out"""
+        self._task = asyncio.create_task(self._run(configs, timeout))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self, configs: List[RetailerConfig], timeout: float):
+        start_time = time.time()
+        try:
+            await asyncio.wait_for(self.warm_all(configs), timeout=timeout)
+            logger.info(f"Connection warm-up finished in {int((time.time() - start_time) * 1000)}ms")
+        except asyncio.TimeoutError:
+            logger.warning(f"Connection warm-up timed out after {timeout}s, serving anyway")
+        finally:
+            self.ready.set()
+
+        while True:
+            await asyncio.sleep(WARMUP_INTERVAL_SECONDS)
+            try:
+                await self.rewarm(configs)
+            except Exception as e:
+                logger.warning(f"Connection re-warm failed: {e}")
+
+    async def warm_all(self, configs: List[RetailerConfig]):
+        """Resolve and pre-connect to all active retailers concurrently"""
+        active = [config for config in configs if config.status == RetailerStatus.ACTIVE]
+        results = await asyncio.gather(*(self.warm(config) for config in active))
+        self.last_results = {config.name: ok for config, ok in zip(active, results)}
+        self.warmed_at = time.time()
+
+    async def warm(self, config: RetailerConfig) -> bool:
+        """Resolve a retailer's host and open keep-alive connections to it"""
+        parts = urlsplit(config.base_url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        try:
+            await self.pool.dns_cache.resolve(parts.hostname, port)
+        except OSError as e:
+            logger.warning(f"[{config.name}] DNS warm-up failed: {e}")
+            return False
+
+        client = self.pool.get_client(config)
+        connections = min(WARMUP_CONNECTIONS_PER_HOST, config.max_keepalive_connections)
+        responses = await asyncio.gather(
+            *(client.head(config.base_url) for _ in range(connections)),
+            return_exceptions=True
+        )
+        errors = [response for response in responses if isinstance(response, Exception)]
+        if errors:
+            logger.warning(f"[{config.name}] Connection warm-up failed: {errors[0]!r}")
+        return len(errors) < len(responses)
+
+    async def rewarm(self, configs: List[RetailerConfig]):
+        """Refresh expiring DNS entries and reconnect hosts with no idle connections"""
+        for host, port in self.pool.dns_cache.expiring(WARMUP_INTERVAL_SECONDS):
+            try:
+                await self.pool.dns_cache.resolve(host, port)
+            except OSError as e:
+                logger.warning(f"DNS refresh failed for {host}: {e}")
+
+        cold = [
+            config for config in configs
+            if config.status == RetailerStatus.ACTIVE and self.pool.idle_connections(config.base_url) == 0
+        ]
+        if cold:
+            await asyncio.gather(*(self.warm(config) for config in cold))
+            logger.info(f"Re-warmed connections to {len(cold)} retailers")
+
+    def snapshot(self) -> Dict:
+        return {
+            "ready": self.ready.is_set(),
+            "warmed_at": self.warmed_at,
+            "retailers": self.last_results,
+            "dns_cache": self.pool.dns_cache.snapshot()
+        }
+
+
+connection_warmer = ConnectionWarmer(http_client_pool)
@@ -1,9 +1,11 @@
-from typing import List, Optional, Dict, Set
+from typing import List, Optional, Dict, Set, Tuple
 import re
 from loguru import logger
 import redis.asyncio as redis
 
 from ..models.schemas import Product, Language
+from .product_grouping import listing_key
+from .product_index import ProductIndex
 
 class AlternativeFinder:
     """
@@ -132,40 +134,14 @@ class AlternativeFinder:
         return alternatives
     
     async def _get_cached_alternatives(self, query: str, redis_client: redis.Redis) -> List[Product]:
-        """Get alternatives from Redis cache"""
+        """Get alternatives from recently scraped products via the token index"""
         try:
-            # Look for recent searches with similar queries
-            keys_pattern = f"search:*:*:product:*"
-            keys = await redis_client.keys(keys_pattern)
+            matches = await ProductIndex(redis_client).search(query, limit=50)
             
             alternative_products = []
-            query_words = set(query.lower().split())
-            
-            for key in keys[:50]:  # Limit to avoid performance issues
-                try:
-                    product_data = await redis_client.hgetall(key)
-                    if not product_data:
-                        continue
-                    
-                    # Check if product name contains any query words
-                    product_name = product_data.get('name', '').lower()
-                    product_words = set(product_name.split())
-                    
-                    # If there's word overlap, consider it an alternative
-                    if query_words & product_words:
-                        # Reconstruct product (simplified)
-                        product = Product(
-                            name=product_data.get('name', ''),
-                            price=float(product_data.get('price', 0)),
-                            retailer=product_data.get('retailer', ''),
-                            url=product_data.get('url', ''),
-                            brand=product_data.get('brand'),
-                            confidence_score=0.6  # Lower confidence for cached alternatives
-                        )
-                        alternative_products.append(product)
-                        
-                except (ValueError, KeyError) as e:
-                    continue
+            for _, product in matches:
+                product.confidence_score = 0.6  # Lower confidence for cached alternatives
+                alternative_products.append(product)
             
             return alternative_products
             
@@ -174,21 +150,30 @@ class AlternativeFinder:
             return []
     
     def _filter_duplicates(self, alternatives: List[Product], existing: List[Product]) -> List[Product]:
-        """Filter out products that are too similar to existing ones"""
+        """
+        Filter out products that are too similar to existing ones
+        Listings already shown as another product's offers count as existing too.
+        """
         filtered = []
         existing_signatures = set()
+        existing_listings = set()
         
         # Create signatures for existing products
         for product in existing:
             signature = self._create_product_signature(product)
             existing_signatures.add(signature)
+            existing_listings.add(listing_key(product))
+            existing_listings.update((offer.retailer, offer.url or offer.name) for offer in product.offers)
         
         # Filter alternatives
         for product in alternatives:
             signature = self._create_product_signature(product)
-            if signature not in existing_signatures:
+            listing = listing_key(product)
+            if signature not in existing_signatures and listing not in existing_listings:
                 filtered.append(product)
-                existing_signatures.add(signature)  # Avoid duplicates within alternatives
+                # Avoid duplicates within alternatives
+                existing_signatures.add(signature)
+                existing_listings.add(listing)
         
         return filtered
     
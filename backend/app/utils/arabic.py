@@ -0,0 +1,44 @@
+import re
+from typing import List
+
+# Harakat, Quranic annotation marks and the superscript alef
+DIACRITICS_PATTERN = re.compile(r'[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED]')
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+# Letter variants shoppers and retailers use interchangeably, folded to one form
+FOLD_TABLE = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي',
+    'ؤ': 'و',
+    'ة': 'ه',
+    '\u0640': None,  # tatweel
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},
+    **{chr(0x06F0 + digit): str(digit) for digit in range(10)},
+    '٫': '.',
+    '٬': ',',
+})
+
+# Definite article and the conjunction/preposition forms glued to it
+ARTICLE_PREFIXES = ('وال', 'بال', 'كال', 'فال', 'ال', 'لل')
+
+# Letters that must remain after stripping, so e.g. "الو" isn't reduced to one letter
+MIN_STEM_LENGTH = 2
+
+
+def fold_arabic(text: str) -> str:
+    """Lowercase and fold spelling variants, diacritics and Arabic-Indic digits"""
+    return DIACRITICS_PATTERN.sub('', text.lower()).translate(FOLD_TABLE)
+
+
+def strip_article(token: str) -> str:
+    """Drop a leading definite article, e.g. "اللبن" -> "لبن" """
+    for prefix in ARTICLE_PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= MIN_STEM_LENGTH:
+            return token[len(prefix):]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Folded search tokens for matching Arabic and English product text"""
+    return [strip_article(token) for token in TOKEN_PATTERN.findall(fold_arabic(text))]
@@ -0,0 +1,118 @@
+from itertools import combinations
+from math import comb
+from typing import List, NamedTuple, Sequence, Tuple
+import numpy as np
+
+# Store subsets are enumerated exactly up to this many; larger searches go greedy
+BASKET_EXACT_MAX_SUBSETS = 4096
+
+
+class BasketSolution(NamedTuple):
+    """Cheapest way found to buy the items from a set of stores"""
+    stores: Tuple[int, ...]  # store columns actually used
+    assignment: np.ndarray  # store column per item, -1 when no chosen store carries it
+    items_cost: float
+    fees: float
+    missing: int
+
+    @property
+    def total(self) -> float:
+        return self.items_cost + self.fees
+
+
+def subset_count(stores: int, max_stores: int) -> int:
+    return sum(comb(stores, size) for size in range(1, min(stores, max_stores) + 1))
+
+
+def _evaluate(costs: np.ndarray, fees: np.ndarray, subsets: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (missing items, total cost) of buying each item at its cheapest store of each subset
+    costs is (items, stores) with inf where a store lacks an item; subsets is
+    (subsets, size). Every store of a subset pays its fee: a subset with an
+    unused store is never better than the smaller subset without it.
+    """
+    cheapest = costs[:, subsets].min(axis=2)
+    available = np.isfinite(cheapest)
+    missing = (~available).sum(axis=0)
+    totals = np.where(available, cheapest, 0.0).sum(axis=0) + fees[subsets].sum(axis=1)
+    return missing, totals
+
+
+def _best(missing: np.ndarray, totals: np.ndarray) -> int:
+    """Index covering the most items, cheapest among those"""
+    return int(np.lexsort((totals, missing))[0])
+
+
+def _solution(costs: np.ndarray, fees: np.ndarray, stores: Sequence[int]) -> BasketSolution:
+    columns = np.array(stores, dtype=np.intp)
+    chosen = costs[:, columns]
+    best = chosen.argmin(axis=1)
+    item_costs = chosen[np.arange(len(costs)), best]
+    available = np.isfinite(item_costs)
+    assignment = np.where(available, columns[best], -1)
+    used = tuple(int(store) for store in np.unique(assignment[available]))
+    return BasketSolution(
+        stores=used,
+        assignment=assignment,
+        items_cost=float(item_costs[available].sum()),
+        fees=float(fees[list(used)].sum()),
+        missing=int((~available).sum())
+    )
+
+
+def solve_exact(costs: np.ndarray, fees: np.ndarray, max_stores: int) -> BasketSolution:
+    """Optimal plan by scoring every subset of at most max_stores stores, one batch per size"""
+    stores = costs.shape[1]
+    best_key, best_subset = None, ()
+    for size in range(1, min(stores, max_stores) + 1):
+        subsets = np.array(list(combinations(range(stores), size)), dtype=np.intp)
+        missing, totals = _evaluate(costs, fees, subsets)
+        i = _best(missing, totals)
+        key = (missing[i], totals[i])
+        if best_key is None or key < best_key:
+            best_key, best_subset = key, tuple(subsets[i])
+    return _solution(costs, fees, best_subset)
+
+
+def solve_greedy(costs: np.ndarray, fees: np.ndarray, max_stores: int) -> BasketSolution:
+    """
+    Near-optimal plan for large searches
+    Stores are added one at a time while the best addition improves the plan,
+    then single-store swaps are applied until none helps.
+    """
+    stores = costs.shape[1]
+    chosen: List[int] = []
+    best_key = None
+    while len(chosen) < min(stores, max_stores):
+        candidates = [store for store in range(stores) if store not in chosen]
+        subsets = np.array([chosen + [store] for store in candidates], dtype=np.intp)
+        missing, totals = _evaluate(costs, fees, subsets)
+        i = _best(missing, totals)
+        key = (missing[i], totals[i])
+        if best_key is not None and key >= best_key:
+            break
+        chosen, best_key = list(subsets[i]), key
+
+    improved = True
+    while improved:
+        improved = False
+        for position in range(len(chosen)):
+            candidates = [store for store in range(stores) if store not in chosen]
+            if not candidates:
+                break
+            subsets = np.array([chosen[:position] + [store] + chosen[position + 1:] for store in candidates], dtype=np.intp)
+            missing, totals = _evaluate(costs, fees, subsets)
+            i = _best(missing, totals)
+            if (missing[i], totals[i]) < best_key:
+                chosen, best_key, improved = list(subsets[i]), (missing[i], totals[i]), True
+    return _solution(costs, fees, chosen)
+
+
+def solve(costs: np.ndarray, fees: np.ndarray, max_stores: int) -> Tuple[BasketSolution, str]:
+    """
+    Cheapest plan buying each item at one of at most max_stores stores, and the solver used
+    Plans carrying more of the items always win; cost breaks ties.
+    """
+    if subset_count(costs.shape[1], max_stores) <= BASKET_EXACT_MAX_SUBSETS:
+        return solve_exact(costs, fees, max_stores), "exact"
+    return solve_greedy(costs, fees, max_stores), "greedy"
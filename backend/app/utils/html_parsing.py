@@ -0,0 +1,131 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+from bs4 import BeautifulSoup, FeatureNotFound
+
+# Default BeautifulSoup tree builder; "lxml" is C-backed and several times faster than "html.parser"
+HTML_PARSER = os.getenv("HTML_PARSER", "lxml")
+
+# Pages parsed at once per worker; bounds CPU spent on parsing while the loop keeps serving
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "4"))
+
+# Backends BeautifulSoup can use, fastest first
+PARSER_BACKENDS = ("lxml", "html5lib", "html.parser")
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+class ParseStats:
+    """Extraction path and timings for one retailer"""
+
+    def __init__(self):
+        self.pages = 0
+        self.bytes = 0
+        self.structured_pages = 0
+        self.dom_pages = 0
+        self.structured_ms = 0.0
+        self.parse_ms = 0.0
+        self.extract_ms = 0.0
+        self.max_parse_ms = 0.0
+
+    def record(self, size: int, path: str, structured_ms: float, parse_ms: float, extract_ms: float):
+        self.pages += 1
+        self.bytes += size
+        self.structured_ms += structured_ms
+        if path == "structured":
+            self.structured_pages += 1
+            return
+        self.dom_pages += 1
+        self.parse_ms += parse_ms
+        self.extract_ms += extract_ms
+        self.max_parse_ms = max(self.max_parse_ms, parse_ms)
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "pages": self.pages,
+            "bytes": self.bytes,
+            "structured_pages": self.structured_pages,
+            "dom_pages": self.dom_pages,
+            "avg_structured_ms": round(self.structured_ms / self.pages, 2) if self.pages else 0.0,
+            "avg_parse_ms": round(self.parse_ms / self.dom_pages, 2) if self.dom_pages else 0.0,
+            "avg_extract_ms": round(self.extract_ms / self.dom_pages, 2) if self.dom_pages else 0.0,
+            "max_parse_ms": round(self.max_parse_ms, 2),
+        }
+
+
+_parse_stats: Dict[str, ParseStats] = {}
+
+
+def parse_stats_snapshot() -> Dict[str, Dict]:
+    return {retailer: stats.snapshot() for retailer, stats in _parse_stats.items()}
+
+
+def get_parse_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=PARSE_WORKERS, thread_name_prefix="html-parse")
+    return _executor
+
+
+def shutdown_parse_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def make_soup(html: str, parser: Optional[str] = None) -> BeautifulSoup:
+    """Build a soup with the requested backend, falling back to the stdlib parser"""
+    try:
+        return BeautifulSoup(html, parser or HTML_PARSER)
+    except FeatureNotFound:
+        return BeautifulSoup(html, "html.parser")
+
+
+def parse_and_extract(
+    html: str,
+    extract: Callable[[BeautifulSoup], T],
+    parser: Optional[str] = None,
+    structured: Optional[Callable[[str], Optional[T]]] = None
+) -> Tuple[T, str, float, float, float]:
+    """
+    Extract from a page, trying the structured-data extractor before building a soup
+    Returns the result, the path used ("structured" or "dom") and the
+    structured, parse and extract times in ms.
+    """
+    structured_ms = 0.0
+    if structured is not None:
+        start = time.perf_counter()
+        result = structured(html)
+        structured_ms = (time.perf_counter() - start) * 1000
+        if result:
+            return result, "structured", structured_ms, 0.0, 0.0
+
+    start = time.perf_counter()
+    soup = make_soup(html, parser)
+    parsed = time.perf_counter()
+    result = extract(soup)
+    return result, "dom", structured_ms, (parsed - start) * 1000, (time.perf_counter() - parsed) * 1000
+
+
+async def parse_html(
+    retailer: str,
+    html: str,
+    extract: Callable[[BeautifulSoup], T],
+    parser: Optional[str] = None,
+    structured: Optional[Callable[[str], Optional[T]]] = None
+) -> T:
+    """
+    Extract from a page on the bounded parse pool
+    Keeps parsing off the event loop and records per-retailer path and timings.
+    """
+    loop = asyncio.get_running_loop()
+    result, path, structured_ms, parse_ms, extract_ms = await loop.run_in_executor(
+        get_parse_executor(), parse_and_extract, html, extract, parser, structured
+    )
+    _parse_stats.setdefault(retailer, ParseStats()).record(len(html), path, structured_ms, parse_ms, extract_ms)
+    return result
@@ -1,8 +1,112 @@
+import asyncio
+import os
 import re
-from typing import Optional, Tuple, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Optional, Tuple, Dict, List, NamedTuple, Set
 from loguru import logger
 
 from ..models.schemas import Product, WeightUnit
+from .unit_extraction import extract_measurement
+
+# Batches at least this large (catalog or basket sized) are normalized on a worker thread
+NORMALIZE_OFFLOAD_THRESHOLD = int(os.getenv("NORMALIZE_OFFLOAD_THRESHOLD", "64"))
+NORMALIZE_WORKERS = int(os.getenv("NORMALIZE_WORKERS", "2"))
+
+ARABIC_PATTERN = re.compile(r'[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF\uFB50-\uFDFF\uFE70-\uFEFF]+')
+
+WEIGHT_UNIT_VALUES = frozenset(unit.value for unit in WeightUnit)
+
+# Brand name aliases for normalization
+BRAND_ALIASES = MappingProxyType({
+    # Common Egyptian brand variations
+    'العامة': 'General Egyptian Company',
+    'الاهلى': 'Al Ahly',
+    'العائلة': 'Al Ayla',
+    'فريش': 'Fresh',
+    'جهينة': 'Juhayna',
+    'الوادى': 'Al Wadi',
+    'المراعى': 'Almarai',
+    'نستله': 'Nestle',
+    'كرافت': 'Kraft',
+    'يونيليفر': 'Unilever',
+    'سيدى سالم': 'Sidi Salem',
+    'كيللو': 'Kello',
+    'العلالى': 'Al Alali',
+    'كريستال': 'Crystal',
+    'دومتي': 'Domty',
+    'العروسة': 'El Arosa',
+    'الضحى': 'El Doha',
+    'ليبتون': 'Lipton',
+    # Add more as needed
+})
+
+# Category classification keywords
+CATEGORY_KEYWORDS = MappingProxyType({
+    'dairy': ('لبن', 'جبن', 'زبد', 'كريمة', 'milk', 'cheese', 'butter', 'cream'),
+    'meat': ('لحمة', 'فراخ', 'سمك', 'meat', 'chicken', 'fish', 'beef'),
+    'vegetables': ('خضار', 'طماطم', 'بصل', 'جزر', 'vegetables', 'tomato', 'onion', 'carrot'),
+    'fruits': ('فاكهة', 'تفاح', 'موز', 'برتقال', 'fruits', 'apple', 'banana', 'orange'),
+    'grains': ('أرز', 'عيش', 'مكرونة', 'rice', 'bread', 'pasta'),
+    'beverages': ('مشروبات', 'عصير', 'مياه', 'شاى', 'drinks', 'juice', 'water', 'tea'),
+    'cleaning': ('منظفات', 'صابون', 'شامبو', 'cleaning', 'soap', 'shampoo'),
+    'personal_care': ('عناية شخصية', 'معجون أسنان', 'كريم', 'personal care', 'toothpaste', 'cream')
+})
+
+# Lowercased once at import instead of on every product
+BRAND_ALIASES_LOWER = tuple((alias.lower(), canonical) for alias, canonical in BRAND_ALIASES.items())
+CATEGORY_KEYWORDS_LOWER = tuple(
+    (category, tuple(keyword.lower() for keyword in keywords))
+    for category, keywords in CATEGORY_KEYWORDS.items()
+)
+
+
+class NormalizeStats:
+    """Per-process normalization counters exposed through /metrics"""
+    
+    def __init__(self):
+        self.batches_inline = 0
+        self.batches_offloaded = 0
+        self.products = 0
+    
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            "batches_inline": self.batches_inline,
+            "batches_offloaded": self.batches_offloaded,
+            "products": self.products,
+        }
+
+
+normalize_stats = NormalizeStats()
+
+
+class QueryContext(NamedTuple):
+    """Query-derived values shared by every product in a batch"""
+    lower: str
+    words: Set[str]
+    
+    @classmethod
+    def from_query(cls, query: str) -> "QueryContext":
+        query_lower = query.lower()
+        return cls(query_lower, set(query_lower.split()))
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_normalize_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=NORMALIZE_WORKERS, thread_name_prefix="normalize")
+    return _executor
+
+
+def shutdown_normalize_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
 
 class ProductNormalizer:
     """
@@ -11,69 +115,68 @@ class ProductNormalizer:
     """
     
     def __init__(self):
-        self.brand_aliases = self._load_brand_aliases()
-        self.category_keywords = self._load_category_keywords()
-        
-    def _load_brand_aliases(self) -> Dict[str, str]:
-        """Load brand name aliases for normalization"""
-        return {
-            # Common Egyptian brand variations
-            'العامة': 'General Egyptian Company',
-            'الاهلى': 'Al Ahly',
-            'العائلة': 'Al Ayla',
-            'فريش': 'Fresh',
-            'جهينة': 'Juhayna',
-            'الوادى': 'Al Wadi',
-            'المراعى': 'Almarai',
-            'نستله': 'Nestle',
-            'كرافت': 'Kraft',
-            'يونيليفر': 'Unilever',
-            'سيدى سالم': 'Sidi Salem',
-            'كيللو': 'Kello',
-            'العلالى': 'Al Alali',
-            # Add more as needed
-        }
-    
-    def _load_category_keywords(self) -> Dict[str, list]:
-        """Load category classification keywords"""
-        return {
-            'dairy': ['لبن', 'جبن', 'زبد', 'كريمة', 'milk', 'cheese', 'butter', 'cream'],
-            'meat': ['لحمة', 'فراخ', 'سمك', 'meat', 'chicken', 'fish', 'beef'],
-            'vegetables': ['خضار', 'طماطم', 'بصل', 'جزر', 'vegetables', 'tomato', 'onion', 'carrot'],
-            'fruits': ['فاكهة', 'تفاح', 'موز', 'برتقال', 'fruits', 'apple', 'banana', 'orange'],
-            'grains': ['أرز', 'عيش', 'مكرونة', 'rice', 'bread', 'pasta'],
-            'beverages': ['مشروبات', 'عصير', 'مياه', 'شاى', 'drinks', 'juice', 'water', 'tea'],
-            'cleaning': ['منظفات', 'صابون', 'شامبو', 'cleaning', 'soap', 'shampoo'],
-            'personal_care': ['عناية شخصية', 'معجون أسنان', 'كريم', 'personal care', 'toothpaste', 'cream']
-        }
+        # Shared, read-only tables; building a normalizer costs nothing
+        self.brand_aliases = BRAND_ALIASES
+        self.category_keywords = CATEGORY_KEYWORDS
+        self._brand_aliases_lower = BRAND_ALIASES_LOWER
+        self._category_keywords_lower = CATEGORY_KEYWORDS_LOWER
     
     async def normalize_product(self, product: Product, original_query: str) -> Product:
         """
         Normalize a product for standardized comparison
         """
+        return self._normalize(product, QueryContext.from_query(original_query))
+    
+    async def normalize_batch(self, products: List[Product], query: str) -> List[Product]:
+        """
+        Normalize a whole result list in one call
+        A retailer's page of a few dozen products, about 0.03 ms each, runs
+        inline. Batches of NORMALIZE_OFFLOAD_THRESHOLD or more run on the
+        normalization threads so they don't hold up other searches on the loop;
+        threads rather than processes, since products would cost more to pickle
+        than to normalize and forking a threaded worker is unsafe.
+        """
+        normalize_stats.products += len(products)
+        if len(products) < NORMALIZE_OFFLOAD_THRESHOLD:
+            normalize_stats.batches_inline += 1
+            return self.normalize_batch_sync(products, query)
+        
+        normalize_stats.batches_offloaded += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_normalize_executor(), self.normalize_batch_sync, products, query)
+    
+    def normalize_batch_sync(self, products: List[Product], query: str) -> List[Product]:
+        """Normalize products in the calling thread, sharing the query precomputation"""
+        query_context = QueryContext.from_query(query)
+        return [self._normalize(product, query_context) for product in products]
+    
+    def _normalize(self, product: Product, query: QueryContext) -> Product:
+        """Normalize one product; returns it unchanged if normalization fails"""
         try:
             # Normalize brand
             normalized_brand = self._normalize_brand(product.brand)
             
             # Extract and normalize weight
-            weight, unit = self._extract_weight_from_name(product.name)
+            weight, unit, pack_count = extract_measurement(product.name)
             if not weight and product.weight:
                 weight = product.weight
                 unit = product.weight_unit.value if product.weight_unit else None
+                pack_count = product.pack_count
             
-            # Calculate price per unit
+            # Calculate price per unit over the whole pack
             price_per_unit, price_per_kg = self._calculate_price_per_unit(
-                product.price, weight, unit
+                product.price, weight * (pack_count or 1) if weight else weight, unit
             )
             
             # Classify category
             category = self._classify_category(product.name, product.brand)
             
             # Calculate confidence score
-            confidence = self._calculate_confidence_score(product, original_query)
+            confidence = self._calculate_confidence_score(product, query)
             
-            # Create normalized product
-            normalized_product = Product(
+            # Create normalized product; every field comes from the already validated
+            # product or is computed in range here, so validation is skipped
+            normalized_product = Product.model_construct(
                 name=product.name,
                 name_ar=self._extract_arabic_name(product.name),
                 name_en=self._extract_english_name(product.name),
@@ -84,7 +187,8 @@ class ProductNormalizer:
                 url=product.url,
                 image_url=product.image_url,
                 weight=weight,
-                weight_unit=WeightUnit(unit) if unit and unit in [u.value for u in WeightUnit] else product.weight_unit,
+                weight_unit=WeightUnit(unit) if unit in WEIGHT_UNIT_VALUES else product.weight_unit,
+                pack_count=pack_count,
                 brand=normalized_brand,
                 category=category,
                 price_per_unit=price_per_unit,
@@ -110,66 +214,17 @@ class ProductNormalizer:
         brand_clean = brand.strip()
         
         # Check for direct alias match
-        for alias, canonical in self.brand_aliases.items():
-            if alias.lower() in brand_clean.lower():
+        brand_lower = brand_clean.lower()
+        for alias, canonical in self._brand_aliases_lower:
+            if alias in brand_lower:
                 return canonical
         
         return brand_clean.title()  # Title case for consistency
     
     def _extract_weight_from_name(self, name: str) -> Tuple[Optional[float], Optional[str]]:
         """Extract weight and unit from product name"""
-        patterns = [
-            # Arabic patterns
-            r'(\d+(?:\.\d+)?)\s*كيلو',
-            r'(\d+(?:\.\d+)?)\s*كجم',
-            r'(\d+(?:\.\d+)?)\s*جم',
-            r'(\d+(?:\.\d+)?)\s*جرام',
-            r'(\d+(?:\.\d+)?)\s*لتر',
-            r'(\d+(?:\.\d+)?)\s*مل',
-            r'(\d+)\s*قطعة',
-            r'(\d+)\s*حبة',
-            # English patterns
-            r'(\d+(?:\.\d+)?)\s*kg',
-            r'(\d+(?:\.\d+)?)\s*g\b',
-            r'(\d+(?:\.\d+)?)\s*gram',
-            r'(\d+(?:\.\d+)?)\s*l\b',
-            r'(\d+(?:\.\d+)?)\s*liter',
-            r'(\d+(?:\.\d+)?)\s*ml',
-            r'(\d+)\s*pc',
-            r'(\d+)\s*piece',
-            # Combined patterns
-            r'(\d+(?:\.\d+)?)\s*(kg|g|l|ml|pc|كيلو|جم|لتر|مل|قطعة|حبة)'
-        ]
-        
-        unit_mapping = {
-            'كيلو': 'kg', 'كجم': 'kg', 'kg': 'kg',
-            'جم': 'g', 'جرام': 'g', 'g': 'g', 'gram': 'g',
-            'لتر': 'l', 'l': 'l', 'liter': 'l',
-            'مل': 'ml', 'ml': 'ml',
-            'قطعة': 'pc', 'حبة': 'pc', 'pc': 'pc', 'piece': 'pc'
-        }
-        
-        for pattern in patterns:
-            match = re.search(pattern, name, re.IGNORECASE)
-            if match:
-                try:
-                    weight = float(match.group(1))
-                    unit = match.group(2) if len(match.groups()) > 1 else None
-                    
-                    if unit:
-                        normalized_unit = unit_mapping.get(unit.lower(), unit.lower())
-                        return weight, normalized_unit
-                    
-                    # Try to infer unit from context
-                    if weight >= 500:  # Likely grams
-                        return weight, 'g'
-                    elif weight >= 1:  # Likely kg
-                        return weight, 'kg'
-                        
-                except ValueError:
-                    continue
-        
-        return None, None
+        measurement = extract_measurement(name)
+        return measurement.weight, measurement.unit
     
     def _calculate_price_per_unit(self, price: float, weight: Optional[float], unit: Optional[str]) -> Tuple[Optional[float], Optional[float]]:
         """Calculate price per standard unit (100g/ml) and per kg"""
@@ -207,17 +262,17 @@ class ProductNormalizer:
         """Classify product into category based on keywords"""
         text_to_check = f"{name} {brand or ''}".lower()
         
-        for category, keywords in self.category_keywords.items():
+        for category, keywords in self._category_keywords_lower:
             for keyword in keywords:
-                if keyword.lower() in text_to_check:
+                if keyword in text_to_check:
                     return category
         
         return None
     
-    def _calculate_confidence_score(self, product: Product, query: str) -> float:
+    def _calculate_confidence_score(self, product: Product, query: QueryContext) -> float:
         """Calculate confidence score for product matching"""
         score = 0.0
-        query_lower = query.lower()
+        query_lower = query.lower
         name_lower = product.name.lower()
         
         # Exact query match in name
@@ -225,7 +280,7 @@ class ProductNormalizer:
             score += 0.4
         
         # Word-level matching
-        query_words = set(query_lower.split())
+        query_words = query.words
         name_words = set(name_lower.split())
         common_words = query_words & name_words
         if query_words:
@@ -249,8 +304,7 @@ class ProductNormalizer:
     def _extract_arabic_name(self, name: str) -> Optional[str]:
         """Extract Arabic portion of name"""
         # Check if name contains Arabic characters
-        arabic_pattern = r'[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF\uFB50-\uFDFF\uFE70-\uFEFF]+'
-        arabic_matches = re.findall(arabic_pattern, name)
+        arabic_matches = ARABIC_PATTERN.findall(name)
         
         if arabic_matches:
             return ' '.join(arabic_matches).strip()
@@ -260,8 +314,7 @@ class ProductNormalizer:
     def _extract_english_name(self, name: str) -> Optional[str]:
         """Extract English portion of name"""
         # Remove Arabic characters and get remaining text
-        arabic_pattern = r'[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF\uFB50-\uFDFF\uFE70-\uFEFF]+'
-        english_text = re.sub(arabic_pattern, ' ', name)
+        english_text = ARABIC_PATTERN.sub(' ', name)
         english_text = ' '.join(english_text.split())  # Clean whitespace
         
         if english_text and len(english_text) > 2:
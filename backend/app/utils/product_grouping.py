@@ -0,0 +1,276 @@
+import zlib
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+from ..models.schemas import Offer, Product
+from .arabic import tokenize
+from .normalization import BRAND_ALIASES
+from .unit_extraction import MEASUREMENT_PATTERN, UNIT_ALIASES
+
+# Arabic and English spellings of the same grocery term, reduced to one concept
+# token so "لبن كامل الدسم" and "full cream milk" compare as the same words
+GROCERY_TERMS = {
+    "milk": ("لبن", "حليب", "milk"),
+    "full_cream": ("كامل الدسم", "full cream", "full fat"),
+    "skimmed": ("خالي الدسم", "skimmed", "skim", "fat free"),
+    "low_fat": ("قليل الدسم", "نصف الدسم", "low fat", "semi skimmed"),
+    "rice": ("ارز", "رز", "rice"),
+    "oil": ("زيت", "oil"),
+    "sunflower": ("عباد الشمس", "sunflower"),
+    "corn": ("ذره", "corn"),
+    "sugar": ("سكر", "sugar"),
+    "salt": ("ملح", "salt"),
+    "tea": ("شاي", "tea"),
+    "coffee": ("قهوه", "coffee"),
+    "cheese": ("جبن", "جبنه", "cheese"),
+    "butter": ("زبده", "butter"),
+    "ghee": ("سمن", "ghee"),
+    "yogurt": ("زبادي", "yogurt", "yoghurt"),
+    "water": ("مياه", "ماء", "water"),
+    "juice": ("عصير", "juice"),
+    "pasta": ("مكرونه", "pasta", "macaroni"),
+    "spaghetti": ("اسباجتي", "سباجتي", "spaghetti"),
+    "flour": ("دقيق", "flour"),
+    "eggs": ("بيض", "egg", "eggs"),
+    "tuna": ("تونه", "tuna"),
+    "honey": ("عسل", "honey"),
+    "beans": ("فول", "foul", "fava"),
+    "chicken": ("فراخ", "دجاج", "chicken"),
+    "white": ("ابيض", "white"),
+    "soap": ("صابون", "soap"),
+    "detergent": ("منظف", "detergent"),
+}
+
+# Character shingle length; 3 copes with Arabic prefixes and plural suffixes
+SHINGLE_SIZE = 3
+
+# 16 bands of 4 rows: pairs above ~0.5 Jaccard share a band with high probability
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16
+LSH_ROWS = MINHASH_PERMUTATIONS // LSH_BANDS
+
+# Estimated Jaccard similarity two products need to be grouped
+GROUP_MIN_SIMILARITY = 0.6
+
+# Each product is checked against at most this many earlier members of a bucket,
+# so generic buckets can't make grouping quadratic
+MAX_BUCKET_COMPARISONS = 32
+
+# Per-unit multipliers into grams, millilitres or pieces
+BASE_UNITS = {"g": ("g", 1), "kg": ("g", 1000), "ml": ("ml", 1), "l": ("ml", 1000), "pc": ("pc", 1), "pack": ("pc", 1)}
+
+# Multiply-shift hashing: (a * x + b) mod 2**64, keeping the high 32 bits
+_random = np.random.default_rng(20240917)
+_HASH_A = _random.integers(1, 1 << 63, MINHASH_PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+_HASH_B = _random.integers(0, 1 << 63, MINHASH_PERMUTATIONS, dtype=np.uint64)
+_HASH_SHIFT = np.uint64(32)
+# Folds the rows of a band into one integer bucket key (wrapping is fine for hashing)
+_BAND_MIX = _random.integers(1, 1 << 63, LSH_ROWS, dtype=np.uint64)
+
+
+def _build_lexicon() -> Tuple[Dict[str, str], Dict[Tuple[str, str], str]]:
+    """Folded single words and word pairs mapped to concept tokens"""
+    words: Dict[str, str] = {}
+    pairs: Dict[Tuple[str, str], str] = {}
+    variants = [(concept, spelling) for concept, spellings in GROCERY_TERMS.items() for spelling in spellings]
+    # Brands in Arabic map to their canonical English name, which also maps to itself
+    for alias, canonical in BRAND_ALIASES.items():
+        concept = "_".join(tokenize(canonical))
+        variants += [(concept, alias), (concept, canonical)]
+    for concept, spelling in variants:
+        tokens = tokenize(spelling)
+        if len(tokens) == 1:
+            words[tokens[0]] = concept
+        elif len(tokens) == 2:
+            pairs[tuple(tokens)] = concept
+    return words, pairs
+
+
+LEXICON_WORDS, LEXICON_PAIRS = _build_lexicon()
+
+BRAND_CONCEPTS = frozenset("_".join(tokenize(canonical)) for canonical in BRAND_ALIASES.values())
+
+# Sizes are compared through weight keys, so unit words don't count towards similarity
+UNIT_WORDS = frozenset(token for alias in UNIT_ALIASES for token in tokenize(alias))
+
+
+@lru_cache(maxsize=16384)
+def concept_tokens(text: str) -> Tuple[str, ...]:
+    """
+    Folded words of a product name with grocery terms and brands mapped to shared concepts
+    Measurements such as "6 x 200 ml" are left out, since sizes are compared
+    through size keys; other numbers ("25 bags", "A14") are kept.
+    """
+    tokens = [token for token in tokenize(MEASUREMENT_PATTERN.sub(" ", text)) if token not in UNIT_WORDS]
+    concepts = []
+    i = 0
+    while i < len(tokens):
+        pair = LEXICON_PAIRS.get(tuple(tokens[i:i + 2]))
+        if pair:
+            concepts.append(pair)
+            i += 2
+        else:
+            concepts.append(LEXICON_WORDS.get(tokens[i], tokens[i]))
+            i += 1
+    return tuple(concepts)
+
+
+def _signatures(texts: List[str]) -> np.ndarray:
+    """MinHash signatures over the character shingles of each text, one row per text"""
+    hashes: List[int] = []
+    offsets = []
+    for text in texts:
+        padded = f" {text} "
+        offsets.append(len(hashes))
+        hashes.extend({zlib.crc32(padded[i:i + SHINGLE_SIZE].encode("utf-8")) for i in range(max(1, len(padded) - SHINGLE_SIZE + 1))})
+    shingles = np.array(hashes, dtype=np.uint64)
+    starts = np.array(offsets, dtype=np.intp)
+    # One permutation at a time over every shingle keeps memory at a single column
+    signatures = np.empty((len(texts), MINHASH_PERMUTATIONS), dtype=np.uint64)
+    for k in range(MINHASH_PERMUTATIONS):
+        signatures[:, k] = np.minimum.reduceat((_HASH_A[k] * shingles + _HASH_B[k]) >> _HASH_SHIFT, starts)
+    return signatures
+
+
+def _size_key(product: Product) -> Optional[Tuple[str, float, int]]:
+    """(base unit, quantity per item, pack count), so 1 l and 1000 ml match; None when unknown"""
+    if not product.weight or not product.weight_unit or product.weight_unit.value not in BASE_UNITS:
+        return None
+    base_unit, multiplier = BASE_UNITS[product.weight_unit.value]
+    return base_unit, round(product.weight * multiplier, 1), product.pack_count or 1
+
+
+def brand_key(product: Product, concepts: Tuple[str, ...]) -> Optional[str]:
+    """The product's brand, from its brand field or a known brand named in the title"""
+    if product.brand:
+        return "_".join(concept_tokens(product.brand))
+    return next((concept for concept in concepts if concept in BRAND_CONCEPTS), None)
+
+
+def _identifiers(concepts: Tuple[str, ...]) -> frozenset:
+    """Tokens with digits, like counts and model numbers; products must agree on all of them"""
+    return frozenset(concept for concept in concepts if any(char.isdigit() for char in concept))
+
+
+def family_key(product: Product) -> Optional[Tuple[str, str, Optional[str]]]:
+    """
+    What a product is regardless of pack size: (base unit, concept text, brand)
+    Juhayna full cream milk in 1 l, 2 l and 6 x 200 ml share a key; None when
+    the size is unknown, since such products can't be compared per unit.
+    """
+    size = _size_key(product)
+    if size is None:
+        return None
+    concepts = concept_tokens(product.name)
+    # The brand is compared through its own key, whether it's named in the title or not
+    text = " ".join(sorted(concept for concept in concepts if concept not in BRAND_CONCEPTS))
+    return size[0], text, brand_key(product, concepts)
+
+
+def listing_key(product: Product) -> Tuple[str, str]:
+    """The retailer listing a product was scraped from: its URL, or its name when it has none"""
+    return product.retailer, product.url or product.name
+
+
+def _find(parents: List[int], i: int) -> int:
+    while parents[i] != i:
+        parents[i] = parents[parents[i]]
+        i = parents[i]
+    return i
+
+
+def to_offer(product: Product, **overrides) -> Offer:
+    fields = dict(
+        retailer=product.retailer,
+        name=product.name,
+        price=product.price,
+        url=product.url,
+        image_url=product.image_url,
+        in_stock=product.in_stock,
+        price_per_unit=product.price_per_unit,
+        unit_price=product.unit_price,
+        unit_price_unit=product.unit_price_unit
+    )
+    fields.update(overrides)
+    # Copied from a validated product, so there is nothing to validate
+    return Offer.model_construct(**fields)
+
+
+def group_products(products: List[Product]) -> List[Product]:
+    """
+    Group equivalent products across retailers
+    Names are reduced to concept tokens, MinHashed over character shingles and
+    bucketed with LSH, so only products sharing a band are compared. A pair is
+    grouped when its estimated similarity is high enough, its sizes match, its
+    numbers (counts, model numbers) are the same and its brands don't conflict
+    with either group's brand. Products of unknown size are only grouped when
+    their concept tokens are the same. Each group is returned as its cheapest in-stock product with the
+    other offers nested in offers, cheapest first; groups keep the order of
+    their first product. A listing scraped more than once appears once.
+    """
+    if len(products) < 2:
+        return list(products)
+
+    concepts = [concept_tokens(product.name) for product in products]
+    texts = [" ".join(sorted(tokens)) for tokens in concepts]
+    sizes = [_size_key(product) for product in products]
+    brands = [brand_key(product, tokens) for product, tokens in zip(products, concepts)]
+    identifiers = [_identifiers(tokens) for tokens in concepts]
+    parents = list(range(len(products)))
+    # A product without a brand may join a branded group, but never link two brands
+    group_brands = list(brands)
+
+    # Identical listings are grouped outright; only one of them goes through LSH
+    distinct: Dict[tuple, int] = {}
+    for i in range(len(products)):
+        first = distinct.setdefault((texts[i], sizes[i], brands[i]), i)
+        if first != i:
+            parents[i] = first
+    candidates = list(distinct.values())
+    signatures = dict(zip(candidates, _signatures([texts[i] for i in candidates])))
+    matrix = np.stack([signatures[i] for i in candidates])
+    min_matches = GROUP_MIN_SIMILARITY * MINHASH_PERMUTATIONS
+
+    for band in range(LSH_BANDS):
+        band_keys = (matrix[:, band * LSH_ROWS:(band + 1) * LSH_ROWS] * _BAND_MIX).sum(axis=1).tolist()
+        # Sizes are part of the bucket, so differently sized products are never compared
+        buckets: Dict[tuple, List[int]] = {}
+        for i, band_key in zip(candidates, band_keys):
+            bucket = buckets.setdefault((sizes[i], band_key), [])
+            merged = False
+            for j in bucket[-MAX_BUCKET_COMPARISONS:]:
+                root_i, root_j = _find(parents, i), _find(parents, j)
+                if root_i == root_j:
+                    merged = True
+                    break
+                brand_i, brand_j = group_brands[root_i], group_brands[root_j]
+                if (brand_i and brand_j and brand_i != brand_j) or identifiers[i] != identifiers[j]:
+                    continue
+                if sizes[i] is None:
+                    # Without a size to agree on, "similar" could be a phone and its case
+                    similar = texts[i] == texts[j]
+                else:
+                    similar = np.count_nonzero(signatures[i] == signatures[j]) >= min_matches
+                if similar:
+                    parents[root_i] = root_j
+                    group_brands[root_j] = brand_j or brand_i
+                    merged = True
+                    break
+            # A product already grouped with a bucket member adds nothing new to compare against
+            if not merged:
+                bucket.append(i)
+
+    groups: Dict[int, Dict[Tuple[str, str], Product]] = {}
+    for i, product in enumerate(products):
+        groups.setdefault(_find(parents, i), {}).setdefault(listing_key(product), product)
+
+    grouped = []
+    for listings in groups.values():
+        members = list(listings.values())
+        if len(members) == 1:
+            grouped.append(members[0])
+            continue
+        members.sort(key=lambda product: (not product.in_stock, product.price))
+        grouped.append(members[0].model_copy(update={"offers": [to_offer(product) for product in members[1:]]}))
+    return grouped
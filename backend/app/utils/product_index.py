@@ -0,0 +1,154 @@
+import hashlib
+import time
+from typing import Dict, List, Sequence, Set, Tuple
+from loguru import logger
+import redis.asyncio as redis
+
+from ..models.schemas import Product
+from . import arabic
+
+INDEX_PREFIX = "pidx"
+PRODUCT_KEY_PREFIX = f"{INDEX_PREFIX}:product:"
+TOKEN_KEY_PREFIX = f"{INDEX_PREFIX}:token:"
+# Every live product id scored by expiry; its live count is the corpus size for IDF
+PRODUCTS_KEY = f"{INDEX_PREFIX}:products"
+
+# Same lifetime as the per-search product blobs
+PRODUCT_INDEX_TTL_SECONDS = 300
+
+# Single letters carry no meaning for matching
+MIN_TOKEN_LENGTH = 2
+
+# Products kept per token, those expiring last; a token this common has near-zero IDF anyway
+PRODUCT_INDEX_MAX_TOKEN_PRODUCTS = 5000
+
+# Runs server-side in one round trip: drops expired members from each token set,
+# counts how many query tokens every live product matches, and returns the best
+# matching ids with their counts. Only the token sets passed in KEYS are touched;
+# product blobs are read by the caller.
+SEARCH_SCRIPT = """
+local now = ARGV[1]
+local limit = tonumber(ARGV[2])
+local counts = {}
+local order = {}
+for _, key in ipairs(KEYS) do
+    redis.call('zremrangebyscore', key, '-inf', now)
+    for _, id in ipairs(redis.call('zrangebyscore', key, now, '+inf')) do
+        if not counts[id] then
+            counts[id] = 0
+            table.insert(order, id)
+        end
+        counts[id] = counts[id] + 1
+    end
+end
+table.sort(order, function(a, b)
+    if counts[a] == counts[b] then return a < b end
+    return counts[a] > counts[b]
+end)
+local result = {}
+for i = 1, math.min(limit, #order) do
+    table.insert(result, order[i])
+    table.insert(result, tostring(counts[order[i]]))
+end
+return result
+"""
+
+
+def tokenize(text: str) -> Set[str]:
+    """Folded word tokens used by the index, so Arabic spelling variants share a key"""
+    return {token for token in arabic.tokenize(text) if len(token) >= MIN_TOKEN_LENGTH}
+
+
+class ProductIndex:
+    """
+    Inverted token index over recently scraped products, kept in Redis
+    Each token maps to a sorted set of product ids scored by expiry time, so
+    lookups ignore expired products without any scanning, and every product
+    scraped within the TTL is considered.
+    """
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis_client = redis_client
+
+    @staticmethod
+    def product_id(product: Product) -> str:
+        identity = f"{product.retailer}|{product.url or product.name}"
+        return hashlib.sha1(identity.encode("utf-8")).hexdigest()[:16]
+
+    def add_to_pipeline(self, pipe, products: List[Product], ttl_seconds: int = PRODUCT_INDEX_TTL_SECONDS):
+        """
+        Queue index updates for products on an existing pipeline
+        Every token set written is trimmed of expired members and capped at
+        PRODUCT_INDEX_MAX_TOKEN_PRODUCTS, so sets for tokens that are never
+        searched stay bounded too.
+        """
+        now = time.time()
+        expires_at = now + ttl_seconds
+        postings: Dict[str, Dict[str, float]] = {}
+        pipe.zremrangebyscore(PRODUCTS_KEY, "-inf", now)
+        for product in products:
+            product_id = self.product_id(product)
+            pipe.set(f"{PRODUCT_KEY_PREFIX}{product_id}", product.model_dump_json(), ex=ttl_seconds)
+            pipe.zadd(PRODUCTS_KEY, {product_id: expires_at})
+            for token in tokenize(f"{product.name} {product.brand or ''}"):
+                postings.setdefault(token, {})[product_id] = expires_at
+        pipe.expire(PRODUCTS_KEY, ttl_seconds)
+        for token, members in postings.items():
+            token_key = f"{TOKEN_KEY_PREFIX}{token}"
+            pipe.zadd(token_key, members)
+            pipe.zremrangebyscore(token_key, "-inf", now)
+            pipe.zremrangebyrank(token_key, 0, -PRODUCT_INDEX_MAX_TOKEN_PRODUCTS - 1)
+            pipe.expire(token_key, ttl_seconds)
+
+    async def search(self, query: str, limit: int = 50) -> List[Tuple[int, Product]]:
+        """
+        Find live products sharing tokens with the query
+        Returns (matched token count, product) pairs, best matches first. The
+        script ranks ids over the token sets, then one pipeline reads the
+        product blobs; ids whose blob has already expired are pruned.
+        """
+        tokens = sorted(tokenize(query))
+        if not tokens:
+            return []
+
+        token_keys = [f"{TOKEN_KEY_PREFIX}{token}" for token in tokens]
+        raw = await self.redis_client.eval(SEARCH_SCRIPT, len(token_keys), *token_keys, str(time.time()), limit)
+        if not raw:
+            return []
+        ids, counts = raw[0::2], raw[1::2]
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for product_id in ids:
+            pipe.get(f"{PRODUCT_KEY_PREFIX}{product_id}")
+        blobs = await pipe.execute()
+
+        matches = []
+        expired = []
+        for product_id, count, blob in zip(ids, counts, blobs):
+            if blob is None:
+                expired.append(product_id)
+                continue
+            try:
+                matches.append((int(count), Product.model_validate_json(blob)))
+            except ValueError as e:
+                logger.warning(f"Skipping corrupt indexed product: {e}")
+        if expired:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for token_key in token_keys:
+                pipe.zrem(token_key, *expired)
+            await pipe.execute()
+        return matches
+
+    async def document_frequencies(self, tokens: Sequence[str]) -> Tuple[int, List[int]]:
+        """
+        Corpus statistics for IDF in one round trip
+        Returns the number of live indexed products and how many of them contain
+        each token; expired members are excluded without being scanned.
+        """
+        now = time.time()
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.zcount(PRODUCTS_KEY, now, "+inf")
+        for token in tokens:
+            pipe.zcount(f"{TOKEN_KEY_PREFIX}{token}", now, "+inf")
+        total, *frequencies = await pipe.execute()
+        return total, frequencies
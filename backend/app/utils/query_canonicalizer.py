@@ -0,0 +1,36 @@
+import re
+from functools import lru_cache
+from typing import Dict, Tuple
+
+from .arabic import tokenize
+
+# Traffic is dominated by a few hundred staple queries; repeats skip the folding entirely
+CANONICAL_CACHE_SIZE = 16384
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=CANONICAL_CACHE_SIZE)
+def canonical_tokens(query: str) -> Tuple[str, ...]:
+    """Folded, de-duplicated and sorted query words; empty if the query has none"""
+    return tuple(sorted(set(tokenize(query))))
+
+
+@lru_cache(maxsize=CANONICAL_CACHE_SIZE)
+def canonicalize_query(query: str) -> str:
+    """
+    Canonical form of a search query for cache, single-flight, catalog and popularity keys
+    Arabic spelling variants, diacritics, tatweel and Arabic-Indic digits are
+    folded, the definite article is dropped, English is case-folded and words
+    are de-duplicated and sorted, so "اللبن جهينة" and "جهينه لَبن" share a key.
+    Queries with no word characters fall back to their collapsed lowercase form.
+    """
+    tokens = canonical_tokens(query)
+    if not tokens:
+        return WHITESPACE_PATTERN.sub(' ', query.strip().lower())
+    return " ".join(tokens)
+
+
+def canonicalizer_stats() -> Dict[str, int]:
+    info = canonicalize_query.cache_info()
+    return {"cache_hits": info.hits, "cache_misses": info.misses, "cached_queries": info.currsize}
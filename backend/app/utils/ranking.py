@@ -0,0 +1,152 @@
+import os
+import time
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+import numpy as np
+from loguru import logger
+import redis.asyncio as redis
+
+from ..models.schemas import Product
+from .arabic import tokenize
+from .product_index import MIN_TOKEN_LENGTH, ProductIndex
+from .query_canonicalizer import canonical_tokens
+
+# BM25 term-frequency saturation and document length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Non-textual features, weighted against a BM25 score normalized to [0, 1]
+CONFIDENCE_WEIGHT = 0.1
+IN_STOCK_WEIGHT = 0.1
+
+# Document frequencies drift slowly, so each worker reuses them this long
+IDF_CACHE_SECONDS = float(os.getenv("IDF_CACHE_SECONDS", "60"))
+
+# Cached token frequencies are dropped wholesale beyond this many tokens
+IDF_CACHE_MAX_TOKENS = 50000
+
+
+class CandidateFeatures(NamedTuple):
+    """Column arrays describing the candidates, one row per product"""
+    term_frequencies: np.ndarray  # (products, query terms)
+    lengths: np.ndarray
+    prices: np.ndarray
+    in_stock: np.ndarray
+    confidence: np.ndarray
+
+
+def query_terms(query: str) -> Tuple[str, ...]:
+    """Folded query tokens in the product index's vocabulary"""
+    return tuple(token for token in canonical_tokens(query) if len(token) >= MIN_TOKEN_LENGTH)
+
+
+@lru_cache(maxsize=65536)
+def product_terms(name: str, brand: str) -> Tuple[str, ...]:
+    """Folded tokens of a product's name and brand; repeats are kept for term frequency"""
+    return tuple(token for token in tokenize(f"{name} {brand}") if len(token) >= MIN_TOKEN_LENGTH)
+
+
+def featurize(products: Sequence[Product], terms: Sequence[str]) -> CandidateFeatures:
+    """Tokenize every candidate once and lay its features out as arrays"""
+    count = len(products)
+    columns = {term: column for column, term in enumerate(terms)}
+    # Listings repeat across retailers and searches; each distinct token tuple is counted once
+    distinct: Dict[Tuple[str, ...], int] = {}
+    rows = np.fromiter(
+        (distinct.setdefault(product_terms(product.name, product.brand or ""), len(distinct)) for product in products),
+        dtype=np.intp, count=count
+    )
+    distinct_frequencies = np.zeros((len(distinct), len(terms)), dtype=np.float64)
+    distinct_lengths = np.empty(len(distinct), dtype=np.float64)
+    for row, tokens in enumerate(distinct):
+        distinct_lengths[row] = len(tokens)
+        for token in tokens:
+            column = columns.get(token)
+            if column is not None:
+                distinct_frequencies[row, column] += 1
+    return CandidateFeatures(
+        term_frequencies=distinct_frequencies[rows],
+        lengths=distinct_lengths[rows],
+        prices=np.fromiter((product.price for product in products), dtype=np.float64, count=count),
+        in_stock=np.fromiter((product.in_stock for product in products), dtype=np.float64, count=count),
+        confidence=np.fromiter((product.confidence_score for product in products), dtype=np.float64, count=count),
+    )
+
+
+def score(features: CandidateFeatures, idf: np.ndarray) -> np.ndarray:
+    """BM25 relevance, normalized by the best achievable score, plus confidence and stock bonuses"""
+    scores = CONFIDENCE_WEIGHT * features.confidence + IN_STOCK_WEIGHT * features.in_stock
+    if not len(idf) or not len(scores):
+        return scores
+    average_length = features.lengths.mean() or 1.0
+    length_norm = BM25_K1 * (1 - BM25_B + BM25_B * features.lengths / average_length)
+    tf = features.term_frequencies
+    relevance = (tf * (BM25_K1 + 1) / (tf + length_norm[:, None])) @ idf
+    best = (BM25_K1 + 1) * idf.sum()
+    return scores + (relevance / best if best > 0 else relevance)
+
+
+def top_k(scores: np.ndarray, prices: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k best candidates, highest score first and cheapest first among equal scores
+    A linear-time partition finds the k-th best score; only candidates at or
+    above it are sorted.
+    """
+    count = len(scores)
+    if k <= 0 or not count:
+        return np.empty(0, dtype=np.intp)
+    if k < count:
+        threshold = np.partition(scores, count - k)[count - k]
+        candidates = np.flatnonzero(scores >= threshold)
+    else:
+        candidates = np.arange(count)
+    order = np.lexsort((prices[candidates], -scores[candidates]))
+    return candidates[order[:k]]
+
+
+def rank_products(products: Sequence[Product], terms: Sequence[str], idf: np.ndarray, limit: int) -> List[Product]:
+    """The best limit products for the query terms, best first"""
+    features = featurize(products, terms)
+    return [products[i] for i in top_k(score(features, idf), features.prices, limit)]
+
+
+def matches_query(products: Sequence[Product], terms: Sequence[str]) -> np.ndarray:
+    """Whether each product contains any of the query terms; all True without terms"""
+    if not terms:
+        return np.ones(len(products), dtype=bool)
+    return featurize(products, terms).term_frequencies.any(axis=1)
+
+
+class CorpusStatistics:
+    """
+    Per-process cache of IDF inputs drawn from the product index
+    The corpus is every product scraped within the index TTL across all
+    workers; stale tokens are refreshed together in one round trip.
+    """
+
+    def __init__(self):
+        self._frequencies: Dict[str, Tuple[int, float]] = {}
+        self._total = 0
+        self._total_at = float("-inf")
+
+    async def idf(self, redis_client: redis.Redis, terms: Sequence[str]) -> np.ndarray:
+        """BM25 inverse document frequency of each term"""
+        now = time.monotonic()
+        stale = [term for term in terms if now - self._frequencies.get(term, (0, float("-inf")))[1] > IDF_CACHE_SECONDS]
+        if stale or now - self._total_at > IDF_CACHE_SECONDS:
+            try:
+                total, frequencies = await ProductIndex(redis_client).document_frequencies(stale)
+            except Exception as e:
+                # Unknown statistics leave every term equally weighted
+                logger.warning(f"Failed to load corpus statistics: {e}")
+            else:
+                if len(self._frequencies) + len(stale) > IDF_CACHE_MAX_TOKENS:
+                    self._frequencies.clear()
+                self._total, self._total_at = total, now
+                self._frequencies.update((term, (frequency, now)) for term, frequency in zip(stale, frequencies))
+
+        frequencies = np.array([self._frequencies.get(term, (0, 0.0))[0] for term in terms], dtype=np.float64)
+        return np.log1p(np.maximum(self._total - frequencies + 0.5, 0.0) / (frequencies + 0.5))
+
+
+corpus_statistics = CorpusStatistics()
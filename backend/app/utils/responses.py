@@ -0,0 +1,60 @@
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Optional
+import msgpack
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+# Older msgpack clients still send the unregistered name
+MSGPACK_MEDIA_TYPES = frozenset((MSGPACK_MEDIA_TYPE, "application/x-msgpack"))
+JSON_MEDIA_RANGES = frozenset((JSON_MEDIA_TYPE, "application/*", "*/*"))
+
+
+def _msgpack_default(value: Any) -> Any:
+    """msgpack has no timestamp type the clients agree on; send ISO 8601 like the JSON body"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__} to msgpack")
+
+
+@lru_cache(maxsize=256)
+def prefers_msgpack(accept: Optional[str]) -> bool:
+    """Whether an Accept header ranks msgpack above JSON; JSON wins ties and absent headers"""
+    if not accept:
+        return False
+    quality = {"json": 0.0, "msgpack": 0.0}
+    for media_range in accept.split(","):
+        media_type, *params = [part.strip() for part in media_range.split(";")]
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        media_type = media_type.lower()
+        if media_type in MSGPACK_MEDIA_TYPES:
+            quality["msgpack"] = max(quality["msgpack"], q)
+        elif media_type in JSON_MEDIA_RANGES:
+            quality["json"] = max(quality["json"], q)
+    return quality["msgpack"] > quality["json"]
+
+
+def negotiated_response(model: BaseModel, accept: Optional[str]) -> Response:
+    """
+    Serialize a response model as msgpack or JSON, whichever the client prefers
+    The model is serialized directly instead of going through FastAPI's
+    response_model validation and jsonable_encoder, which would re-check every
+    product the agents and normalizer have already validated.
+    """
+    if prefers_msgpack(accept):
+        body = msgpack.packb(model.model_dump(), default=_msgpack_default)
+        media_type = MSGPACK_MEDIA_TYPE
+    else:
+        body = model.model_dump_json().encode("utf-8")
+        media_type = JSON_MEDIA_TYPE
+    return Response(content=body, media_type=media_type, headers={"Vary": "Accept"})
@@ -0,0 +1,142 @@
+import re
+from typing import Dict, FrozenSet, Iterator, List, Optional, Tuple
+import soupsieve
+from bs4 import BeautifulSoup, Tag
+from lxml import etree
+
+from ..models.schemas import RetailerConfig, SelectorConfig
+
+# Product fields extracted from each container, in SelectorConfig order
+FIELDS = ("name", "price", "image", "link", "brand")
+
+# Compound selectors like "h3", ".prc" or "div.product-card" are matched without soupsieve
+SIMPLE_SELECTOR = re.compile(r'^([a-zA-Z][\w-]*)?((?:\.[\w-]+)*)$')
+
+# Compiled selectors per retailer, filled at registry load
+_compiled: Dict[str, "CompiledSelectors"] = {}
+
+
+class SelectorMatcher:
+    """
+    One compiled selector list
+    Selector lists made only of tag and class parts are checked with plain set
+    lookups; anything else (attributes, combinators, pseudo-classes) goes
+    through a precompiled soupsieve pattern.
+    """
+
+    def __init__(self, selector: str):
+        self.selector = selector
+        self.simple: Optional[List[Tuple[Optional[str], FrozenSet[str]]]] = []
+        for part in selector.split(","):
+            match = SIMPLE_SELECTOR.match(part.strip())
+            if not match or not (match.group(1) or match.group(2)):
+                self.simple = None
+                break
+            self.simple.append((match.group(1), frozenset(c for c in match.group(2).split(".") if c)))
+        self.pattern = soupsieve.compile(selector) if self.simple is None else None
+
+    def matches(self, node: Tag) -> bool:
+        if self.simple is None:
+            return self.pattern.match(node)
+        return self.matches_parts(node.name, node.attrs.get("class") or ())
+
+    def matches_parts(self, name: str, classes) -> bool:
+        """Match a simple selector list against a tag name and its classes"""
+        for tag_name, class_names in self.simple:
+            if (tag_name is None or tag_name == name) and (not class_names or class_names.issubset(classes)):
+                return True
+        return False
+
+
+class ContainerCounter:
+    """
+    Counts product containers in a page while it is still downloading
+    Chunks are fed to lxml's incremental parser; a container is counted when
+    its start tag arrives, ignoring containers nested inside another one.
+    """
+
+    def __init__(self, matcher: SelectorMatcher):
+        self.matcher = matcher
+        self.parser = etree.HTMLPullParser(events=("start",))
+        self.count = 0
+
+    def _matches(self, element) -> bool:
+        return isinstance(element.tag, str) and self.matcher.matches_parts(element.tag, (element.get("class") or "").split())
+
+    def feed(self, chunk: bytes) -> int:
+        self.parser.feed(chunk)
+        for _, element in self.parser.read_events():
+            if self._matches(element) and not any(self._matches(parent) for parent in element.iterancestors()):
+                self.count += 1
+        return self.count
+
+
+class CompiledSelectors:
+    """A retailer's SelectorConfig, compiled once and reused for every page"""
+
+    def __init__(self, selectors: SelectorConfig):
+        self.config = selectors
+        self.product = SelectorMatcher(selectors.product)
+        self.fields = [
+            (field, SelectorMatcher(getattr(selectors, field)))
+            for field in FIELDS if getattr(selectors, field)
+        ]
+
+    def containers(self, soup: BeautifulSoup, limit: int) -> Iterator[Tag]:
+        """
+        Product containers in document order
+        The walk doesn't descend into a matched container, so containers nested
+        in an earlier match (e.g. a card's inner link) are not returned twice.
+        """
+        found = 0
+        stack = [iter(soup.children)]
+        while stack:
+            node = next(stack[-1], None)
+            if node is None:
+                stack.pop()
+                continue
+            if node.__class__ is not Tag:
+                continue
+            if self.product.matches(node):
+                yield node
+                found += 1
+                if found >= limit:
+                    return
+            else:
+                stack.append(iter(node.children))
+
+    def container_counter(self) -> Optional[ContainerCounter]:
+        """A streaming container counter, or None if the product selector needs soupsieve"""
+        return ContainerCounter(self.product) if self.product.simple is not None else None
+
+    def extract_fields(self, container: Tag) -> Dict[str, Tag]:
+        """
+        Find every field's element in a single walk of the container
+        Each field takes its first match in document order, like select_one.
+        """
+        found: Dict[str, Tag] = {}
+        pending = self.fields
+        for node in container.descendants:
+            if not pending:
+                break
+            if node.__class__ is not Tag:
+                continue
+            remaining = []
+            for field, matcher in pending:
+                if matcher.matches(node):
+                    found[field] = node
+                else:
+                    remaining.append((field, matcher))
+            pending = remaining
+        return found
+
+
+def compile_selectors(config: RetailerConfig) -> Optional[CompiledSelectors]:
+    """Compiled selectors for a retailer, compiling them on first use"""
+    if config.selectors is None:
+        return None
+    compiled = _compiled.get(config.name)
+    if compiled is None or compiled.config is not config.selectors:
+        compiled = CompiledSelectors(config.selectors)
+        _compiled[config.name] = compiled
+    return compiled
@@ -0,0 +1,192 @@
+import re
+from typing import Any, Dict, Iterator, List, Optional
+import orjson
+
+# Located with a regex over the raw page so pages without structured data cost no DOM parse
+JSON_LD_PATTERN = re.compile(
+    r'<script[^>]*type\s*=\s*["\']application/ld\+json["\'][^>]*>(.*?)</script>',
+    re.IGNORECASE | re.DOTALL
+)
+NEXT_DATA_PATTERN = re.compile(
+    r'<script[^>]*id\s*=\s*["\']__NEXT_DATA__["\'][^>]*>(.*?)</script>',
+    re.IGNORECASE | re.DOTALL
+)
+
+# Opening tags of the blocks above and the tag closing them, searched in raw bytes while a page downloads
+SCRIPT_START_PATTERN = re.compile(
+    rb'<script[^>]*(?:type\s*=\s*["\']application/ld\+json["\']|id\s*=\s*["\']__NEXT_DATA__["\'])[^>]*>',
+    re.IGNORECASE
+)
+SCRIPT_END = b"</script>"
+
+# Keys retailers use for product fields in hydration state, in order of preference
+NAME_KEYS = ("name", "title", "productName", "displayName")
+PRICE_KEYS = ("price", "finalPrice", "salePrice", "sellingPrice", "specialPrice", "currentPrice")
+IMAGE_KEYS = ("image", "imageUrl", "image_url", "thumbnail", "images", "media")
+URL_KEYS = ("url", "link", "href", "productUrl", "slug")
+
+# Hydration blobs can be deep; products are never this far down
+MAX_DEPTH = 12
+
+# A lone featured product in JSON-LD doesn't make structured data usable for a results page
+MIN_STRUCTURED_PRODUCTS = 3
+
+
+def _first(value: Any) -> Any:
+    return value[0] if isinstance(value, list) and value else value
+
+
+def _to_price(value: Any) -> Optional[float]:
+    value = _first(value)
+    if isinstance(value, dict):
+        value = value.get("value", value.get("amount", value.get("price")))
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value) if value > 0 else None
+    if isinstance(value, str):
+        try:
+            price = float(value.replace(",", "").strip())
+            return price if price > 0 else None
+        except ValueError:
+            return None
+    return None
+
+
+def _to_text(value: Any) -> Optional[str]:
+    value = _first(value)
+    if isinstance(value, dict):
+        value = value.get("name", value.get("url"))
+    return value.strip() if isinstance(value, str) and value.strip() else None
+
+
+def _json_ld_products(node: Any, depth: int = 0) -> Iterator[Dict[str, Any]]:
+    """Product nodes anywhere in a JSON-LD document, including ItemList and @graph wrappers"""
+    if depth > MAX_DEPTH:
+        return
+    if isinstance(node, list):
+        for item in node:
+            yield from _json_ld_products(item, depth + 1)
+    elif isinstance(node, dict):
+        node_type = node.get("@type")
+        if node_type == "Product" or (isinstance(node_type, list) and "Product" in node_type):
+            yield node
+            return
+        for key in ("@graph", "itemListElement", "item", "mainEntity"):
+            if key in node:
+                yield from _json_ld_products(node[key], depth + 1)
+
+
+def _from_json_ld(node: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    offers = _first(node.get("offers")) or {}
+    if not isinstance(offers, dict):
+        offers = {}
+    name = _to_text(node.get("name"))
+    price = _to_price(offers.get("price", offers.get("lowPrice")))
+    if not name or not price:
+        return None
+    availability = str(offers.get("availability", ""))
+    return {
+        "name": name,
+        "price": price,
+        "url": _to_text(node.get("url") or offers.get("url")),
+        "image_url": _to_text(node.get("image")),
+        "brand": _to_text(node.get("brand")),
+        "in_stock": "OutOfStock" not in availability,
+    }
+
+
+def _state_products(node: Any, limit: int, found: List[Dict[str, Any]], depth: int = 0):
+    """Walk hydration state collecting objects that carry both a name and a price"""
+    if depth > MAX_DEPTH or len(found) >= limit:
+        return
+    if isinstance(node, list):
+        for item in node:
+            _state_products(item, limit, found, depth + 1)
+            if len(found) >= limit:
+                return
+    elif isinstance(node, dict):
+        name = next((_to_text(node[key]) for key in NAME_KEYS if key in node), None)
+        price = next((_to_price(node[key]) for key in PRICE_KEYS if key in node), None)
+        if name and price:
+            found.append({
+                "name": name,
+                "price": price,
+                "url": next((_to_text(node[key]) for key in URL_KEYS if key in node), None),
+                "image_url": next((_to_text(node[key]) for key in IMAGE_KEYS if key in node), None),
+                "brand": _to_text(node.get("brand")),
+                "in_stock": node.get("inStock", node.get("in_stock", True)) is not False,
+            })
+            return
+        for value in node.values():
+            if isinstance(value, (dict, list)):
+                _state_products(value, limit, found, depth + 1)
+                if len(found) >= limit:
+                    return
+
+
+def extract_structured_products(html: str, limit: int) -> List[Dict[str, Any]]:
+    """
+    Product fields from a page's JSON-LD or __NEXT_DATA__ hydration state
+    Returns an empty list when the page has no usable structured data, i.e.
+    fewer than MIN_STRUCTURED_PRODUCTS products; blocks that fail to decode
+    are skipped.
+    """
+    enough = min(limit, MIN_STRUCTURED_PRODUCTS)
+    products: List[Dict[str, Any]] = []
+    for block in JSON_LD_PATTERN.findall(html):
+        try:
+            document = orjson.loads(block)
+        except orjson.JSONDecodeError:
+            continue
+        for node in _json_ld_products(document):
+            product = _from_json_ld(node)
+            if product:
+                products.append(product)
+                if len(products) >= limit:
+                    return products
+    if len(products) >= enough:
+        return products
+
+    products = []
+    match = NEXT_DATA_PATTERN.search(html)
+    if match:
+        try:
+            _state_products(orjson.loads(match.group(1)), limit, products)
+        except orjson.JSONDecodeError:
+            pass
+    return products if len(products) >= enough else []
+
+
+class StructuredScriptScanner:
+    """
+    Finds complete JSON-LD and __NEXT_DATA__ blocks in a page while it downloads
+    Each feed only searches the bytes added since the last one; a tag cut off
+    by a chunk boundary is searched again once the rest of it arrives.
+    """
+
+    def __init__(self):
+        self.position = 0
+        self.open = False
+        self.blocks = 0
+        self.closed_at = 0  # end of the last complete block
+
+    def feed(self, page: bytes) -> int:
+        """Scan the downloaded page so far and return how many blocks have closed"""
+        while True:
+            if self.open:
+                end = page.find(SCRIPT_END, self.position)
+                if end < 0:
+                    self.position = max(self.position, len(page) - len(SCRIPT_END) + 1)
+                    return self.blocks
+                self.open = False
+                self.blocks += 1
+                self.position = self.closed_at = end + len(SCRIPT_END)
+            else:
+                match = SCRIPT_START_PATTERN.search(page, self.position)
+                if match is None:
+                    tag_start = page.rfind(b"<", self.position)
+                    self.position = tag_start if tag_start >= 0 else len(page)
+                    return self.blocks
+                self.open = True
+                self.position = match.end()
@@ -0,0 +1,71 @@
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+# Every spelling we have seen on Egyptian retailer sites, mapped to WeightUnit values
+UNIT_ALIASES = {
+    # Kilograms
+    'kg': 'kg', 'kgs': 'kg', 'kilo': 'kg', 'kilogram': 'kg', 'kilograms': 'kg',
+    'كيلو': 'kg', 'كيلوجرام': 'kg', 'كيلوغرام': 'kg', 'كجم': 'kg', 'كغ': 'kg',
+    # Grams
+    'g': 'g', 'gm': 'g', 'gr': 'g', 'grs': 'g', 'gram': 'g', 'grams': 'g', 'gms': 'g',
+    'جم': 'g', 'جرام': 'g', 'جرامات': 'g', 'غرام': 'g', 'غ': 'g',
+    # Litres
+    'l': 'l', 'lt': 'l', 'ltr': 'l', 'liter': 'l', 'litre': 'l', 'liters': 'l', 'litres': 'l',
+    'لتر': 'l', 'لترات': 'l', 'ل': 'l',
+    # Millilitres
+    'ml': 'ml', 'mls': 'ml', 'مل': 'ml', 'مللي': 'ml', 'مليلتر': 'ml', 'ملليلتر': 'ml',
+    # Pieces
+    'pc': 'pc', 'pcs': 'pc', 'piece': 'pc', 'pieces': 'pc',
+    'قطعة': 'pc', 'قطع': 'pc', 'حبة': 'pc', 'حبات': 'pc',
+}
+
+# Longest aliases first so "ml" wins over "l" and "كيلوجرام" over "كيلو"
+_UNITS = "|".join(re.escape(alias) for alias in sorted(UNIT_ALIASES, key=len, reverse=True))
+
+# \d also matches Arabic-Indic digits; "٫" is the Arabic decimal separator
+_NUMBER = r"\d+(?:[.٫]\d+)?"
+_PACK_SEPARATOR = r"\s*[x×*]\s*"
+
+# One pass finds "500 جم", "1.5L", "6 × 200 مل" and "200ml x 6"
+MEASUREMENT_PATTERN = re.compile(
+    rf"(?:(?P<pack>\d{{1,3}}){_PACK_SEPARATOR})?"
+    rf"(?P<value>{_NUMBER})\s*(?P<unit>{_UNITS})(?!\w)"
+    rf"(?:{_PACK_SEPARATOR}(?P<pack_after>\d{{1,3}})(?!\w))?",
+    re.IGNORECASE
+)
+
+
+class Measurement(NamedTuple):
+    weight: Optional[float]
+    unit: Optional[str]
+    pack_count: Optional[int]
+
+
+NO_MEASUREMENT = Measurement(None, None, None)
+
+
+@lru_cache(maxsize=8192)
+def extract_measurement(text: str) -> Measurement:
+    """
+    Extract the per-item weight, its unit and the multipack count from a product name
+    Units are returned as WeightUnit values; pack_count is None for single items.
+    """
+    if not text:
+        return NO_MEASUREMENT
+
+    match = MEASUREMENT_PATTERN.search(text)
+    if not match:
+        return NO_MEASUREMENT
+
+    try:
+        weight = float(match.group('value').replace('٫', '.'))
+    except ValueError:
+        return NO_MEASUREMENT
+
+    pack = match.group('pack') or match.group('pack_after')
+    pack_count = int(pack) if pack else None
+    if pack_count is not None and pack_count < 2:
+        pack_count = None
+
+    return Measurement(weight, UNIT_ALIASES[match.group('unit').lower()], pack_count)
@@ -0,0 +1,86 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+from ..models.schemas import Product, WeightUnit
+from .product_grouping import BASE_UNITS, brand_key, concept_tokens, family_key, listing_key, to_offer
+
+# Unit prices are quoted per kg, per litre or per piece
+QUOTED_UNITS = {"g": (WeightUnit.KILOGRAM, 1000), "ml": (WeightUnit.LITER, 1000), "pc": (WeightUnit.PIECE, 1)}
+
+# Unit multipliers into the quoted unit, e.g. 500 g is 0.5 kg
+_UNIT_CODES = {unit: code for code, unit in enumerate(BASE_UNITS)}
+_QUOTED_MULTIPLIERS = np.array(
+    [multiplier / QUOTED_UNITS[base_unit][1] for base_unit, multiplier in BASE_UNITS.values()] + [np.nan]
+)
+_UNKNOWN_UNIT = len(BASE_UNITS)
+
+
+def unit_prices(products: Sequence[Product]) -> np.ndarray:
+    """
+    Price per kg, litre or piece of each product, multipacks included; inf when the size is unknown
+    Sizes are gathered in one pass over the products and converted together.
+    """
+    count = len(products)
+    weights = np.fromiter((product.weight or 0.0 for product in products), dtype=np.float64, count=count)
+    units = np.fromiter(
+        (_UNIT_CODES.get(product.weight_unit.value, _UNKNOWN_UNIT) if product.weight_unit else _UNKNOWN_UNIT for product in products),
+        dtype=np.intp, count=count
+    )
+    packs = np.fromiter((product.pack_count or 1 for product in products), dtype=np.float64, count=count)
+    prices = np.fromiter((product.price for product in products), dtype=np.float64, count=count)
+
+    quantities = weights * _QUOTED_MULTIPLIERS[units] * packs
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prices_per_unit = prices / quantities
+    prices_per_unit[~(quantities > 0)] = np.inf
+    return prices_per_unit
+
+
+def _quoted_unit(product: Product, unit_price: float) -> Tuple[Optional[float], Optional[WeightUnit]]:
+    if not np.isfinite(unit_price):
+        return None, None
+    return round(float(unit_price), 2), QUOTED_UNITS[BASE_UNITS[product.weight_unit.value][0]][0]
+
+
+def cheapest_per_family(products: Sequence[Product]) -> List[Product]:
+    """
+    One product per family (see family_key), the cheapest per unit among those in stock
+    The family's other products follow in offers, cheapest per unit first, so a
+    5 kg bag is shown ahead of the 1 kg one it undercuts. Products of unknown
+    size are only grouped with listings of the same name, as in group_products.
+    A listing scraped more than once appears once. Families keep the order of
+    their first product.
+    """
+    prices = unit_prices(products)
+    families: Dict[Tuple, Dict[Tuple[str, str], int]] = {}
+    for i, product in enumerate(products):
+        key = family_key(product)
+        if key is None:
+            concepts = concept_tokens(product.name)
+            key = ("", " ".join(sorted(concepts)), brand_key(product, concepts))
+        families.setdefault(key, {}).setdefault(listing_key(product), i)
+
+    cheapest = []
+    for listings in families.values():
+        members = list(listings.values())
+        members.sort(key=lambda i: (not products[i].in_stock, prices[i], products[i].price))
+        offers = []
+        for i in members[1:]:
+            unit_price, unit = _quoted_unit(products[i], prices[i])
+            offers.append(to_offer(products[i], unit_price=unit_price, unit_price_unit=unit))
+        best = products[members[0]]
+        unit_price, unit = _quoted_unit(best, prices[members[0]])
+        cheapest.append(best.model_copy(update={"unit_price": unit_price, "unit_price_unit": unit, "offers": offers}))
+    return cheapest
+
+
+def sort_by_unit_price(products: List[Product], relevant: Optional[np.ndarray] = None) -> List[Product]:
+    """
+    In-stock products cheapest per unit first; ties and unknown sizes keep their order
+    When given, products flagged relevant come ahead of the rest, so a cheap
+    unrelated item can't lead the results.
+    """
+    out_of_stock = np.fromiter((not product.in_stock for product in products), dtype=bool, count=len(products))
+    keys = (unit_prices(products), out_of_stock)
+    order = np.lexsort(keys if relevant is None else keys + (~relevant,))
+    return [products[i] for i in order]
@@ -0,0 +1,110 @@
+"""
+Benchmark for HTML parser backends on retailer search pages
+
+Parses each fixture page and runs the owning agent's product extraction with
+every available BeautifulSoup backend, reporting pages per second. Saved
+pages placed in benchmarks/fixtures/<agent>.html (e.g. jumia.html) are used
+as-is; agents without a saved page get a generated page that mirrors the
+retailer's markup, with page chrome and inline scripts around the product grid.
+
+Run from backend/:  python -m benchmarks.bench_html_parsing
+"""
+import random
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from bs4 import BeautifulSoup, FeatureNotFound
+
+from app.agents.config_driven_agent import ConfigDrivenAgent
+from app.agents.registry import AGENT_CLASSES, get_retailer_config
+from app.utils.html_parsing import PARSER_BACKENDS, make_soup, parse_and_extract
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+# fixture name -> (retailer, product card markup)
+AGENTS = {
+    "jumia": ("Jumia Egypt", '<article class="prd _fb col c-prd"><a class="core" href="/p/{i}.html">'
+              '<div class="img-c"><img data-src="https://eg.jumia.is/{i}.jpg"></div><div class="info">'
+              '<h3 class="name">{name}</h3><div class="prc">{price} جنيه</div><div class="brand">{brand}</div></div></a></article>'),
+    "otlob": ("Otlob Market", '<div class="market-item"><a href="/item/{i}"><img src="/img/{i}.png"></a>'
+              '<h4 class="item-name">{name}</h4><span class="item-price">EGP {price}</span></div>'),
+    "gourmet": ("Gourmet Egypt", '<div class="product-card"><a href="/products/{i}"><img src="/cdn/{i}.jpg"></a>'
+                '<h3 class="product-name">{name}</h3><span class="current-price">{price} EGP</span></div>'),
+    "alkhairy": ("Al Khairy", '<li class="grid-item"><a href="/p/{i}"><img src="/media/{i}.jpg"></a>'
+                 '<h4 class="title">{name}</h4><div class="price">{price} جنيه</div></li>'),
+    "elmenus": ("ElMenus Market", '<div class="grocery-item"><a href="/grocery/{i}"><img src="/g/{i}.jpg"></a>'
+                '<p class="product-name">{name}</p><p class="product-price">{price} EGP</p></div>'),
+}
+
+NAMES = [
+    "لبن جهينة كامل الدسم 1 لتر", "Almarai Juice Mango 6 x 200ml", "أرز الضحى مصري 1 كيلو",
+    "Crystal Sunflower Oil 2.2 L", "مكرونة الملكة اسباجتي 400 جرام", "Domty Feta Cheese 250gm",
+    "نسكافيه كلاسيك ٢٠٠ جرام", "Pepsi Can 330ml x 24", "صابون لوكس 4 × 120 جم", "Imtenan Honey 1 kg",
+]
+
+
+def generate_page(card: str, products: int = 40) -> str:
+    """A search results page with realistic surrounding chrome"""
+    rng = random.Random(products)
+    nav = "".join(f'<li class="menu-item"><a href="/c/{i}">قسم {i}</a></li>' for i in range(150))
+    scripts = "".join(f"<script>window.__d{i}={{a:{i},b:'{'x' * 400}'}};</script>" for i in range(20))
+    cards = "".join(
+        card.format(i=i, name=rng.choice(NAMES), price=round(rng.uniform(10, 400), 2), brand="Juhayna")
+        for i in range(products)
+    )
+    footer = "".join(f'<div class="footer-col"><p>{"نص " * 40}</p></div>' for _ in range(30))
+    return (f'<!DOCTYPE html><html lang="ar" dir="rtl"><head><meta charset="utf-8"><title>بحث</title>{scripts}</head>'
+            f'<body><header><nav><ul>{nav}</ul></nav></header><main><section class="products">{cards}</section></main>'
+            f'<footer>{footer}</footer></body></html>')
+
+
+def load_fixtures() -> Dict[str, str]:
+    fixtures = {}
+    for name, (_, card) in AGENTS.items():
+        saved = FIXTURES_DIR / f"{name}.html"
+        fixtures[name] = saved.read_text(encoding="utf-8") if saved.exists() else generate_page(card)
+    return fixtures
+
+
+def available_backends() -> List[str]:
+    backends = []
+    for backend in PARSER_BACKENDS:
+        try:
+            BeautifulSoup("<p></p>", backend)
+            backends.append(backend)
+        except FeatureNotFound:
+            continue
+    return backends
+
+
+def main(rounds: int = 10):
+    fixtures = load_fixtures()
+    agents = {
+        name: AGENT_CLASSES.get(retailer, ConfigDrivenAgent)(get_retailer_config(retailer), None)
+        for name, (retailer, _) in AGENTS.items()
+    }
+    total_kb = sum(len(html) for html in fixtures.values()) / 1024
+    print(f"{len(fixtures)} fixture pages ({total_kb:.0f} KB total) x {rounds} rounds")
+
+    for backend in available_backends():
+        found = 0
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for html in fixtures.values():
+                make_soup(html, backend)
+        parse_rate = rounds * len(fixtures) / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for name, html in fixtures.items():
+                products, *_ = parse_and_extract(html, lambda soup: agents[name]._extract_products(soup, 50), backend)
+                found += len(products)
+        full_rate = rounds * len(fixtures) / (time.perf_counter() - start)
+
+        print(f"{backend:<12} parse {parse_rate:>8.1f} pages/s   parse+extract {full_rate:>8.1f} pages/s   "
+              f"({found // rounds} products per round)")
+
+
+if __name__ == "__main__":
+    main()
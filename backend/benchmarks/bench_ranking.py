@@ -0,0 +1,107 @@
+"""
+Benchmark for result ranking at 100, 10k and 1M candidates
+
+Compares the per-product closure and full sort SearchOrchestrator used to run
+against the batched BM25 ranker in app.utils.ranking, split into featurizing
+(tokenizing each name once into arrays), scoring and top-k selection. The
+candidates cycle through a pool of distinct synthetic listings, as repeated
+names do in real traffic.
+
+Run from backend/:  python -m benchmarks.bench_ranking [max_results]
+"""
+import random
+import sys
+import time
+from typing import List
+
+import numpy as np
+
+from app.models.schemas import Product
+from app.utils.ranking import featurize, product_terms, query_terms, score, top_k
+
+SIZES = (100, 10_000, 1_000_000)
+
+# Distinct listings the candidates are drawn from
+POOL_SIZE = 20_000
+
+QUERY = "لبن جهينة كامل الدسم"
+
+WORDS = [
+    "لبن", "حليب", "جهينة", "المراعي", "دومتي", "كامل", "الدسم", "خالي", "قليل", "زبادي", "جبنة",
+    "فيتا", "رومي", "أرز", "الضحى", "زيت", "كريستال", "عباد", "الشمس", "سكر", "شاي", "العروسة",
+    "Juhayna", "Almarai", "Milk", "Full", "Cream", "Skimmed", "Cheese", "Rice", "Oil", "Tea",
+]
+SIZES_TEXT = ["1 لتر", "500 مل", "1 كيلو", "250 جم", "1L", "200ml x 6"]
+
+
+def legacy_rank(products: List[Product], query: str) -> List[Product]:
+    """The ranking SearchOrchestrator._rank_products used to run"""
+    def calculate_relevance_score(product: Product, query: str) -> float:
+        score = 0.0
+        query_lower = query.lower()
+        if query_lower in product.name.lower():
+            score += 0.5
+        if product.brand and query_lower in product.brand.lower():
+            score += 0.3
+        query_words = query_lower.split()
+        product_words = product.name.lower().split()
+        common_words = set(query_words) & set(product_words)
+        score += len(common_words) * 0.1
+        score += product.confidence_score * 0.1
+        if product.in_stock:
+            score += 0.1
+        return score
+
+    scored_products = [(product, calculate_relevance_score(product, query)) for product in products]
+    scored_products.sort(key=lambda x: (-x[1], x[0].price if x[0].price else float('inf')))
+    return [product for product, _ in scored_products]
+
+
+def build_pool(rng: random.Random) -> List[Product]:
+    return [
+        Product.model_construct(
+            name=" ".join(rng.sample(WORDS, rng.randint(2, 6)) + [rng.choice(SIZES_TEXT)]),
+            price=round(rng.uniform(5, 300), 2),
+            retailer=f"Retailer {i % 5}",
+            url=f"https://example.com/{i}",
+            brand=None,
+            in_stock=rng.random() > 0.1,
+            confidence_score=rng.random(),
+        )
+        for i in range(POOL_SIZE)
+    ]
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main(max_results: int = 50):
+    pool = build_pool(random.Random(7))
+    terms = query_terms(QUERY)
+    # Corpus statistics come from Redis in production; a fixed IDF keeps the benchmark offline
+    idf = np.log1p(np.linspace(1.0, 3.0, len(terms)))
+    # Warm the per-name token cache as steady-state traffic does
+    for product in pool:
+        product_terms(product.name, product.brand or "")
+
+    print(f"query {QUERY!r}, top {max_results}, {len(terms)} terms")
+    print(f"{'candidates':>12} {'legacy':>11} {'featurize':>11} {'score':>9} {'top-k':>9} {'ranked':>11} {'full sort':>11}")
+    for size in SIZES:
+        candidates = [pool[i % POOL_SIZE] for i in range(size)]
+        _, legacy_ms = timed(legacy_rank, candidates, QUERY)
+        features, featurize_ms = timed(featurize, candidates, terms)
+        scores, score_ms = timed(score, features, idf)
+        _, top_k_ms = timed(top_k, scores, features.prices, max_results)
+        _, sort_ms = timed(np.lexsort, (features.prices, -scores))
+        total_ms = featurize_ms + score_ms + top_k_ms
+        print(
+            f"{size:>12,} {legacy_ms:>9.1f}ms {featurize_ms:>9.1f}ms {score_ms:>7.2f}ms "
+            f"{top_k_ms:>7.2f}ms {total_ms:>9.1f}ms {sort_ms:>9.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
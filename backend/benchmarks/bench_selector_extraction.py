@@ -0,0 +1,47 @@
+"""
+Micro-benchmark for per-product field extraction
+
+Compares the old per-agent approach (one select_one call per field, each
+taking the selector string) with the compiled single-walk engine in
+app.utils.selector_engine, on the generated retailer pages used by
+bench_html_parsing.
+
+Run from backend/:  python -m benchmarks.bench_selector_extraction
+"""
+import time
+
+from app.agents.registry import get_retailer_config
+from app.utils.html_parsing import make_soup
+from app.utils.selector_engine import FIELDS, compile_selectors
+
+from .bench_html_parsing import AGENTS, load_fixtures
+
+
+def main(rounds: int = 50):
+    fixtures = load_fixtures()
+    for name, (retailer, _) in AGENTS.items():
+        config = get_retailer_config(retailer)
+        compiled = compile_selectors(config)
+        soup = make_soup(fixtures[name])
+        field_selectors = {field: getattr(config.selectors, field) for field in FIELDS if getattr(config.selectors, field)}
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            containers = soup.select(config.selectors.product)
+            for container in containers:
+                {field: container.select_one(selector) for field, selector in field_selectors.items()}
+        legacy_us = (time.perf_counter() - start) / (rounds * len(containers)) * 1e6
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            containers = list(compiled.containers(soup, 1000))
+            for container in containers:
+                compiled.extract_fields(container)
+        compiled_us = (time.perf_counter() - start) / (rounds * len(containers)) * 1e6
+
+        print(f"{retailer:<16} select_one {legacy_us:>7.1f} us/product   compiled {compiled_us:>6.1f} us/product   "
+              f"({legacy_us / compiled_us:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
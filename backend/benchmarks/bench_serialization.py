@@ -0,0 +1,101 @@
+"""
+Benchmark for serializing a 100-product search response
+
+Compares FastAPI's response_model path /search used to take (dump, validate
+against SearchResponse, jsonable_encoder, json.dumps) with the negotiated
+responses in app.utils.responses, as JSON and as msgpack. Reports time per
+response and payload bytes, raw and gzipped. The products are built the way
+the agents and normalizer build them, with grouped offers attached.
+
+Run from backend/:  python -m benchmarks.bench_serialization [products]
+"""
+import asyncio
+import gzip
+import sys
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.models.schemas import Product, SearchResponse
+from app.utils.normalization import ProductNormalizer
+from app.utils.product_grouping import to_offer
+from app.utils.responses import JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, negotiated_response
+
+ROUNDS = 300
+
+NAMES = [
+    "لبن جهينة كامل الدسم 1 لتر",
+    "Juhayna Full Cream Milk 1L",
+    "أرز الضحى مصري 5 كيلو",
+    "زيت عباد الشمس كريستال 1.5 لتر",
+    "مكرونة الملكة اسباجتي 400 جرام",
+    "شاي العروسة ناعم 250 جم",
+    "Nestle Pure Life Water 1.5 Liter x 6",
+    "جبنة دومتي فيتا 500 جم",
+]
+RETAILERS = ["Carrefour Egypt", "Spinneys Egypt", "Metro Egypt", "Kazyon", "FreshMart"]
+
+
+def build_response(count: int) -> SearchResponse:
+    scraped = [
+        Product(
+            name=NAMES[i % len(NAMES)],
+            price=20 + i * 0.75,
+            retailer=RETAILERS[i % len(RETAILERS)],
+            url=f"https://example.com/product/{i}",
+            image_url=f"https://example.com/images/{i}.jpg",
+        )
+        for i in range(count)
+    ]
+    products = ProductNormalizer().normalize_batch_sync(scraped, "لبن")
+    # Roughly a third of results carry offers from other retailers after grouping
+    products = [
+        product.model_copy(update={"offers": [to_offer(other) for other in products[i + 1:i + 3]]}) if i % 3 == 0 else product
+        for i, product in enumerate(products)
+    ]
+    return SearchResponse.model_construct(
+        request_id="00000000-0000-0000-0000-000000000000",
+        query="لبن",
+        products=products,
+        total_results=len(products),
+        search_time_ms=850,
+        retailers_searched=RETAILERS,
+        error_retailers=[]
+    )
+
+
+def legacy_body(loop: asyncio.AbstractEventLoop, field, response: SearchResponse) -> bytes:
+    content = loop.run_until_complete(serialize_response(field=field, response_content=response))
+    return JSONResponse(content).body
+
+
+def measure(render) -> tuple:
+    body = render()
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        render()
+    return (time.perf_counter() - start) / ROUNDS * 1000, body
+
+
+def main(count: int = 100):
+    response = build_response(count)
+    field = create_response_field(name="response", type_=SearchResponse)
+    loop = asyncio.new_event_loop()
+
+    cases = [
+        ("response_model + JSONResponse (old)", lambda: legacy_body(loop, field, response)),
+        ("negotiated JSON", lambda: negotiated_response(response, JSON_MEDIA_TYPE).body),
+        ("negotiated msgpack", lambda: negotiated_response(response, MSGPACK_MEDIA_TYPE).body),
+    ]
+    print(f"{count} products, {sum(len(product.offers) for product in response.products)} nested offers, {ROUNDS} rounds")
+    print(f"{'path':<38} {'ms/response':>12} {'bytes':>9} {'gzip bytes':>11}")
+    for name, render in cases:
+        elapsed_ms, body = measure(render)
+        print(f"{name:<38} {elapsed_ms:>12.2f} {len(body):>9,} {len(gzip.compress(body)):>11,}")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,127 @@
+"""
+Micro-benchmark for weight/unit extraction from product names
+
+Compares the per-call regex loop ProductNormalizer used to run against the
+shared precompiled engine in app.utils.unit_extraction.
+
+Run from backend/:  python -m benchmarks.bench_unit_extraction
+"""
+import re
+import time
+from typing import Optional, Tuple
+
+from app.utils.unit_extraction import extract_measurement
+
+# Product names as listed by Egyptian retailers
+CORPUS = [
+    "لبن جهينة كامل الدسم 1 لتر",
+    "Juhayna Full Cream Milk 1L",
+    "لبن المراعي خالي الدسم ٢٠٠ مل × ٦",
+    "Almarai Juice Mango 6 x 200ml",
+    "أرز الضحى مصري 1 كيلو",
+    "El Doha Egyptian Rice 5kg",
+    "سكر الأسرة أبيض 1 كجم",
+    "زيت عباد الشمس كريستال 1.5 لتر",
+    "Crystal Sunflower Oil 2.2 L",
+    "مكرونة الملكة اسباجتي 400 جرام",
+    "Regina Spaghetti Pasta 400g",
+    "جبنة دومتي فيتا 500 جم",
+    "Domty Feta Cheese 250gm",
+    "شاي العروسة ناعم 250 جم",
+    "Lipton Yellow Label Tea 100 Bags",
+    "بيض أبيض 30 حبة",
+    "Fresh Eggs Tray 30 pcs",
+    "نسكافيه كلاسيك ٢٠٠ جرام",
+    "Nescafe Classic Jar 100gm",
+    "مياه نستله 600 مل × 12",
+    "Nestle Pure Life Water 1.5 Liter x 6",
+    "Pepsi Can 330ml x 24",
+    "بيبسي كانز ٣٣٠ مل",
+    "تونة صن شاين قطع 185 جرام",
+    "Sunshine Tuna Chunks 3 x 185 g",
+    "فول مدمس أمريكانا 400 جم",
+    "Americana Foul Medames 400 Gm",
+    "سمن كريستال نباتي 700 جم",
+    "زبدة لورباك 200 جرام",
+    "Lurpak Butter Unsalted 200g",
+    "عسل إيمتنان 450 جرام",
+    "Imtenan Honey 1 kg",
+    "دقيق الضحى 1 كيلو",
+    "Persil Gel Detergent 2.5 Liter",
+    "برسيل جل ٢٫٥ لتر",
+    "صابون لوكس 4 × 120 جم",
+    "Lux Soap Bar 120 g x 4",
+    "مناديل فاين 10 قطع",
+    "Fine Facial Tissues 550 Tissues",
+    "شيبسي بالملح والخل",
+]
+
+
+def legacy_extract_weight(name: str) -> Tuple[Optional[float], Optional[str]]:
+    """The pre-engine ProductNormalizer._extract_weight_from_name"""
+    patterns = [
+        r'(\d+(?:\.\d+)?)\s*كيلو',
+        r'(\d+(?:\.\d+)?)\s*كجم',
+        r'(\d+(?:\.\d+)?)\s*جم',
+        r'(\d+(?:\.\d+)?)\s*جرام',
+        r'(\d+(?:\.\d+)?)\s*لتر',
+        r'(\d+(?:\.\d+)?)\s*مل',
+        r'(\d+)\s*قطعة',
+        r'(\d+)\s*حبة',
+        r'(\d+(?:\.\d+)?)\s*kg',
+        r'(\d+(?:\.\d+)?)\s*g\b',
+        r'(\d+(?:\.\d+)?)\s*gram',
+        r'(\d+(?:\.\d+)?)\s*l\b',
+        r'(\d+(?:\.\d+)?)\s*liter',
+        r'(\d+(?:\.\d+)?)\s*ml',
+        r'(\d+)\s*pc',
+        r'(\d+)\s*piece',
+        r'(\d+(?:\.\d+)?)\s*(kg|g|l|ml|pc|كيلو|جم|لتر|مل|قطعة|حبة)'
+    ]
+    unit_mapping = {
+        'كيلو': 'kg', 'كجم': 'kg', 'kg': 'kg',
+        'جم': 'g', 'جرام': 'g', 'g': 'g', 'gram': 'g',
+        'لتر': 'l', 'l': 'l', 'liter': 'l',
+        'مل': 'ml', 'ml': 'ml',
+        'قطعة': 'pc', 'حبة': 'pc', 'pc': 'pc', 'piece': 'pc'
+    }
+    for pattern in patterns:
+        match = re.search(pattern, name, re.IGNORECASE)
+        if match:
+            try:
+                weight = float(match.group(1))
+                unit = match.group(2) if len(match.groups()) > 1 else None
+                if unit:
+                    return weight, unit_mapping.get(unit.lower(), unit.lower())
+                if weight >= 500:
+                    return weight, 'g'
+                elif weight >= 1:
+                    return weight, 'kg'
+            except ValueError:
+                continue
+    return None, None
+
+
+def products_per_second(extract, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for name in CORPUS:
+            extract(name)
+    return rounds * len(CORPUS) / (time.perf_counter() - start)
+
+
+def main(rounds: int = 2000):
+    # __wrapped__ bypasses the lru_cache so every call does a real scan
+    uncached = extract_measurement.__wrapped__
+    print(f"{len(CORPUS)} product names x {rounds} rounds")
+    print(f"legacy regex loop       {products_per_second(legacy_extract_weight, rounds):>12,.0f} products/s")
+    print(f"combined pattern        {products_per_second(uncached, rounds):>12,.0f} products/s")
+    print(f"combined pattern, cached{products_per_second(extract_measurement, rounds):>12,.0f} products/s")
+
+    print("\nSample extractions (legacy -> engine):")
+    for name in CORPUS[:12]:
+        print(f"  {name!r}: {legacy_extract_weight(name)} -> {tuple(uncached(name))}")
+
+
+if __name__ == "__main__":
+    main()
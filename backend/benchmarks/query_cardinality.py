@@ -0,0 +1,76 @@
+"""
+Distinct-query cardinality before and after canonicalization
+
+Reads a query log (one query per line, e.g. exported from the "query" field
+of search:* hashes or from request logs) and reports how many distinct cache
+keys the queries produce as typed versus after canonicalize_query, plus the
+canonicalizer's cold and memoized throughput. Without a log file a built-in
+sample of common spelling variants is used.
+
+Run from backend/:  python -m benchmarks.query_cardinality [queries.txt]
+"""
+import re
+import sys
+import time
+from collections import Counter
+from typing import List
+
+from app.utils.query_canonicalizer import canonical_tokens, canonicalize_query
+
+# Staple queries the way shoppers actually type them
+SAMPLE_LOG = [
+    "لبن", "اللبن", "لبن ", "لَبن", "لبن جهينة", "جهينة لبن", "لبن جهينه", "اللبن جهينة",
+    "رز", "الرز", "أرز", "ارز", "الأرز", "أرز الضحى", "ارز الضحي",
+    "زيت", "الزيت", "زيت عباد الشمس", "زيت عباد  الشمس", "زيـت",
+    "سكر", "السكر", "سكر ١ كيلو", "سكر 1 كيلو",
+    "Juhayna", "juhayna", "JUHAYNA", "Juhayna milk", "milk juhayna",
+    "سيدي سالم", "سيدى سالم", "Sidi Salem", "sidi salem",
+    "مياه", "المياه", "مياة", "شاي", "الشاى", "شاى العروسة", "العروسة شاي",
+]
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def as_typed(query: str) -> str:
+    """What SearchRequest.validate_query leaves of a query, i.e. the old cache key input"""
+    return WHITESPACE_PATTERN.sub(' ', query.strip())
+
+
+def load_queries(path: str) -> List[str]:
+    with open(path, encoding="utf-8") as log:
+        return [line.rstrip("\n") for line in log if line.strip()]
+
+
+def queries_per_second(canonicalize, queries: List[str], rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for query in queries:
+            canonicalize(query)
+    return rounds * len(queries) / (time.perf_counter() - start)
+
+
+def main(path: str = None, rounds: int = 200):
+    queries = load_queries(path) if path else SAMPLE_LOG
+    raw_keys = Counter(as_typed(query) for query in queries)
+    canonical_keys = Counter(canonicalize_query(query) for query in queries)
+
+    print(f"{len(queries)} queries from {path or 'built-in sample'}")
+    print(f"distinct as typed       {len(raw_keys):>10,}")
+    print(f"distinct canonical      {len(canonical_keys):>10,}")
+    print(f"key reduction           {1 - len(canonical_keys) / len(raw_keys):>10.1%}")
+
+    # __wrapped__ bypasses the lru_cache so every call does the full folding
+    uncached = lambda query: " ".join(canonical_tokens.__wrapped__(query))
+    print(f"\ncanonicalize, uncached  {queries_per_second(uncached, queries, rounds):>12,.0f} queries/s")
+    print(f"canonicalize, memoized  {queries_per_second(canonicalize_query, queries, rounds):>12,.0f} queries/s")
+
+    print("\nLargest merged groups:")
+    groups = {}
+    for query in raw_keys:
+        groups.setdefault(canonicalize_query(query), []).append(query)
+    for canonical, variants in sorted(groups.items(), key=lambda item: -len(item[1]))[:8]:
+        print(f"  {canonical!r} <- {variants}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
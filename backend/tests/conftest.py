@@ -0,0 +1,65 @@
+from typing import Callable, Iterator, Tuple
+
+import httpx
+import pytest
+import pytest_asyncio
+from fakeredis import aioredis
+
+from app.agents.base_agent import AbstractScrapingAgent
+from app.models.schemas import RetailerConfig, SelectorConfig
+
+# Served pages are streamed in chunks this size, like a slow retailer
+CHUNK_BYTES = 1024
+
+
+@pytest_asyncio.fixture
+async def redis_client():
+    """In-memory Redis with Lua scripting, configured like the app's client"""
+    client = aioredis.FakeRedis(decode_responses=True)
+    yield client
+    await client.aclose()
+
+
+@pytest.fixture
+def retailer_config() -> Callable[..., RetailerConfig]:
+    """Build a selector-driven retailer config without retries, overriding any field"""
+    def build(**overrides) -> RetailerConfig:
+        fields = dict(
+            name="Test Mart",
+            name_ar="تست مارت",
+            base_url="https://test-mart.example",
+            search_url="https://test-mart.example/search?q={query}",
+            max_retries=0,
+            circuit_min_calls=3,
+            selectors=SelectorConfig(product=".product-card", name="h3", price=".price"),
+        )
+        fields.update(overrides)
+        return RetailerConfig(**fields)
+    return build
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    """
+    Route the agents' pooled client to a handler returning (status, body)
+    Bodies are streamed in CHUNK_BYTES chunks; the returned list records how many
+    chunks each response had read from it.
+    """
+    chunks_read = []
+
+    def install(handler: Callable[[httpx.Request], Tuple[int, str]]):
+        def respond(request: httpx.Request) -> httpx.Response:
+            status_code, body = handler(request)
+            data = body.encode("utf-8")
+            chunks_read.append(0)
+
+            async def stream() -> Iterator[bytes]:
+                for start in range(0, len(data), CHUNK_BYTES):
+                    chunks_read[-1] += 1
+                    yield data[start:start + CHUNK_BYTES]
+            return httpx.Response(status_code, content=stream())
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(respond))
+        monkeypatch.setattr(AbstractScrapingAgent, "session", property(lambda self: client))
+        return chunks_read
+    return install
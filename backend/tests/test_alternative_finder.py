@@ -0,0 +1,20 @@
+from app.models.schemas import Product
+from app.utils.alternative_finder import AlternativeFinder
+from app.utils.product_grouping import group_products
+
+
+def product(name: str, price: float, retailer: str) -> Product:
+    return Product(name=name, price=price, retailer=retailer, url=f"https://{retailer}.example/{price}", weight=1, weight_unit="l")
+
+
+def test_grouped_offers_are_not_suggested_again():
+    carrefour = product("Juhayna Full Cream Milk 1L", 32, "carrefour")
+    metro = product("Juhayna Milk Full Cream 1L", 33, "metro")
+    other = product("Almarai Full Cream Milk 1L", 31, "kazyon")
+    shown = group_products([carrefour, metro])
+    assert len(shown) == 1 and len(shown[0].offers) == 1
+
+    # The product index returns every recent listing, including those already shown
+    filtered = AlternativeFinder()._filter_duplicates([metro, carrefour, other, other], shown)
+
+    assert filtered == [other]
@@ -0,0 +1,108 @@
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from app.utils import basket_solver
+from app.utils.basket_solver import solve, solve_exact, solve_greedy, subset_count
+
+INF = np.inf
+
+
+def brute_force(costs: np.ndarray, fees: np.ndarray, max_stores: int) -> tuple:
+    """(missing, total) of the best plan, trying every subset the slow way"""
+    best = None
+    for size in range(1, min(costs.shape[1], max_stores) + 1):
+        for subset in combinations(range(costs.shape[1]), size):
+            cheapest = costs[:, subset].min(axis=1)
+            available = np.isfinite(cheapest)
+            key = (int((~available).sum()), float(cheapest[available].sum() + fees[list(subset)].sum()))
+            best = key if best is None or key < best else best
+    return best
+
+
+def test_ties_pick_the_first_store():
+    costs = np.array([[10.0, 10.0, 10.0], [5.0, 5.0, 5.0]])
+    solution, solver = solve(costs, np.zeros(3), 1)
+
+    assert solver == "exact"
+    assert solution.stores == (0,)
+    assert solution.assignment.tolist() == [0, 0]
+    assert solution.total == 15
+
+
+def test_item_tie_within_a_plan_goes_to_the_first_store():
+    costs = np.array([[10.0, 10.0], [4.0, 6.0], [7.0, 3.0]])
+    solution = solve_exact(costs, np.zeros(2), 2)
+
+    assert solution.stores == (0, 1)
+    assert solution.assignment.tolist() == [0, 0, 1]
+    assert solution.items_cost == 17
+
+
+def test_items_no_store_carries_are_missing():
+    costs = np.array([[10.0, 12.0], [INF, INF], [8.0, INF]])
+    solution, _ = solve(costs, np.zeros(2), 2)
+
+    assert solution.missing == 1
+    assert solution.assignment.tolist() == [0, -1, 0]
+    assert solution.stores == (0,)
+    assert solution.items_cost == 18
+
+
+def test_covering_more_items_beats_a_cheaper_plan():
+    costs = np.array([[50.0, 1.0], [20.0, INF]])
+    solution, _ = solve(costs, np.zeros(2), 1)
+
+    assert solution.stores == (0,)
+    assert solution.missing == 0
+    assert solution.total == 70
+
+
+@pytest.mark.parametrize("max_stores", [1, 2, 3])
+def test_max_stores_limits_the_plan(max_stores):
+    # Every item is cheapest at a different store
+    costs = np.full((4, 4), 100.0)
+    np.fill_diagonal(costs, 1.0)
+    solution, _ = solve(costs, np.zeros(4), max_stores)
+
+    assert len(solution.stores) == max_stores
+    assert set(solution.assignment.tolist()) == set(solution.stores)
+    assert solution.items_cost == max_stores + 100 * (4 - max_stores)
+
+
+def test_delivery_fees_collapse_a_split_plan():
+    costs = np.array([[10.0, 12.0], [12.0, 10.0]])
+
+    assert solve(costs, np.zeros(2), 2)[0].stores == (0, 1)
+    solution, _ = solve(costs, np.array([5.0, 5.0]), 2)
+    assert solution.stores == (0,)
+    assert (solution.items_cost, solution.fees, solution.total) == (22, 5, 27)
+
+
+def test_exact_matches_brute_force():
+    rng = np.random.default_rng(7)
+    for _ in range(25):
+        costs = rng.uniform(5, 100, size=(8, 6))
+        costs[rng.random(costs.shape) < 0.3] = INF
+        fees = rng.choice([0.0, 15.0, 30.0], size=6)
+        for max_stores in (1, 2, 3):
+            solution = solve_exact(costs, fees, max_stores)
+            missing, total = brute_force(costs, fees, max_stores)
+            assert solution.missing == missing
+            assert solution.total == pytest.approx(total)
+
+
+def test_greedy_is_used_for_large_searches(monkeypatch):
+    monkeypatch.setattr(basket_solver, "BASKET_EXACT_MAX_SUBSETS", subset_count(6, 3) - 1)
+    rng = np.random.default_rng(3)
+    costs = rng.uniform(5, 100, size=(10, 6))
+    fees = np.full(6, 10.0)
+
+    solution, solver = solve(costs, fees, 3)
+
+    assert solver == "greedy"
+    assert len(solution.stores) <= 3
+    assert solution.missing == 0
+    assert solution.total >= brute_force(costs, fees, 3)[1] - 1e-9
+    assert solution.stores == solve_greedy(costs, fees, 3).stores
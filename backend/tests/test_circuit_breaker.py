@@ -0,0 +1,99 @@
+import httpx
+import pytest
+
+from app.agents.config_driven_agent import ConfigDrivenAgent
+from app.models.schemas import CircuitState
+from app.services.circuit_breaker import CircuitBreaker
+
+PAGE = "<html><body>{cards}</body></html>"
+CARD = '<div class="product-card"><h3>Juhayna Milk 1L</h3><span class="price">45.50 EGP</span><a href="/p/1">x</a></div>'
+
+
+@pytest.mark.asyncio
+async def test_server_errors_fail_the_search(redis_client, retailer_config, serve):
+    serve(lambda request: (503, "Service Unavailable"))
+    result = await ConfigDrivenAgent(retailer_config(), redis_client).execute_search("milk", "req-1")
+
+    assert not result.success
+    assert "HTTP 503" in result.error_message
+    assert await redis_client.hget("search:req-1:Test Mart", "status") == "failed"
+
+
+@pytest.mark.asyncio
+async def test_transport_errors_fail_the_search(redis_client, retailer_config, serve):
+    def refuse(request):
+        raise httpx.ConnectError("connection refused", request=request)
+    serve(refuse)
+    result = await ConfigDrivenAgent(retailer_config(), redis_client).execute_search("milk", "req-1")
+
+    assert not result.success
+    assert "ConnectError" in result.error_message
+
+
+@pytest.mark.asyncio
+async def test_page_without_products_is_an_empty_success(redis_client, retailer_config, serve):
+    serve(lambda request: (200, PAGE.format(cards="<p>No results</p>")))
+    result = await ConfigDrivenAgent(retailer_config(), redis_client).execute_search("milk", "req-1")
+
+    assert result.success
+    assert result.products == []
+
+
+@pytest.mark.asyncio
+async def test_products_are_parsed(redis_client, retailer_config, serve):
+    serve(lambda request: (200, PAGE.format(cards=CARD * 2)))
+    result = await ConfigDrivenAgent(retailer_config(), redis_client).execute_search("milk", "req-1")
+
+    assert result.success
+    assert result.products_found == 2
+    assert result.products[0].price == 45.5
+
+
+@pytest.mark.asyncio
+async def test_failed_searches_open_the_circuit(redis_client, retailer_config, serve):
+    config = retailer_config()
+    breaker = CircuitBreaker(redis_client)
+    serve(lambda request: (500, "Internal Server Error"))
+    agent = ConfigDrivenAgent(config, redis_client)
+
+    for i in range(config.circuit_min_calls):
+        result = await agent.execute_search("milk", f"req-{i}")
+        await breaker.record(config, result.success, result.response_time_ms)
+
+    states = await breaker.get_states([config])
+    assert states[config.name] == CircuitState.OPEN
+    available, skipped = await breaker.filter_available([config])
+    assert available == [] and skipped == [config.name]
+
+
+@pytest.mark.asyncio
+async def test_empty_results_keep_the_circuit_closed(redis_client, retailer_config, serve):
+    config = retailer_config()
+    breaker = CircuitBreaker(redis_client)
+    serve(lambda request: (200, PAGE.format(cards="")))
+    agent = ConfigDrivenAgent(config, redis_client)
+
+    for i in range(config.circuit_min_calls * 2):
+        result = await agent.execute_search("milk", f"req-{i}")
+        await breaker.record(config, result.success, result.response_time_ms)
+
+    assert (await breaker.get_states([config]))[config.name] == CircuitState.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_successful_probe_closes_the_circuit(redis_client, retailer_config, monkeypatch):
+    config = retailer_config()
+    breaker = CircuitBreaker(redis_client)
+    for _ in range(config.circuit_min_calls):
+        await breaker.record(config, False, 100)
+    assert (await breaker.get_states([config]))[config.name] == CircuitState.OPEN
+
+    # Jump past the cooldown: the circuit is half-open and one caller gets the probe
+    opened_at = float(await redis_client.hget(f"circuit:{config.name}", "opened_at"))
+    monkeypatch.setattr("app.services.circuit_breaker.time.time", lambda: opened_at + config.circuit_cooldown_seconds + 1)
+    assert (await breaker.get_states([config]))[config.name] == CircuitState.HALF_OPEN
+    assert (await breaker.filter_available([config]))[0] == [config]
+    assert (await breaker.filter_available([config]))[0] == []
+
+    await breaker.record(config, True, 100)
+    assert (await breaker.get_states([config]))[config.name] == CircuitState.CLOSED
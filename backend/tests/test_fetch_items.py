@@ -0,0 +1,64 @@
+import asyncio
+from typing import Dict, List, Tuple
+
+import pytest
+
+from app.agents.config_driven_agent import ConfigDrivenAgent
+from app.models.schemas import Language, Product
+from app.services import orchestrator
+from app.services.orchestrator import SearchOrchestrator
+
+RETAILERS = ["Alpha Mart", "Beta Mart", "Gamma Mart"]
+ITEMS = ["rice", "sugar", "oil", "tea", "pasta", "milk"]
+
+
+class RecordingAgent(ConfigDrivenAgent):
+    """Answers every search after a short delay, recording when it started and how many overlapped"""
+
+    started: List[Tuple[str, str]] = []
+    in_flight: Dict[str, int] = {}
+    peak: Dict[str, int] = {}
+
+    async def search_products(self, query: str, language: Language = Language.ARABIC, max_results: int = 20) -> List[Product]:
+        name = self.config.name
+        self.started.append((name, query))
+        self.in_flight[name] = self.in_flight.get(name, 0) + 1
+        self.peak[name] = max(self.peak.get(name, 0), self.in_flight[name])
+        await asyncio.sleep(0.02)
+        self.in_flight[name] -= 1
+        return [Product(name=f"{query} 1kg", price=10, retailer=name, url=f"https://{name}.example/{query}")]
+
+
+@pytest.fixture
+def agents(redis_client, retailer_config, monkeypatch):
+    RecordingAgent.started, RecordingAgent.in_flight, RecordingAgent.peak = [], {}, {}
+    pooled = [
+        RecordingAgent(retailer_config(name=name, base_url=f"https://{i}.example", max_connections=2), redis_client)
+        for i, name in enumerate(RETAILERS)
+    ]
+
+    async def active_agents(redis_client, open_circuits=None):
+        return pooled
+    monkeypatch.setattr(orchestrator, "get_active_agents", active_agents)
+    return pooled
+
+
+@pytest.mark.asyncio
+async def test_scrapes_are_interleaved_and_capped_per_host(redis_client, agents):
+    results = await SearchOrchestrator(redis_client, "basket-1").fetch_items(ITEMS, Language.ENGLISH, 30, concurrency=4)
+
+    assert [len(item) for item in results] == [len(RETAILERS)] * len(ITEMS)
+    assert all(result.success for item in results for result in item)
+    # The first item goes to every retailer before any retailer gets a second one
+    assert RecordingAgent.started[:len(RETAILERS)] == [(name, ITEMS[0]) for name in RETAILERS]
+    # No host ever has more than its max_connections scrapes in flight
+    assert RecordingAgent.peak == {name: 2 for name in RETAILERS}
+    assert len(RecordingAgent.started) == len(RETAILERS) * len(ITEMS)
+
+
+@pytest.mark.asyncio
+async def test_one_retailer_is_not_sent_the_whole_list(redis_client, agents):
+    # Plenty of shared slots: the per-host cap alone bounds each retailer
+    await SearchOrchestrator(redis_client, "basket-2").fetch_items(ITEMS, Language.ENGLISH, 30, concurrency=24)
+
+    assert max(RecordingAgent.peak.values()) == 2
@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from app.services.http_pool import HTTPClientPool
+
+
+@pytest.mark.asyncio
+async def test_clients_are_reused_while_settings_are_unchanged(retailer_config):
+    pool = HTTPClientPool()
+    config = retailer_config()
+
+    client = pool.get_client(config)
+    assert pool.get_client(config) is client
+    # Settings that don't affect the transport keep the client
+    assert pool.get_client(config.model_copy(update={"priority": 3})) is client
+    await pool.close()
+    assert client.is_closed
+
+
+@pytest.mark.asyncio
+async def test_reconfigured_retailers_get_a_new_client(retailer_config):
+    pool = HTTPClientPool()
+    # Replaced clients are closed after the old request timeout
+    config = retailer_config(timeout_seconds=1)
+    old = pool.get_client(config)
+    old_hedge = pool.get_client(config, lane="hedge")
+
+    reconfigured = config.model_copy(update={"max_connections": 2, "http2": False})
+    client = pool.get_client(reconfigured)
+    hedge = pool.get_client(reconfigured, lane="hedge")
+
+    assert client is not old and hedge is not old_hedge
+    assert client._transport._pool._max_connections == 2
+    assert pool.get_client(reconfigured) is client
+    # Requests already on the old clients may finish before they are closed
+    assert not old.is_closed
+    await asyncio.gather(*pool._retired.values())
+    assert old.is_closed and old_hedge.is_closed
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_close_shuts_replaced_clients(retailer_config):
+    pool = HTTPClientPool()
+    config = retailer_config()
+    old = pool.get_client(config)
+    client = pool.get_client(config.model_copy(update={"timeout_seconds": 20}))
+
+    await pool.close()
+
+    assert old.is_closed and client.is_closed
+    assert not pool._retired
@@ -0,0 +1,104 @@
+from typing import List, Optional, Tuple
+
+from app.models.schemas import Product
+from app.utils.normalization import ProductNormalizer
+from app.utils.product_grouping import concept_tokens, family_key, group_products
+
+
+def listings(*rows: Tuple[str, float, str, Optional[str]]) -> List[Product]:
+    """Products as the agents and normalizer produce them, from (name, price, retailer, brand)"""
+    scraped = [
+        Product(name=name, price=price, retailer=retailer, url=f"https://{i}.example/p", brand=brand)
+        for i, (name, price, retailer, brand) in enumerate(rows)
+    ]
+    return ProductNormalizer().normalize_batch_sync(scraped, "")
+
+
+def group_names(groups: List[Product]) -> List[List[str]]:
+    return [sorted([group.name] + [offer.name for offer in group.offers]) for group in groups]
+
+
+def test_same_product_is_grouped_across_retailers_and_languages():
+    products = listings(
+        ("Juhayna Full Cream Milk 1L", 32, "Carrefour Egypt", None),
+        ("لبن جهينة كامل الدسم 1 لتر", 30.5, "Kazyon", None),
+        ("جهينة لبن كامل الدسم ١ لتر", 31, "Metro Egypt", None),
+    )
+    groups = group_products(products)
+
+    assert len(groups) == 1
+    assert groups[0].retailer == "Kazyon" and groups[0].price == 30.5
+    assert [(offer.retailer, offer.price) for offer in groups[0].offers] == [("Metro Egypt", 31), ("Carrefour Egypt", 32)]
+
+
+def test_variants_sizes_and_brands_stay_apart():
+    products = listings(
+        ("Juhayna Full Cream Milk 1L", 32, "Carrefour Egypt", None),
+        ("لبن جهينة خالي الدسم 1 لتر", 33, "Kazyon", None),
+        ("Juhayna Full Cream Milk 500ml", 18, "Carrefour Egypt", None),
+        ("Almarai Full Cream Milk 1L", 31, "Spinneys Egypt", "Almarai"),
+    )
+    assert len(group_products(products)) == 4
+
+
+def test_counts_are_not_treated_as_sizes():
+    products = listings(
+        ("Lipton Yellow Label Tea 25 Bags", 45, "Carrefour Egypt", None),
+        ("Lipton Yellow Label Tea 100 Bags", 150, "Kazyon", None),
+    )
+    assert "25" in concept_tokens(products[0].name)
+    assert len(group_products(products)) == 2
+
+
+def test_model_numbers_keep_products_apart():
+    products = listings(
+        ("Samsung Galaxy A14 128GB Black", 7999, "Jumia Egypt", None),
+        ("Samsung Galaxy A54 128GB Black", 15999, "Carrefour Egypt", None),
+    )
+    assert len(group_products(products)) == 2
+
+
+def test_unsized_products_group_only_when_nearly_identical():
+    products = listings(
+        ("Samsung Galaxy A14 128GB Black", 7999, "Jumia Egypt", None),
+        ("Samsung Galaxy A14 128GB Black", 7899, "Carrefour Egypt", None),
+        ("Samsung Galaxy A14 128GB Black Case", 199, "Kazyon", None),
+    )
+    groups = group_products(products)
+
+    assert group_names(groups) == [
+        ["Samsung Galaxy A14 128GB Black", "Samsung Galaxy A14 128GB Black"],
+        ["Samsung Galaxy A14 128GB Black Case"],
+    ]
+
+
+def test_unbranded_listing_never_links_two_brands():
+    products = listings(
+        ("Juhayna Full Cream Milk 1L", 32, "Carrefour Egypt", None),
+        ("Full Cream Milk 1L", 28, "FreshMart", None),
+        ("Almarai Full Cream Milk 1L", 31, "Spinneys Egypt", None),
+    )
+    for names in group_names(group_products(products)):
+        assert not ("Juhayna Full Cream Milk 1L" in names and "Almarai Full Cream Milk 1L" in names)
+
+
+def test_family_key_ignores_pack_size_but_not_counts():
+    one_litre, six_pack, tea_25, tea_100 = listings(
+        ("Juhayna Full Cream Milk 1L", 32, "Carrefour Egypt", None),
+        ("Juhayna Full Cream Milk 6 x 200ml", 40, "Carrefour Egypt", None),
+        ("Lipton Tea 25 Bags 50g", 45, "Kazyon", None),
+        ("Lipton Tea 100 Bags 200g", 150, "Kazyon", None),
+    )
+    assert family_key(one_litre) == family_key(six_pack)
+    assert family_key(tea_25) != family_key(tea_100)
+
+
+def test_repeated_listings_appear_once_and_other_retailers_stay_offers():
+    carrefour, kazyon = listings(
+        ("Juhayna Full Cream Milk 1L", 32, "Carrefour Egypt", None),
+        ("Juhayna Full Cream Milk 1L", 32, "Metro Egypt", None),
+    )
+    groups = group_products([carrefour, kazyon, carrefour])
+
+    assert len(groups) == 1
+    assert [offer.retailer for offer in groups[0].offers] == ["Metro Egypt"]
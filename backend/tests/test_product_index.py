@@ -0,0 +1,46 @@
+import pytest
+
+from app.models.schemas import Product
+from app.utils.product_index import PRODUCT_KEY_PREFIX, TOKEN_KEY_PREFIX, ProductIndex
+
+
+def product(name: str, price: float, retailer: str) -> Product:
+    return Product(name=name, price=price, retailer=retailer, url=f"https://{retailer}.example/{name}")
+
+
+async def indexed(redis_client, products) -> ProductIndex:
+    index = ProductIndex(redis_client)
+    pipe = redis_client.pipeline(transaction=False)
+    index.add_to_pipeline(pipe, products)
+    await pipe.execute()
+    return index
+
+
+@pytest.mark.asyncio
+async def test_search_ranks_products_by_matched_tokens(redis_client):
+    index = await indexed(redis_client, [
+        product("Juhayna Milk 1L", 35, "carrefour"),
+        product("Juhayna Full Cream Milk 1L", 36, "metro"),
+        product("Crystal Sunflower Oil", 90, "kazyon"),
+    ])
+
+    matches = await index.search("full cream milk")
+
+    assert [(count, match.name) for count, match in matches] == [
+        (3, "Juhayna Full Cream Milk 1L"),
+        (1, "Juhayna Milk 1L"),
+    ]
+    assert len(await index.search("milk", limit=1)) == 1
+    assert await index.search("x") == []
+
+
+@pytest.mark.asyncio
+async def test_search_prunes_products_whose_blob_expired(redis_client):
+    milk = product("Juhayna Milk 1L", 35, "carrefour")
+    index = await indexed(redis_client, [milk, product("Almarai Milk 1L", 33, "metro")])
+    await redis_client.delete(f"{PRODUCT_KEY_PREFIX}{ProductIndex.product_id(milk)}")
+
+    matches = await index.search("milk")
+
+    assert [match.name for _, match in matches] == ["Almarai Milk 1L"]
+    assert await redis_client.zscore(f"{TOKEN_KEY_PREFIX}milk", ProductIndex.product_id(milk)) is None
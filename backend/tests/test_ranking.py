@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from app.models.schemas import Product
+from app.utils.product_index import ProductIndex
+from app.utils.ranking import CorpusStatistics, matches_query, query_terms, rank_products, top_k
+
+
+def product(name: str, price: float, retailer: str = "carrefour", **fields) -> Product:
+    return Product(name=name, price=price, retailer=retailer, url=f"https://{retailer}.example/{name}/{price}", **fields)
+
+
+def full_sort(scores: np.ndarray, prices: np.ndarray) -> list:
+    return sorted(range(len(scores)), key=lambda i: (-scores[i], prices[i]))
+
+
+@pytest.mark.parametrize("k", [1, 5, 20, 200, 250])
+def test_top_k_matches_a_full_sort(k):
+    rng = np.random.default_rng(k)
+    # Rounded scores make ties at the cut-off common
+    scores = rng.integers(0, 10, size=200) / 10
+    prices = rng.permutation(200).astype(np.float64)
+
+    assert top_k(scores, prices, k).tolist() == full_sort(scores, prices)[:k]
+
+
+def test_top_k_orders_equal_scores_by_price():
+    scores = np.array([0.5, 0.9, 0.5, 0.5])
+    prices = np.array([30.0, 50.0, 10.0, 20.0])
+
+    assert top_k(scores, prices, 3).tolist() == [1, 2, 3]
+
+
+def test_top_k_handles_empty_input_and_limits():
+    assert top_k(np.empty(0), np.empty(0), 5).tolist() == []
+    assert top_k(np.ones(3), np.ones(3), 0).tolist() == []
+
+
+def test_rank_products_puts_matches_first_and_respects_limit():
+    products = [
+        product("Juhayna Yogurt 170g", 8),
+        product("Juhayna Full Cream Milk 1L", 35),
+        product("Almarai Full Cream Milk 1L", 33),
+        product("Sunflower Oil 1.5L", 90),
+    ]
+    terms = query_terms("full cream milk")
+    idf = np.ones(len(terms))
+
+    ranked = rank_products(products, terms, idf, 2)
+
+    assert [item.name for item in ranked] == ["Almarai Full Cream Milk 1L", "Juhayna Full Cream Milk 1L"]
+    assert matches_query(products, terms).tolist() == [False, True, True, False]
+
+
+def test_rare_terms_outweigh_common_ones():
+    products = [product("Milk Chocolate", 20), product("Lactose Free Milk", 40)]
+    terms = query_terms("lactose milk")
+    # "milk" appears everywhere, "lactose" almost nowhere
+    idf = np.array([3.0 if term == "lactose" else 0.1 for term in terms])
+
+    assert rank_products(products, terms, idf, 1)[0].name == "Lactose Free Milk"
+
+
+@pytest.mark.asyncio
+async def test_idf_comes_from_the_product_index(redis_client):
+    pipe = redis_client.pipeline(transaction=False)
+    ProductIndex(redis_client).add_to_pipeline(pipe, [
+        product("Juhayna Milk 1L", 35),
+        product("Almarai Milk 1L", 33, "metro"),
+        product("Lactose Free Milk 1L", 40, "kazyon"),
+    ])
+    await pipe.execute()
+
+    total, frequencies = await ProductIndex(redis_client).document_frequencies(["milk", "lactose", "coffee"])
+    assert (total, frequencies) == (3, [3, 1, 0])
+
+    idf = await CorpusStatistics().idf(redis_client, ["milk", "lactose", "coffee"])
+    assert idf[0] < idf[1] < idf[2]
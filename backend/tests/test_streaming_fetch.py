@@ -0,0 +1,86 @@
+import orjson
+import pytest
+
+from app.agents import base_agent
+from app.agents.config_driven_agent import ConfigDrivenAgent
+
+CARD = '<div class="product-card"><h3>Crystal Sunflower Oil {i}</h3><span class="price">{price} EGP</span><a href="/p/{i}">x</a></div>'
+
+
+def results_page(cards: int, json_ld_products: int = 0, json_ld_first: bool = False, trailer_bytes: int = 0) -> str:
+    """
+    A results page whose JSON-LD, like most storefronts', comes after the product markup
+    trailer_bytes of footer markup follow everything else.
+    """
+    markup = "".join(CARD.format(i=i, price=80 + i) for i in range(cards))
+    json_ld = ""
+    if json_ld_products:
+        items = [
+            {"@type": "Product", "name": f"Crystal Sunflower Oil {i} 1.5L", "url": f"/p/{i}",
+             "offers": {"price": str(75 + i), "availability": "https://schema.org/InStock"}}
+            for i in range(json_ld_products)
+        ]
+        document = {"@context": "https://schema.org", "@type": "ItemList", "itemListElement": items}
+        json_ld = f'<script type="application/ld+json">{orjson.dumps(document).decode()}</script>'
+    head, tail = (json_ld, "") if json_ld_first else ("", json_ld)
+    footer = f"<footer>{'x' * trailer_bytes}</footer>"
+    return f"<html><head>{head}</head><body><div class='results'>{markup}</div>{tail}{footer}</body></html>"
+
+
+@pytest.fixture(autouse=True)
+def stream_stats(monkeypatch):
+    """Fresh per-retailer streaming state for every test"""
+    stats = {}
+    monkeypatch.setattr(base_agent, "_stream_stats", stats)
+    return stats
+
+
+@pytest.mark.asyncio
+async def test_selector_only_retailers_stop_reading_early(redis_client, retailer_config, serve):
+    page = results_page(cards=200)
+    chunks_read = serve(lambda request: (200, page))
+    config = retailer_config(structured_data=False)
+    result = await ConfigDrivenAgent(config, redis_client).execute_search("oil", "req-1", max_results=5)
+
+    assert result.success and result.products_found == 5
+    assert chunks_read[0] < len(page) // 1024
+
+
+@pytest.mark.asyncio
+async def test_structured_data_after_the_markup_is_read(redis_client, retailer_config, serve):
+    page = results_page(cards=200, json_ld_products=10, trailer_bytes=20_000)
+    chunks_read = serve(lambda request: (200, page))
+    result = await ConfigDrivenAgent(retailer_config(), redis_client).execute_search("oil", "req-1", max_results=5)
+
+    assert result.success and result.products_found == 5
+    # Prices come from the JSON-LD offers, not the card markup
+    assert [product.price for product in result.products] == [75, 76, 77, 78, 79]
+    assert result.products[0].url == "https://test-mart.example/p/0"
+    # Reading stops once the JSON-LD has closed, before the footer
+    assert chunks_read[0] < (len(page) - 20_000) // 1024 + 2
+
+
+@pytest.mark.asyncio
+async def test_structured_data_ahead_of_the_markup_stops_at_the_product_count(redis_client, retailer_config, serve):
+    page = results_page(cards=200, json_ld_products=10, json_ld_first=True)
+    chunks_read = serve(lambda request: (200, page))
+    result = await ConfigDrivenAgent(retailer_config(), redis_client).execute_search("oil", "req-1", max_results=5)
+
+    assert [product.price for product in result.products] == [75, 76, 77, 78, 79]
+    assert chunks_read[0] < len(page) // 1024
+
+
+@pytest.mark.asyncio
+async def test_pages_without_structured_data_stop_early_once_learned(redis_client, retailer_config, serve, stream_stats):
+    page = results_page(cards=200)
+    chunks_read = serve(lambda request: (200, page))
+    agent = ConfigDrivenAgent(retailer_config(), redis_client)
+
+    first = await agent.execute_search("oil", "req-1", max_results=5)
+    second = await agent.execute_search("ghee", "req-2", max_results=5)
+
+    assert first.products_found == second.products_found == 5
+    # The first page is read to the end looking for structured data, later ones are not
+    assert chunks_read[0] == -(-len(page) // 1024)
+    assert chunks_read[1] < len(page) // 1024
+    assert stream_stats["Test Mart"].snapshot()["has_structured_data"] is False
@@ -94,6 +94,61 @@ export const searchProducts = async (params) => {
   }
 }
 
+/**
+ * Stream search results as each retailer responds
+ * Uses fetch because axios cannot read a streaming response body in the browser
+ * @param {Object} params - Search parameters (same as searchProducts)
+ * @param {Function} onEvent - Called with each event: { event: 'retailer' | 'summary' | 'error', ... }
+ * @param {AbortSignal} signal - Optional signal to cancel the stream
+ * @returns {Promise} Resolves with the final summary event
+ */
+export const searchProductsStream = async (params, onEvent, signal) => {
+  const searchParams = {
+    query: params.query,
+    language: params.language || 'ar',
+    max_results: params.max_results || 50,
+    include_alternatives: params.include_alternatives !== false,
+    ...params
+  }
+
+  const response = await fetch(`${api.defaults.baseURL}/search/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(searchParams),
+    signal,
+  })
+
+  if (!response.ok || !response.body) {
+    throw new Error(`Search failed: Server error (${response.status})`)
+  }
+
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  let summary = null
+
+  const handleLine = (line) => {
+    if (!line.trim()) return
+    const event = JSON.parse(line)
+    if (event.event === 'summary') summary = event
+    if (event.event === 'error') throw new Error(`Search failed: ${event.detail}`)
+    onEvent(event)
+  }
+
+  // Events are newline-delimited JSON; a chunk may hold partial lines
+  while (true) {
+    const { done, value } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+    const lines = buffer.split('\n')
+    buffer = lines.pop()
+    lines.forEach(handleLine)
+  }
+  handleLine(buffer)
+
+  return summary
+}
+
 /**
  * Get list of supported retailers
  * @returns {Promise} List of retailers with their status